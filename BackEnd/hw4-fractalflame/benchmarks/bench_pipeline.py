@@ -0,0 +1,472 @@
+import argparse
+import gc
+import json
+import logging
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from config import Config
+from engine import FractalEngine
+from histogram import DenseHistogram, Histogram
+from image import ImageExporter
+from models import Point
+from transform import Transformations, TransformationSystem
+
+# Фиксированные параметры, чтобы результаты разных запусков были сравнимы
+SEED = 12345
+AFFINE_PARAMS = {"a": 0.6, "b": 0.6, "c": 0.6, "d": 0.6, "e": 0.6, "f": 0.6}
+HISTOGRAM_SIZE = (640, 480)
+SYMMETRY_LEVELS = (1, 6)
+WORKER_COUNTS = (2, 4, 8)
+RESOLUTIONS = ((640, 480), (1920, 1080), (3840, 2160))
+PARALLEL_BACKENDS = ("process", "shared_memory", "thread")
+
+
+@dataclass
+class DictPoint:
+    """Прежнее представление точки: dataclass без slots, с __dict__."""
+
+    x: float
+    y: float
+
+
+class Benchmark:
+    """Замер: подготовка вне времени, затем run, обрабатывающий items единиц.
+
+    trace_memory - отдельный запуск под tracemalloc: пик выделенной памяти
+    и число блоков, выделенных за run, на единицу.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        unit: str,
+        items: int,
+        setup: Callable[[], Callable],
+        *,
+        trace_memory: bool = False,
+    ) -> None:
+        self.name = name
+        self.unit = unit
+        self.items = items
+        self.setup = setup
+        self.trace_memory = trace_memory
+
+    def measure(self, repeat: int) -> dict:
+        """Лучшее и медианное время из repeat запусков и скорость по лучшему."""
+        timings = []
+        for _ in range(repeat):
+            run = self.setup()
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+
+        best = min(timings)
+        result = {
+            "unit": self.unit,
+            "items": self.items,
+            "best_s": best,
+            "median_s": statistics.median(timings),
+            "rate": self.items / best,
+        }
+        if self.trace_memory:
+            result.update(self._memory())
+        return result
+
+    def _memory(self) -> dict:
+        """Память run на единицу, вне замера времени: tracemalloc его замедляет."""
+        run = self.setup()
+        gc.collect()
+        blocks = sys.getallocatedblocks()
+        tracemalloc.start()
+        try:
+            kept = run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # Блоки, выделенные за run и еще живые: объекты, которые он вернул
+        blocks = sys.getallocatedblocks() - blocks
+        del kept
+        return {
+            "peak_bytes_per_item": peak / self.items,
+            "blocks_per_item": blocks / self.items,
+        }
+
+
+def transform_point_benchmarks(samples: int) -> list[Benchmark]:
+    """transform_point для каждой вариации отдельно."""
+
+    def setup_for(name: str) -> Callable[[], Callable]:
+        def setup() -> Callable:
+            system = TransformationSystem(
+                [{"name": name, "weight": 1.0}], AFFINE_PARAMS
+            )
+            # Свой генератор, как у скалярного движка: без него выбор идет
+            # через глобальный random и замеры разных запусков не совпадают
+            rng = random.Random(SEED)
+
+            def run() -> None:
+                point, color = Point(0.1, 0.2), 0.0
+                for _ in range(samples):
+                    point, color = system.transform_point(point, color, rng)
+
+            return run
+
+        return setup
+
+    return [
+        Benchmark(f"transform_point/{name}", "samples", samples, setup_for(name))
+        for name in Transformations.COLOR_INDICES
+    ]
+
+
+def point_benchmarks(samples: int) -> list[Benchmark]:
+    """Создание точек: Point со slots против прежнего dataclass с __dict__.
+
+    Точки остаются в списке, чтобы tracemalloc показал память одной точки.
+    """
+
+    def setup_for(point_class: type) -> Callable[[], Callable]:
+        def setup() -> Callable:
+            return lambda: [point_class(0.5, 0.25) for _ in range(samples)]
+
+        return setup
+
+    return [
+        Benchmark(
+            f"point/{kind}",
+            "points",
+            samples,
+            setup_for(point_class),
+            trace_memory=True,
+        )
+        for kind, point_class in (("slots", Point), ("dict", DictPoint))
+    ]
+
+
+def scalar_step_benchmarks(samples: int) -> list[Benchmark]:
+    """Шаг скалярного движка с объектами Point и на локальных float."""
+    functions = [
+        {"name": "swirl", "weight": 1.0},
+        {"name": "horseshoe", "weight": 0.5},
+    ]
+
+    def point_steps(system: TransformationSystem, rng: random.Random) -> None:
+        point, color = Point(0.1, 0.2), 0.0
+        for _ in range(samples):
+            point, color = system.transform_point(point, color, rng)
+
+    def float_steps(system: TransformationSystem, rng: random.Random) -> None:
+        x, y, color = 0.1, 0.2, 0.0
+        for _ in range(samples):
+            x, y, color = system.transform_xy(x, y, color, rng)
+
+    def setup_for(steps: Callable) -> Callable[[], Callable]:
+        def setup() -> Callable:
+            system = TransformationSystem(functions, AFFINE_PARAMS)
+            rng = random.Random(SEED)
+            return lambda: steps(system, rng)
+
+        return setup
+
+    return [
+        Benchmark(f"scalar_step/{kind}", "samples", samples, setup_for(steps))
+        for kind, steps in (("point", point_steps), ("floats", float_steps))
+    ]
+
+
+def add_point_benchmarks(samples: int) -> list[Benchmark]:
+    """add_point по точке для обеих гистограмм с симметрией и без."""
+    rng = np.random.default_rng(SEED)
+    points = [Point(x, y) for x, y in rng.uniform(-2, 2, (samples, 2)).tolist()]
+    color = 0.5
+
+    def setup_for(histogram_class: type, symmetry_level: int) -> Callable[[], Callable]:
+        def setup() -> Callable:
+            hist = histogram_class(*HISTOGRAM_SIZE, symmetry_level=symmetry_level)
+
+            def run() -> None:
+                for point in points:
+                    hist.add_point(point, color)
+
+            return run
+
+        return setup
+
+    return [
+        Benchmark(
+            f"add_point/{kind}/symmetry_{level}",
+            "samples",
+            samples,
+            setup_for(histogram_class, level),
+        )
+        for kind, histogram_class in (("dict", Histogram), ("dense", DenseHistogram))
+        for level in SYMMETRY_LEVELS
+    ]
+
+
+def merge_benchmarks(samples: int) -> list[Benchmark]:
+    """_merge_histograms для N гистограмм процессов."""
+    config = Config()
+    engine = FractalEngine(config)
+    rng = np.random.default_rng(SEED)
+
+    def filled(histogram_class: type) -> Histogram | DenseHistogram:
+        hist = histogram_class(*HISTOGRAM_SIZE)
+        hist.add_points(
+            rng.uniform(-2, 2, samples),
+            rng.uniform(-2, 2, samples),
+            rng.random(samples),
+        )
+        return hist
+
+    def setup_for(histogram_class: type, workers: int) -> Callable[[], Callable]:
+        def setup() -> Callable:
+            # Слияние меняет первую гистограмму, поэтому набор новый на каждый замер
+            histograms = [filled(histogram_class) for _ in range(workers)]
+            return lambda: engine._merge_histograms(histograms)
+
+        return setup
+
+    return [
+        Benchmark(
+            f"merge/{kind}/workers_{workers}",
+            "histograms",
+            workers,
+            setup_for(histogram_class, workers),
+        )
+        for kind, histogram_class in (("dict", Histogram), ("dense", DenseHistogram))
+        for workers in WORKER_COUNTS
+    ]
+
+
+def hist_to_image_benchmarks(fill: float) -> list[Benchmark]:
+    """_hist_to_image для плотной гистограммы на нескольких разрешениях."""
+
+    def setup_for(width: int, height: int) -> Callable[[], Callable]:
+        def setup() -> Callable:
+            rng = np.random.default_rng(SEED)
+            hist = DenseHistogram(width, height)
+            hit = rng.random((height, width)) < fill
+            hist.counts[hit] = rng.integers(1, 10_000, int(hit.sum()))
+            hist.colors[hit] = rng.random(int(hit.sum())) * hist.counts[hit]
+            exporter = ImageExporter(width, height, 2.2, "benchmark.png")
+            return lambda: exporter._hist_to_image(hist)
+
+        return setup
+
+    return [
+        Benchmark(
+            f"hist_to_image/{width}x{height}",
+            "pixels",
+            width * height,
+            setup_for(width, height),
+        )
+        for width, height in RESOLUTIONS
+    ]
+
+
+def scalar_generate_benchmarks(samples: int) -> list[Benchmark]:
+    """_single_thread_generate скалярного движка с симметрией и без.
+
+    Точка идет по горячему пути локальными float, без объектов Point на
+    итерацию: пик памяти - сама гистограмма, живых блоков на итерацию нет.
+    """
+
+    def setup_for(histogram: str, symmetry_level: int) -> Callable[[], Callable]:
+        def setup() -> Callable:
+            config = Config()
+            config.histogram = histogram
+            config.symmetry_level = symmetry_level
+            config.iteration_count = samples
+            config.width, config.height = HISTOGRAM_SIZE
+            config.seed = SEED
+            return FractalEngine(config)._single_thread_generate
+
+        return setup
+
+    return [
+        Benchmark(
+            f"generate/scalar/{histogram}/symmetry_{level}",
+            "samples",
+            samples,
+            setup_for(histogram, level),
+            trace_memory=True,
+        )
+        for histogram in ("dict", "dense")
+        for level in SYMMETRY_LEVELS
+    ]
+
+
+def parallel_backend_benchmarks(samples: int) -> list[Benchmark]:
+    """Полная генерация движком batch в пуле процессов и в пуле потоков.
+
+    Время включает запуск пула и сбор гистограмм, ради них и сравнение.
+    """
+
+    def setup_for(backend: str, workers: int) -> Callable[[], Callable]:
+        def setup() -> Callable:
+            config = Config()
+            config.engine = "batch"
+            config.histogram = "dense"
+            config.parallel_backend = backend
+            config.threads = workers
+            config.iteration_count = samples
+            config.width, config.height = HISTOGRAM_SIZE
+            config.seed = SEED
+            return FractalEngine(config).generate
+
+        return setup
+
+    return [
+        Benchmark(
+            f"generate/{backend}/workers_{workers}",
+            "samples",
+            samples,
+            setup_for(backend, workers),
+        )
+        for backend in PARALLEL_BACKENDS
+        for workers in WORKER_COUNTS
+    ]
+
+
+def worker_chunk_benchmarks(samples: int) -> list[Benchmark]:
+    """Первый чанк движка batch при разбиении на workers процессов.
+
+    Скорость чанка в одном процессе должна быть близка к workers_1: если
+    чанки считают слишком маленькие массивы, параллельный рендер медленнее
+    однопроцессного, даже когда ядер хватает.
+    """
+
+    def setup_for(workers: int) -> tuple[int, Callable[[], Callable]]:
+        config = Config()
+        config.engine = "batch"
+        config.histogram = "dense"
+        config.threads = workers
+        config.iteration_count = samples
+        config.width, config.height = HISTOGRAM_SIZE
+        config.seed = SEED
+        engine = FractalEngine(config)
+        chunk = engine._create_worker_args()[0]
+
+        def setup() -> Callable:
+            return lambda: engine._worker(chunk)
+
+        return engine._chunk_iterations(*chunk), setup
+
+    benchmarks = []
+    for workers in (1, *WORKER_COUNTS):
+        items, setup = setup_for(workers)
+        benchmarks.append(
+            Benchmark(
+                f"generate/batch/chunk/workers_{workers}", "samples", items, setup
+            )
+        )
+    return benchmarks
+
+
+def collect(*, quick: bool) -> list[Benchmark]:
+    """Все замеры, quick уменьшает объем для быстрой проверки."""
+    scale = 10 if quick else 1
+    return [
+        *transform_point_benchmarks(50_000 // scale),
+        *point_benchmarks(200_000 // scale),
+        *scalar_step_benchmarks(50_000 // scale),
+        *add_point_benchmarks(50_000 // scale),
+        *merge_benchmarks(200_000 // scale),
+        *hist_to_image_benchmarks(0.3),
+        *scalar_generate_benchmarks(100_000 // scale),
+        *parallel_backend_benchmarks(2_000_000 // scale),
+        *worker_chunk_benchmarks(4_000_000 // scale),
+    ]
+
+
+def metadata() -> dict:
+    """Окружение запуска, без него результаты разных машин не сравнить."""
+    return {
+        "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Замеры, скорость которых упала больше чем на tolerance от базовой."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        change = result["rate"] / base["rate"] - 1
+        if change < -tolerance:
+            regressions.append(f"{name}: {change:+.1%}")
+    return regressions
+
+
+def main() -> int:
+    """Запускает замеры, сохраняет JSON и сравнивает с базовым запуском."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-o", "--output", default="benchmark.json", help="Файл для результатов"
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Число повторов")
+    parser.add_argument("-k", "--filter", default="", help="Подстрока имени замера")
+    parser.add_argument(
+        "--quick", action="store_true", help="Уменьшенный объем замеров"
+    )
+    parser.add_argument("--compare", help="JSON прошлого запуска для сравнения")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="Допустимое падение скорости относительно --compare",
+    )
+    args = parser.parse_args()
+
+    # Логи замеряемых функций искажают время и засоряют вывод
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = {}
+    for benchmark in collect(quick=args.quick):
+        if args.filter not in benchmark.name:
+            continue
+        results[benchmark.name] = benchmark.measure(args.repeat)
+        result = results[benchmark.name]
+        memory = (
+            f"  {result['peak_bytes_per_item']:.1f} B/{result['unit']}"
+            if "peak_bytes_per_item" in result
+            else ""
+        )
+        print(
+            f"{benchmark.name:<40} {result['rate']:>14,.0f} {result['unit']}/s"
+            f"  best {result['best_s']:.4f}s{memory}"
+        )
+
+    with Path(args.output).open("w", encoding="utf-8") as f:
+        json.dump({"meta": metadata(), "results": results}, f, indent=2)
+
+    if args.compare:
+        with Path(args.compare).open(encoding="utf-8") as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        for regression in regressions:
+            print(f"Регрессия {regression}")
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import argparse
+import json
+import multiprocessing as mp
+import sys
+from itertools import pairwise
+from multiprocessing.pool import Pool
+from pathlib import Path
+
+from config import Config
+from engine import FractalEngine, create_pool
+from image import ImageExporter
+from logger_config import logger
+from measure import measure_time
+
+
+def load_frames(spec: dict) -> list[Config]:
+    """Конфиги кадров: явный список frames или интерполяция keyframes.
+
+    Поля кадра накладываются на общий base, выходной файл нумеруется.
+    """
+    base = spec.get("base", {})
+    if "frames" in spec:
+        frames = spec["frames"]
+    elif "keyframes" in spec:
+        frames = interpolate_keyframes(spec["keyframes"])
+    else:
+        msg = "В описании анимации нет ни frames, ни keyframes"
+        raise ValueError(msg)
+
+    configs = []
+    for index, frame in enumerate(frames):
+        config = Config.from_dict({**base, **frame})
+        config.output_path = numbered_path(config.output_path, index)
+        configs.append(config)
+
+    return configs
+
+
+def interpolate_keyframes(keyframes: list[dict]) -> list[dict]:
+    """Кадры между ключевыми с линейной интерполяцией числовых полей.
+
+    Номер кадра задается полем frame, строки и флаги берутся
+    из предыдущего ключевого кадра.
+    """
+    keyframes = sorted(keyframes, key=lambda keyframe: keyframe["frame"])
+
+    frames = []
+    for start, end in pairwise(keyframes):
+        span = end["frame"] - start["frame"]
+        frames.extend(_lerp(start, end, step / span) for step in range(span))
+    frames.append(keyframes[-1])
+
+    return [
+        {key: value for key, value in frame.items() if key != "frame"}
+        for frame in frames
+    ]
+
+
+def _lerp(start: object, end: object, t: float) -> object:
+    """Линейная интерполяция чисел, словарей и списков одинаковой формы."""
+    if isinstance(start, bool) or isinstance(end, bool):
+        return start
+    if isinstance(start, int) and isinstance(end, int):
+        return round(start + (end - start) * t)
+    if isinstance(start, int | float) and isinstance(end, int | float):
+        return start + (end - start) * t
+    if isinstance(start, dict) and isinstance(end, dict):
+        return {
+            key: _lerp(value, end[key], t) if key in end else value
+            for key, value in start.items()
+        }
+    if isinstance(start, list) and isinstance(end, list) and len(start) == len(end):
+        return [_lerp(a, b, t) for a, b in zip(start, end, strict=True)]
+    return start
+
+
+def numbered_path(path: str, index: int) -> str:
+    """Путь кадра с номером: result.png -> result_0000.png."""
+    path = Path(path)
+    return str(path.with_name(f"{path.stem}_{index:04d}{path.suffix}"))
+
+
+def render_frame(config: Config, pool: Pool | None = None, processes: int = 0) -> str:
+    """Генерирует и сохраняет один кадр, возвращает путь до файла.
+
+    processes - число процессов общего пула pool.
+    """
+    engine = FractalEngine(config, pool=pool, processes=processes)
+    exporter = ImageExporter(
+        config.width,
+        config.height,
+        config.gamma,
+        config.output_path,
+        oversample=config.oversample,
+        density=config.density_estimation(),
+        tile_size=config.tile_size,
+        tone=config.tone_mapping(),
+        encoding=config.encoding(),
+    )
+
+    hist = engine.generate()
+    exporter.save(hist)
+
+    return config.output_path
+
+
+class FrameRenderer:
+    """Рендер серии кадров с одним пулом процессов на всю серию."""
+
+    def __init__(self, processes: int, *, parallel_frames: bool = False) -> None:
+        self.processes = processes
+        # True - кадры параллельно по одному на процесс,
+        # False - кадры по очереди, каждый делится между процессами пула
+        self.parallel_frames = parallel_frames
+
+    @measure_time("Все кадры созданы.")
+    def render(self, frames: list[Config]) -> list[str]:
+        """Рендерит кадры по порядку, возвращает пути в порядке кадров."""
+        with create_pool(self.processes) as pool:
+            if self.parallel_frames:
+                # Процессы пула не могут создавать свои пулы
+                for config in frames:
+                    config.threads = 1
+                return pool.map(render_frame, frames, chunksize=1)
+
+            paths = []
+            for index, config in enumerate(frames):
+                paths.append(render_frame(config, pool, self.processes))
+                logger.info(f"Кадр {index + 1}/{len(frames)} сохранен")
+            return paths
+
+
+@measure_time("Генерация анимации завершена.")
+def main() -> None:
+    """Точка входа в рендер серии кадров."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-c",
+        "--config",
+        required=True,
+        help="Путь до JSON с описанием кадров: base и frames или keyframes",
+    )
+    parser.add_argument(
+        "-p",
+        "--processes",
+        type=int,
+        default=mp.cpu_count(),
+        help="Размер общего пула процессов",
+    )
+    parser.add_argument(
+        "--parallel-frames",
+        action="store_true",
+        help="Рендерить кадры параллельно, по одному на процесс",
+    )
+    args = parser.parse_args()
+
+    try:
+        with Path(args.config).open(encoding="utf-8") as f:
+            frames = load_frames(json.load(f))
+        logger.info(f"Кадров в серии: {len(frames)}")
+
+        renderer = FrameRenderer(args.processes, parallel_frames=args.parallel_frames)
+        renderer.render(frames)
+    except KeyboardInterrupt:
+        logger.info("Программа прервана пользователем")
+        sys.exit(130)
+    except Exception as e:  # noqa: BLE001
+        logger.critical(e)
+        return 1
+    else:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
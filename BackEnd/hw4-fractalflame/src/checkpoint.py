@@ -0,0 +1,84 @@
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from histogram import DenseHistogram
+
+# 2 - отдельные генераторы групп точек вместо одного общего,
+# 3 - индекс цвета в палитре вместо RGB
+CHECKPOINT_VERSION = 3
+
+
+@dataclass
+class Checkpoint:
+    """Состояние прерываемой генерации: гистограмма, точки и генераторы групп."""
+
+    hist: DenseHistogram
+    iterations: int
+    xs: np.ndarray
+    ys: np.ndarray
+    colors: np.ndarray
+    rng_state: list[dict]
+
+
+def save_checkpoint(path: str, checkpoint: Checkpoint) -> None:
+    """Атомарно сохраняет чекпоинт в бинарный .npz файл."""
+    hist = checkpoint.hist
+    tmp_path = Path(f"{path}.tmp")
+
+    # Пишем во временный файл, чтобы прерывание не испортило прошлый чекпоинт
+    with tmp_path.open("wb") as f:
+        np.savez(
+            f,
+            version=CHECKPOINT_VERSION,
+            symmetry_level=hist.symmetry_level,
+            mirror=hist.mirror,
+            counts=hist.counts,
+            colors=hist.colors,
+            iterations=checkpoint.iterations,
+            xs=checkpoint.xs,
+            ys=checkpoint.ys,
+            walker_colors=checkpoint.colors,
+            rng_state=json.dumps(checkpoint.rng_state),
+        )
+    tmp_path.replace(path)
+
+
+def load_checkpoint(
+    path: str, gamma: float, symmetry_level: int, *, mirror: bool = False
+) -> Checkpoint:
+    """Загружает чекпоинт, проверяя совместимость с текущей генерацией."""
+    with np.load(path) as data:
+        if int(data["version"]) != CHECKPOINT_VERSION:
+            msg = f"Неподдерживаемая версия чекпоинта: {int(data['version'])}"
+            raise ValueError(msg)
+        if int(data["symmetry_level"]) != symmetry_level:
+            msg = "Уровень симметрии чекпоинта не совпадает с конфигом"
+            raise ValueError(msg)
+        # Чекпоинты без поля mirror сохранены до появления отражений
+        if "mirror" in data and bool(data["mirror"]) != mirror:
+            msg = "Зеркальная симметрия чекпоинта не совпадает с конфигом"
+            raise ValueError(msg)
+
+        counts = data["counts"]
+        height, width = counts.shape
+        hist = DenseHistogram(
+            width,
+            height,
+            gamma,
+            symmetry_level,
+            counts=counts,
+            colors=data["colors"],
+            mirror=mirror,
+        )
+
+        return Checkpoint(
+            hist=hist,
+            iterations=int(data["iterations"]),
+            xs=data["xs"],
+            ys=data["ys"],
+            colors=data["walker_colors"],
+            rng_state=json.loads(str(data["rng_state"])),
+        )
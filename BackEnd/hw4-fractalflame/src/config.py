@@ -2,7 +2,13 @@ import argparse
 import json
 from pathlib import Path
 
+from filters import DensityEstimation
+from image import ToneMapping
+from image_writer import Encoding
 from logger_config import logger
+from palette import PALETTES
+from preview import PreviewOptions
+from render_cache import RenderCache
 
 
 class Config:
@@ -16,6 +22,8 @@ class Config:
         self.iteration_count = 250000
         self.output_path = "result.png"
         self.threads = 1
+        # Необязательные поля функции: color - индекс цвета, affine - свое
+        # аффинное преобразование вместо affine_params, post - после вариации
         self.functions = [
             {"name": "swirl", "weight": 1.0},
             {"name": "horseshoe", "weight": 0.8},
@@ -29,7 +37,80 @@ class Config:
             "f": 0.6,
         }
         self.gamma = 2.2
+        # Яркость пикселя log(count + 1) / brightness_scale, меньше - ярче
+        self.brightness_scale = 10.0
+        # Имя палитры или список цветов "#rrggbb" / [r, g, b] для индексов цвета
+        self.palette = "flame"
+        # Цветов в таблице палитры
+        self.palette_size = 256
         self.symmetry_level = 1
+        # Добавлять отражения к поворотам симметрии
+        self.mirror = False
+        # scalar - точка за итерацию, batch - пачка независимых точек в NumPy
+        self.engine = "scalar"
+        # Точек во всей пачке движка batch, делятся между процессами группами
+        self.batch_size = 4096
+        # Итераций разгона каждой точки до выхода на аттрактор, не отрисовываются
+        self.burn_in = 20
+        # dict - словарь по пикселям, dense - плотные массивы NumPy
+        self.histogram = "dict"
+        # process - процессы возвращают гистограммы через pickle,
+        # shared_memory - процессы пишут в свои срезы разделяемой памяти,
+        # thread - потоки пишут в свои гистограммы, нужен движок batch
+        self.parallel_backend = "process"
+        # Остановка, когда относительное изменение плотности после чанка
+        # меньше порога, iteration_count - верхний предел. 0 - выключено
+        self.convergence_threshold = 0.0
+        # Итераций в чанке задачи для пула, 0 - по несколько чанков на процесс
+        self.chunk_size = 0
+        # Путь до чекпоинта, None - без чекпоинтов
+        self.checkpoint_path = None
+        self.checkpoint_interval = 10_000_000
+        self.resume = False
+        # Гистограмма накапливается в oversample раз крупнее по каждой оси
+        self.oversample = 1
+        # Размытие по плотности: радиус в пикселях изображения, 0 - выключено
+        self.de_radius = 0.0
+        self.de_min_radius = 0.0
+        self.de_curve = 0.4
+        # Режим тайлов: гистограмма в файле на диске, изображение собирается
+        # полосами по tile_size строк, 0 - выключено
+        self.tile_size = 0
+        # Каталог для файла гистограммы, None - временный каталог системы
+        self.tile_dir = None
+        # Файл .npz с гистограммой для повторной тональной обработки,
+        # None - не сохранять
+        self.histogram_path = None
+        # Кодирование изображения, формат берется из расширения output_path:
+        # PNG и TIFF пишутся полосами строк, WebP и остальные - через PIL,
+        # .npy - линейный кадр float32 без ограничения яркости и гаммы
+        self.compress_level = 6
+        self.quality = 90
+        # Бит на канал для PNG и TIFF: 8 или 16
+        self.bit_depth = 8
+        # Каталог кэша гистограмм по хэшу конфига, None - без кэша
+        self.cache_dir = None
+        # Предел размера кэша, старые файлы вытесняются
+        self.cache_max_mb = 1024
+        # False - не использовать кэш в этом запуске, даже если задан cache_dir
+        self.cache = True
+        # Предпросмотр незавершенного рендера: файл PNG и/или порт HTTP,
+        # None - выключено. Снимок в preview_scale раз меньше изображения
+        self.preview_path = None
+        self.preview_port = None
+        self.preview_interval = 5.0
+        self.preview_scale = 4
+        # JSON с замерами этапов генерации, None - не сохранять
+        self.metrics_path = None
+        # Файл статистики cProfile, None - без профилирования
+        self.profile_path = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Config":
+        """Конфиг из словаря в формате JSON-конфига поверх значений по умолчанию."""
+        config = cls()
+        config._apply_json(data)  # noqa: SLF001
+        return config
 
     def load_with_priority(self) -> None:
         """Приоритетная загрузка конфига."""
@@ -45,6 +126,42 @@ class Config:
 
         self._apply_cli_args(args)
 
+    def density_estimation(self) -> DensityEstimation | None:
+        """Параметры размытия по плотности в пикселях гистограммы."""
+        if self.de_radius <= 0:
+            return None
+
+        return DensityEstimation(
+            self.de_radius, self.de_min_radius, self.de_curve
+        ).scaled(self.oversample)
+
+    def render_cache(self) -> RenderCache | None:
+        """Кэш гистограмм, None если он выключен."""
+        if not self.cache or not self.cache_dir:
+            return None
+
+        return RenderCache(self.cache_dir, self.cache_max_mb * 1024 * 1024)
+
+    def preview(self) -> PreviewOptions | None:
+        """Параметры предпросмотра, None если он выключен."""
+        if not self.preview_path and self.preview_port is None:
+            return None
+
+        return PreviewOptions(
+            self.preview_path,
+            self.preview_port,
+            self.preview_interval,
+            self.preview_scale,
+        )
+
+    def encoding(self) -> Encoding:
+        """Параметры кодирования файла изображения."""
+        return Encoding(self.compress_level, self.quality, self.bit_depth)
+
+    def tone_mapping(self) -> ToneMapping:
+        """Параметры перевода гистограммы в цвета."""
+        return ToneMapping(self.brightness_scale, self.palette, self.palette_size)
+
     @staticmethod
     def _parse_cli_args() -> argparse.Namespace:
         """Парсер аргументов."""
@@ -112,10 +229,244 @@ class Config:
             "-g", "--gamma", type=float, help="Гамма коррекция", default=None
         )
 
+        parser.add_argument(
+            "--brightness-scale",
+            type=float,
+            help="Делитель логарифма плотности при расчете яркости, меньше - ярче",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--palette",
+            type=str,
+            help=f"Палитра: {', '.join(PALETTES)} или цвета #rrggbb через запятую",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--palette-size", type=int, help="Цветов в таблице палитры", default=None
+        )
+
         parser.add_argument(
             "-S", "--symmetry-level", type=int, help="Уровень симметрий", default=None
         )
 
+        parser.add_argument(
+            "--mirror",
+            action="store_true",
+            help="Добавить зеркальные отражения к симметрии поворотов",
+            default=None,
+        )
+
+        parser.add_argument(
+            "-e",
+            "--engine",
+            choices=["scalar", "batch"],
+            help="Движок генерации: scalar - по одной точке, batch - пачками NumPy",
+            default=None,
+        )
+
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            type=int,
+            help="Количество независимых точек в пачке для движка batch",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--burn-in",
+            type=int,
+            help="Неотрисовываемых итераций разгона каждой точки",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--histogram",
+            choices=["dict", "dense"],
+            help="Хранение гистограммы: dict - словарь, dense - массивы NumPy",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--parallel-backend",
+            choices=["process", "shared_memory", "thread"],
+            help="Процессы или потоки и способ сбора их гистограмм при threads > 1",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--convergence-threshold",
+            type=float,
+            help="Порог относительного изменения изображения для ранней остановки",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Количество итераций в одной задаче для пула процессов",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--checkpoint",
+            dest="checkpoint_path",
+            type=str,
+            help="Путь до файла чекпоинта гистограммы (.npz)",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--checkpoint-interval",
+            type=int,
+            help="Количество итераций между сохранениями чекпоинта",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Продолжить генерацию с существующего чекпоинта",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--oversample",
+            type=int,
+            help="Во сколько раз гистограмма крупнее изображения по каждой оси",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--de-radius",
+            type=float,
+            help="Максимальный радиус размытия по плотности, 0 - выключено",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--de-min-radius",
+            type=float,
+            help="Минимальный радиус размытия по плотности",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--de-curve",
+            type=float,
+            help="Скорость уменьшения радиуса размытия с ростом плотности",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--tile-size",
+            type=int,
+            help="Высота полосы в режиме тайлов для изображений больше памяти",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--tile-dir",
+            type=str,
+            help="Каталог для файла гистограммы в режиме тайлов",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--save-histogram",
+            dest="histogram_path",
+            type=str,
+            help="Путь для .npz с гистограммой, которую можно перетонировать retone",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--compress-level",
+            type=int,
+            choices=range(10),
+            help="Уровень сжатия PNG: 0 - быстрее всего, 9 - меньше файл",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--quality", type=int, help="Качество WebP, 100 - без потерь", default=None
+        )
+
+        parser.add_argument(
+            "--bit-depth",
+            type=int,
+            choices=(8, 16),
+            help="Бит на канал для PNG и TIFF",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--cache-dir",
+            type=str,
+            help="Каталог кэша гистограмм, одинаковые конфиги не рендерятся заново",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--cache-max-mb",
+            type=int,
+            help="Предел размера кэша в мегабайтах",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--no-cache",
+            dest="cache",
+            action="store_false",
+            help="Не читать и не пополнять кэш в этом запуске",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--preview-path",
+            type=str,
+            help="Файл PNG, в который пишется снимок незавершенного рендера",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--preview-port",
+            type=int,
+            help="Порт локального HTTP-сервера со снимком незавершенного рендера",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--preview-interval",
+            type=float,
+            help="Секунд между снимками предпросмотра",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--preview-scale",
+            type=int,
+            help="Во сколько раз снимок предпросмотра меньше изображения",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--metrics",
+            dest="metrics_path",
+            type=str,
+            help="Путь для JSON с замерами этапов, скорости и памяти",
+            default=None,
+        )
+
+        parser.add_argument(
+            "--profile",
+            dest="profile_path",
+            type=str,
+            help="Путь для статистики cProfile (читается через pstats)",
+            default=None,
+        )
+
         parser.add_argument(
             "-c",
             "--config",
@@ -134,7 +485,40 @@ class Config:
             "output_path",
             "threads",
             "gamma",
+            "brightness_scale",
+            "palette",
+            "palette_size",
             "symmetry_level",
+            "mirror",
+            "engine",
+            "batch_size",
+            "burn_in",
+            "histogram",
+            "parallel_backend",
+            "convergence_threshold",
+            "chunk_size",
+            "checkpoint_path",
+            "checkpoint_interval",
+            "resume",
+            "oversample",
+            "de_radius",
+            "de_min_radius",
+            "de_curve",
+            "tile_size",
+            "tile_dir",
+            "histogram_path",
+            "compress_level",
+            "quality",
+            "bit_depth",
+            "cache_dir",
+            "cache_max_mb",
+            "cache",
+            "preview_path",
+            "preview_port",
+            "preview_interval",
+            "preview_scale",
+            "metrics_path",
+            "profile_path",
         ]
         for attr in args:
             value = getattr(cli_args, attr, None)
@@ -205,7 +589,52 @@ class Config:
                 self.affine_params = json_config["affine_params"]
             if "gamma" in json_config:
                 self.gamma = json_config["gamma"]
+            self.brightness_scale = json_config.get(
+                "brightness_scale", self.brightness_scale
+            )
+            self.palette = json_config.get("palette", self.palette)
+            self.palette_size = json_config.get("palette_size", self.palette_size)
             if "symmetry_level" in json_config:
                 self.symmetry_level = json_config["symmetry_level"]
+            self.mirror = json_config.get("mirror", self.mirror)
+            self.engine = json_config.get("engine", self.engine)
+            self.batch_size = json_config.get("batch_size", self.batch_size)
+            self.burn_in = json_config.get("burn_in", self.burn_in)
+            self.histogram = json_config.get("histogram", self.histogram)
+            self.parallel_backend = json_config.get(
+                "parallel_backend", self.parallel_backend
+            )
+            self.convergence_threshold = json_config.get(
+                "convergence_threshold", self.convergence_threshold
+            )
+            self.chunk_size = json_config.get("chunk_size", self.chunk_size)
+            self.checkpoint_path = json_config.get(
+                "checkpoint_path", self.checkpoint_path
+            )
+            self.checkpoint_interval = json_config.get(
+                "checkpoint_interval", self.checkpoint_interval
+            )
+            self.resume = json_config.get("resume", self.resume)
+            self.oversample = json_config.get("oversample", self.oversample)
+            self.de_radius = json_config.get("de_radius", self.de_radius)
+            self.de_min_radius = json_config.get("de_min_radius", self.de_min_radius)
+            self.de_curve = json_config.get("de_curve", self.de_curve)
+            self.tile_size = json_config.get("tile_size", self.tile_size)
+            self.tile_dir = json_config.get("tile_dir", self.tile_dir)
+            self.histogram_path = json_config.get("histogram_path", self.histogram_path)
+            self.compress_level = json_config.get("compress_level", self.compress_level)
+            self.quality = json_config.get("quality", self.quality)
+            self.bit_depth = json_config.get("bit_depth", self.bit_depth)
+            self.cache_dir = json_config.get("cache_dir", self.cache_dir)
+            self.cache_max_mb = json_config.get("cache_max_mb", self.cache_max_mb)
+            self._apply_preview_json(json_config.get("preview", {}))
+            self.metrics_path = json_config.get("metrics_path", self.metrics_path)
         except (AttributeError, ValueError, KeyError, TypeError) as e:
             logger.warning(f"Ошибка json конфига: {e}")
+
+    def _apply_preview_json(self, preview: dict) -> None:
+        """Объект preview в JSON: path, port, interval и scale."""
+        self.preview_path = preview.get("path", self.preview_path)
+        self.preview_port = preview.get("port", self.preview_port)
+        self.preview_interval = preview.get("interval", self.preview_interval)
+        self.preview_scale = preview.get("scale", self.preview_scale)
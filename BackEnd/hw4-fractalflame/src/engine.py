@@ -1,111 +1,751 @@
 import multiprocessing as mp
-import random
+import pickle
+import threading
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.pool import Pool
+from pathlib import Path
 
+from checkpoint import Checkpoint, load_checkpoint, save_checkpoint
 from config import Config
-from histogram import Histogram
+from filters import downsample, log_density, relative_change
+from histogram import BaseHistogram, DenseHistogram, Histogram, pixels_to_arrays
 from logger_config import logger
-from measure import measure_time
-from models import Color, Point
+from measure import measure_time, metrics
+from rng import (
+    GROUP_SIZE,
+    SCALAR_STREAM_ITERATIONS,
+    WalkerStreams,
+    quantize_color,
+    quantize_colors,
+    scalar_generator,
+)
+from shared_histogram import FileHistogramBuffer, SharedHistogramBuffer
 from transform import TransformationSystem
 
+# Сколько чанков в среднем достается процессу, если chunk_size не задан
+CHUNKS_PER_WORKER = 4
+# Примерное число шагов точки batch. Точек берется столько пачек, чтобы
+# их можно было считать параллельно, но каждая точка делает достаточно шагов,
+# чтобы разгон burn_in занимал малую долю работы
+WALKER_STEPS = 256
+
+# Номер среза процесса пула в буфере гистограмм, задается в create_pool
+_WORKER = {"slot": 0}
+
+
+def create_pool(processes: int) -> Pool:
+    """Пул процессов, в котором каждый процесс получает свой номер среза."""
+    counter = mp.Value("i", 0)
+    return mp.Pool(processes, initializer=_init_worker, initargs=(counter,))
+
+
+def _init_worker(counter: mp.Value) -> None:
+    """Выдает процессу пула следующий свободный номер среза."""
+    with counter.get_lock():
+        _WORKER["slot"] = counter.value
+        counter.value += 1
+
 
 class FractalEngine:
     """Класс для генерирования."""
 
-    def __init__(self, config: Config) -> None:
+    def __init__(
+        self, config: Config, pool: Pool | None = None, processes: int = 0
+    ) -> None:
+        if pool is not None and processes < 1:
+            msg = "Для общего пула нужно число его процессов"
+            raise ValueError(msg)
+
         self.config = config
         self.transform = TransformationSystem(config.functions, config.affine_params)
+        # Общий пул процессов для серии кадров и число процессов в нем,
+        # None - свой пул на генерацию
+        self.pool = pool
+        self.pool_processes = processes
+        # True - последняя генерация продолжила сохраненный чекпоинт
+        self.resumed = False
+        # Срез буфера гистограмм, в который пишут задачи этого движка.
+        # В процессе пула задается в _measured_task, в родителе всегда 0
+        self._slot = 0
+        # Текущие гистограммы генерации для snapshot, None - генерация не идет
+        self._live = None
+        self._live_lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        """Пул и источник снимков не передаются в процессы вместе с движком."""
+        state = self.__dict__.copy()
+        state["pool"] = None
+        state["_live"] = None
+        del state["_live_lock"]
+        return state
 
-    def generate(self) -> Histogram:
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._live_lock = threading.Lock()
+
+    def generate(self) -> BaseHistogram:
         """Точка входа в генерацию."""
         try:
-            if self.config.threads == 1:
+            if self._checkpoints_enabled():
+                return self._checkpointed_generate()
+            if self._convergence_enabled():
+                return self._converging_generate()
+            if self.config.tile_size:
+                # Гистограмма на диске, процессы пишут в общий срез файла полосами
+                return self._shared_memory_generate()
+            # Общий пул серии кадров используется и при threads=1
+            if self.config.threads == 1 and self.pool is None:
                 return self._single_thread_generate()
             return self._multi_thread_generate()
         except (ValueError, AttributeError, ArithmeticError) as e:
             logger.critical(f"Гистограмма не была создана: {e}")
+        finally:
+            self._publish(None)
 
-    @measure_time("Гистограмма создана.")
-    def _single_thread_generate(self) -> Histogram:
-        hist = Histogram(
-            self.config.width,
-            self.config.height,
+    def snapshot(self, factor: int = 1) -> tuple | None:
+        """Копия счетчиков и сумм цветов текущей генерации, меньше в factor раз.
+
+        Вызывается из другого потока. Генерация не останавливается, поэтому
+        снимок может захватить гистограмму посреди добавления точек.
+        None - генерация не идет или еще не дала данных.
+        """
+        with self._live_lock:
+            if self._live is None:
+                return None
+            # Представления разделяемой памяти освобождаются до снятия блокировки
+            return self._sum_snapshots(self._live(), factor)
+
+    @classmethod
+    def _sum_snapshots(cls, histograms: list, factor: int) -> tuple | None:
+        """Сумма уменьшенных копий гистограмм, None - гистограмм еще нет."""
+        counts = colors = None
+        for hist in histograms:
+            part_counts, part_colors = downsample(*cls._snapshot_arrays(hist), factor)
+            if counts is None:
+                counts, colors = part_counts.copy(), part_colors.copy()
+            else:
+                counts += part_counts
+                colors += part_colors
+
+        return None if counts is None else (counts, colors)
+
+    @staticmethod
+    def _snapshot_arrays(hist: BaseHistogram) -> tuple:
+        """Массивы гистограммы, словарь предварительно копируется."""
+        if isinstance(hist, Histogram):
+            # Копия словаря делается под GIL целиком, генерация может добавлять
+            # в него пиксели в это время
+            return pixels_to_arrays(hist.data.copy(), hist.width, hist.height)
+        return hist.counts, hist.colors
+
+    def _publish(self, source: Callable[[], list] | None) -> None:
+        """Задает функцию, возвращающую текущие гистограммы генерации."""
+        with self._live_lock:
+            self._live = source
+
+    def _create_histogram(self) -> BaseHistogram:
+        """Создает гистограмму выбранного в конфиге типа."""
+        histogram_class = (
+            DenseHistogram if self.config.histogram == "dense" else Histogram
+        )
+        width, height = self._hist_size()
+        return histogram_class(
+            width,
+            height,
             self.config.gamma,
             self.config.symmetry_level,
+            mirror=self.config.mirror,
         )
-        random.seed(self.config.seed)
-        point = Point(random.uniform(-1, 1), random.uniform(-1, 1))
-        color = Color(0, 0, 0)
 
-        for _ in range(self.config.iteration_count):
-            point, color = self.transform.transform_point(point, color)
+    def _hist_size(self) -> tuple[int, int]:
+        """Ширина и высота гистограммы с учетом суперсэмплинга."""
+        return (
+            self.config.width * self.config.oversample,
+            self.config.height * self.config.oversample,
+        )
 
-            hist.add_point(point, color)
+    @measure_time("Гистограмма создана.")
+    def _single_thread_generate(self) -> BaseHistogram:
+        hist = self._create_histogram()
+        self._publish(lambda: [hist])
+        self._iterate(hist, 0, self._unit_count())
 
         return hist
 
-    def _multi_thread_generate(self) -> Histogram:
+    def _iterate(self, hist: BaseHistogram, first: int, stop: int) -> None:
+        """Прогоняет chaos game единиц работы с first по stop, не включая stop.
+
+        Единица работы - группа точек движка batch или поток скалярного движка,
+        у каждой свой генератор, поэтому результат не зависит от разбиения.
+        """
+        with metrics.stage("iterate"):
+            if self.config.engine == "batch":
+                walkers, steps = self._walker_plan()
+                # Группы идут пачками по batch_size точек: на маленьких массивах
+                # NumPy тратит время на вызовы, на больших - на промахи кэша
+                per_batch = self._batch_groups()
+                for start in range(first, stop, per_batch):
+                    groups = range(start, min(start + per_batch, stop))
+                    streams = WalkerStreams(self.config.seed, groups, walkers)
+                    batch = self._burn_in(streams, streams.spawn())
+                    self._batch_iterate(hist, streams, batch, range(steps))
+                return
+
+            for stream in range(first, stop):
+                self._iterate_stream(hist, stream)
+
+    def _iterate_stream(self, hist: BaseHistogram, stream: int) -> None:
+        """Скалярный chaos game одной точкой на своем генераторе потока."""
+        rng = scalar_generator(self.config.seed, stream)
+        iter_count = min(
+            SCALAR_STREAM_ITERATIONS,
+            self.config.iteration_count - stream * SCALAR_STREAM_ITERATIONS,
+        )
+
+        # Точка в локальных переменных: на горячем пути без объектов Point
+        x, y = rng.uniform(-1, 1), rng.uniform(-1, 1)
+        color = 0.0
+        transform_xy = self.transform.transform_xy
+
+        # Точка без отрисовки выходит на аттрактор из случайного старта
+        for _ in range(self.config.burn_in):
+            x, y, color = transform_xy(x, y, color, rng)
+
+        for _ in range(iter_count):
+            x, y, color = transform_xy(x, y, color, rng)
+
+            hist.add_xy(x, y, quantize_color(color))
+
+    def _walker_plan(self) -> tuple[int, int]:
+        """Число всех точек и шагов, за которые они наберут все итерации.
+
+        Точек целое число пачек batch_size, чтобы пачки считались в разных
+        процессах. Число зависит только от конфига, но не от числа процессов,
+        поэтому рендер воспроизводим. С чекпоинтами точек одна пачка при любом
+        iteration_count: уточнение продолжает те же точки новыми шагами.
+        """
+        total = self.config.iteration_count
+        if self.checkpointed():
+            walkers = max(1, self.config.batch_size)
+        else:
+            batch = max(1, min(self.config.batch_size, total))
+            walkers = batch * max(1, round(total / (batch * WALKER_STEPS)))
+        return walkers, -(-total // walkers)
+
+    def _batch_groups(self) -> int:
+        """Групп точек в одной пачке batch_size."""
+        return max(
+            1, -(-min(self.config.batch_size, self._walker_plan()[0]) // GROUP_SIZE)
+        )
+
+    def _burn_in(self, streams: WalkerStreams, walkers: tuple) -> tuple:
+        """Разгон точек без отрисовки, пока они не выйдут на аттрактор."""
+        xs, ys, colors = walkers
+        for _ in range(self.config.burn_in):
+            xs, ys, colors = self.transform.transform_batch(xs, ys, colors, streams)
+        return xs, ys, colors
+
+    def _batch_iterate(
+        self,
+        hist: BaseHistogram,
+        streams: WalkerStreams,
+        walkers: tuple,
+        steps: range,
+    ) -> tuple:
+        """Шаги steps chaos game для групп streams, одна итерация на точку за шаг.
+
+        Возвращает состояние точек, чтобы продолжить генерацию с того же места.
+        """
+        total_walkers, total_steps = self._walker_plan()
+        # На последнем шаге отрисовываются только недостающие итерации,
+        # они достаются первым точкам всей пачки
+        last_take = min(
+            max(
+                0,
+                self.config.iteration_count
+                - (total_steps - 1) * total_walkers
+                - streams.start,
+            ),
+            streams.size,
+        )
+
+        xs, ys, colors = walkers
+        for step in steps:
+            xs, ys, colors = self.transform.transform_batch(xs, ys, colors, streams)
+
+            take = last_take if step == total_steps - 1 else xs.size
+            hist.add_points(xs[:take], ys[:take], quantize_colors(colors[:take]))
+
+        return xs, ys, colors
+
+    def _unit_count(self) -> int:
+        """Число единиц работы: групп точек batch или потоков скалярного движка."""
+        if self.config.engine == "batch":
+            walkers, _ = self._walker_plan()
+            return -(-walkers // GROUP_SIZE)
+        return max(1, -(-self.config.iteration_count // SCALAR_STREAM_ITERATIONS))
+
+    def _chunk_iterations(self, first: int, stop: int) -> int:
+        """Итераций, отрисованных единицами работы с first по stop."""
+        total = self.config.iteration_count
+        if self.config.engine == "batch":
+            walkers, steps = self._walker_plan()
+            start = first * GROUP_SIZE
+            end = min(stop * GROUP_SIZE, walkers)
+            last_take = total - (steps - 1) * walkers
+            return (end - start) * (steps - 1) + min(
+                max(0, last_take - start), end - start
+            )
+        return sum(
+            min(SCALAR_STREAM_ITERATIONS, total - stream * SCALAR_STREAM_ITERATIONS)
+            for stream in range(first, stop)
+        )
+
+    def _unit_iterations(self) -> int:
+        """Итераций в одной полной единице работы."""
+        if self.config.engine == "batch":
+            walkers, steps = self._walker_plan()
+            return min(GROUP_SIZE, walkers) * steps
+        return SCALAR_STREAM_ITERATIONS
+
+    def stops_early(self) -> bool:
+        """Остановится ли генерация по сходимости в этом режиме работы.
+
+        Порог сходимости действует только там, где чанки сливаются по порядку,
+        а чекпоинты проверяются раньше и его отключают.
+        """
+        if not self.config.convergence_threshold or not self._convergence_supported():
+            return False
+        return not self.checkpointed()
+
+    def checkpointed(self) -> bool:
+        """Пойдет ли генерация с чекпоинтами, у нее свой план точек batch."""
+        return bool(self.config.checkpoint_path) and self._checkpoints_supported()
+
+    def _checkpoints_supported(self) -> bool:
+        return self.config.engine == "batch" and self.config.threads == 1
+
+    def _convergence_supported(self) -> bool:
+        return not self.config.tile_size and (
+            self.config.threads == 1 or self.config.parallel_backend == "process"
+        )
+
+    def _checkpoints_enabled(self) -> bool:
+        """Чекпоинты поддерживаются для однопоточного движка batch."""
+        if not self.config.checkpoint_path:
+            return False
+        if self._checkpoints_supported():
+            return True
+
+        logger.warning("Чекпоинты поддерживаются только при engine=batch и threads=1")
+        return False
+
+    @measure_time("Гистограмма создана.")
+    def _checkpointed_generate(self) -> DenseHistogram:
+        """Генерация с периодическим сохранением чекпоинтов."""
+        checkpoint = self._start_checkpoint()
+        streams = self._checkpoint_streams()
+        streams.state = checkpoint.rng_state
+        walkers = (checkpoint.xs, checkpoint.ys, checkpoint.colors)
+        total = self.config.iteration_count
+        walker_count, steps = self._walker_plan()
+        self._publish(lambda: [checkpoint.hist])
+
+        # Чекпоинт сохраняется между шагами пачки
+        interval = max(1, self.config.checkpoint_interval // walker_count)
+        done = -(-checkpoint.iterations // walker_count)
+        while done < steps:
+            step_range = range(done, min(done + interval, steps))
+            with metrics.stage("iterate"):
+                walkers = self._batch_iterate(
+                    checkpoint.hist, streams, walkers, step_range
+                )
+            done = step_range.stop
+
+            checkpoint.xs, checkpoint.ys, checkpoint.colors = walkers
+            checkpoint.iterations = min(done * walker_count, total)
+            checkpoint.rng_state = streams.state
+            with metrics.stage("checkpoint_save"):
+                save_checkpoint(self.config.checkpoint_path, checkpoint)
+            logger.info(f"Чекпоинт сохранен: {checkpoint.iterations}/{total} итераций")
+
+        return checkpoint.hist
+
+    def _checkpoint_streams(self) -> WalkerStreams:
+        """Генераторы всех групп точек, чекпоинт ведет их в одном процессе."""
+        walkers, _ = self._walker_plan()
+        return WalkerStreams(self.config.seed, range(self._unit_count()), walkers)
+
+    def _start_checkpoint(self) -> Checkpoint:
+        """Загружает чекпоинт при --resume или начинает генерацию заново."""
+        path = self.config.checkpoint_path
+        self.resumed = self.config.resume and Path(path).exists()
+        if self.resumed:
+            checkpoint = load_checkpoint(
+                path,
+                self.config.gamma,
+                self.config.symmetry_level,
+                mirror=self.config.mirror,
+            )
+            width, height = self._hist_size()
+            if checkpoint.hist.counts.shape != (height, width):
+                msg = "Размер изображения чекпоинта не совпадает с конфигом"
+                raise ValueError(msg)
+            if checkpoint.xs.size != self._walker_plan()[0]:
+                msg = "Размер пачки точек чекпоинта не совпадает с конфигом"
+                raise ValueError(msg)
+
+            logger.info(f"Продолжаем с чекпоинта: {checkpoint.iterations} итераций")
+            return checkpoint
+
+        if self.config.resume:
+            logger.warning(f"Чекпоинт {path} не найден, генерация начинается заново")
+
+        streams = self._checkpoint_streams()
+        xs, ys, colors = self._burn_in(streams, streams.spawn())
+        return Checkpoint(
+            hist=DenseHistogram(
+                *self._hist_size(),
+                self.config.gamma,
+                self.config.symmetry_level,
+                mirror=self.config.mirror,
+            ),
+            iterations=0,
+            xs=xs,
+            ys=ys,
+            colors=colors,
+            rng_state=streams.state,
+        )
+
+    def _convergence_enabled(self) -> bool:
+        """Остановка по сходимости сливает гистограммы чанков в родителе."""
+        if not self.config.convergence_threshold:
+            return False
+        if self._convergence_supported():
+            return True
+
+        logger.warning(
+            "Остановка по сходимости поддерживается только при "
+            "parallel_backend=process без тайлов"
+        )
+        return False
+
+    @measure_time("Гистограмма создана.")
+    def _converging_generate(self) -> BaseHistogram:
+        """Генерация до сходимости изображения, iteration_count - верхний предел.
+
+        Без chunk_size чанк - одна пачка точек batch или один поток скалярного
+        движка. Чанки сливаются по порядку, поэтому точка остановки не зависит
+        от числа процессов.
+        """
+        units = self._unit_count()
+        per_chunk = self._batch_groups() if self.config.engine == "batch" else 1
+        chunks = (
+            self._create_worker_args()
+            if self.config.chunk_size
+            else [
+                (first, min(first + per_chunk, units))
+                for first in range(0, units, per_chunk)
+            ]
+        )
+        if self.pool is not None or self.config.threads == 1:
+            return self._converge(chunks, self.pool)
+
+        with metrics.stage("worker_spawn"):
+            pool = create_pool(self.config.threads)
+        with pool:
+            return self._converge(chunks, pool)
+
+    def _converge(self, chunks: list[tuple], pool: Pool | None) -> BaseHistogram:
+        """Сливает чанки по порядку, пока изменение плотности не станет меньше порога.
+
+        Чанки раздаются волнами по числу процессов, чтобы после остановки
+        пул не считал лишнего.
+        """
+        merged_hist = None
+        density = None
+        iterations = 0
+        wave = self._pool_size() if pool is not None else 1
+        self._publish(lambda: [merged_hist] if merged_hist is not None else [])
+
+        for start in range(0, len(chunks), wave):
+            batch = chunks[start : start + wave]
+            for chunk, hist in zip(batch, self._map_ordered(pool, batch), strict=True):
+                if merged_hist is None:
+                    merged_hist = hist
+                else:
+                    with metrics.stage("merge"):
+                        merged_hist.merge(hist)
+                iterations += self._chunk_iterations(*chunk)
+
+                previous = density
+                density = log_density(merged_hist.count_array(), iterations)
+                if previous is None:
+                    continue
+
+                change = relative_change(previous, density)
+                if change < self.config.convergence_threshold:
+                    logger.info(
+                        f"Изображение сошлось за {iterations} итераций, "
+                        f"изменение {change:.4f}"
+                    )
+                    metrics.record("iterations", iterations)
+                    return merged_hist
+
+        logger.info("Изображение не сошлось до предела итераций")
+        metrics.record("iterations", iterations)
+        return merged_hist
+
+    def _map_ordered(self, pool: Pool | None, chunks: list[tuple]) -> Iterator:
+        """Гистограммы чанков в порядке чанков, без пула - в этом процессе."""
+        if pool is None:
+            return map(self._worker, chunks)
+        return self._run_tasks(
+            pool, [(self._worker.__name__, chunk) for chunk in chunks], ordered=True
+        )
+
+    def _multi_thread_generate(self) -> BaseHistogram:
         try:
-            worker_args = self._create_worker_args()
+            if self.config.parallel_backend == "shared_memory":
+                return self._shared_memory_generate()
+            if self.config.parallel_backend == "thread":
+                return self._thread_generate()
 
-            logger.info(f"Созданно {self.config.threads} процесса")
+            chunks = self._create_worker_args()
 
-            # Запускаем нужное число процессов - _worker
-            with mp.Pool(processes=self.config.threads) as pool:
-                workers = pool.map(self._worker, worker_args)
+            logger.info(f"Работают {self._pool_size()} процесса")
 
-            return self._merge_histograms(workers)
+            return self._merge_chunks(chunks)
         except (mp.TimeoutError, mp.ProcessError, MemoryError) as e:
             logger.critical(e)
 
+    def _merge_chunks(self, chunks: list[tuple]) -> BaseHistogram:
+        """Добавляет гистограммы чанков в итоговую по мере готовности.
+
+        В памяти нет гистограмм всех чанков сразу, только уже готовые в пути.
+        """
+        merged_hist = None
+        self._publish(lambda: [merged_hist] if merged_hist is not None else [])
+        for done, hist in enumerate(self._imap(self._worker, chunks), start=1):
+            if merged_hist is None:
+                merged_hist = hist
+            else:
+                with metrics.stage("merge"):
+                    merged_hist.merge(hist)
+            self._log_progress(done, len(chunks))
+
+        return merged_hist
+
+    def _imap(self, func: callable, args: list) -> Iterator:
+        """Выполняет задачи в пуле, отдавая результаты в порядке готовности.
+
+        Без общего пула и при threads=1 задачи выполняются в этом процессе.
+        """
+        if self.pool is None and self.config.threads == 1:
+            yield from map(func, args)
+            return
+
+        tasks = [(func.__name__, arg) for arg in args]
+        if self.pool is not None:
+            yield from self._run_tasks(self.pool, tasks)
+            return
+
+        with metrics.stage("worker_spawn"):
+            pool = create_pool(self.config.threads)
+        with pool:
+            yield from self._run_tasks(pool, tasks)
+
+    def _run_tasks(
+        self, pool: Pool, tasks: list[tuple], *, ordered: bool = False
+    ) -> Iterator:
+        """Раздает задачи пулу и отдает результаты вместе с замерами процессов.
+
+        ordered - результаты в порядке задач, иначе в порядке готовности.
+        """
+        imap = pool.imap if ordered else pool.imap_unordered
+        for payload, stages in imap(self._measured_task, tasks):
+            metrics.merge_stages(stages)
+            with metrics.stage("unpickle"):
+                # Данные получены от собственных процессов пула
+                result = pickle.loads(payload)  # noqa: S301
+            yield result
+
+    def _measured_task(self, task: tuple) -> tuple:
+        """Выполняет задачу в процессе пула, сериализуя результат под замером."""
+        name, args = task
+        metrics.reset()
+        self._slot = _WORKER["slot"]
+        result = getattr(self, name)(args)
+
+        with metrics.stage("pickle"):
+            payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        return payload, metrics.stages
+
     def _create_worker_args(self) -> list[tuple]:
-        worker_iter = self.config.iteration_count // self.config.threads
+        """Делит единицы работы на чанки: первая и следующая за последней.
+
+        chunk_size в итерациях округляется до целого числа единиц работы.
+        Без него чанк движка batch не меньше пачки, иначе процессы считают
+        массивы по одной группе.
+        """
+        units = self._unit_count()
+        if self.config.chunk_size:
+            per_chunk = max(1, round(self.config.chunk_size / self._unit_iterations()))
+        else:
+            per_chunk = -(-units // (self._pool_size() * CHUNKS_PER_WORKER))
+            if self.config.engine == "batch":
+                per_chunk = max(per_chunk, self._batch_groups())
 
-        return [(worker_id, worker_iter) for worker_id in range(self.config.threads)]
+        return [
+            (first, min(first + per_chunk, units))
+            for first in range(0, units, per_chunk)
+        ]
 
-    @measure_time("Один из процессов выполнил свою работу.")
-    def _worker(self, args: tuple) -> Histogram:
+    def _log_progress(self, done: int, total: int) -> None:
+        """Пишет в лог долю готовых чанков при переходе через каждые 10%."""
+        if done * 10 // total > (done - 1) * 10 // total:
+            logger.info(f"Готово чанков: {done}/{total} ({done / total:.0%})")
+
+    @measure_time("Процесс обработал чанк.")
+    def _worker(self, args: tuple) -> BaseHistogram:
         """Независмый генератор."""
-        worker_id, iter_count = args
-        local_hist = Histogram(
-            self.config.width,
-            self.config.height,
-            self.config.gamma,
-            self.config.symmetry_level,
-        )
+        first, stop = args
+        local_hist = self._create_histogram()
 
-        random.seed(self.config.seed + worker_id)
+        self._iterate(local_hist, first, stop)
 
-        point = Point(random.uniform(-1, 1), random.uniform(-1, 1))
-        color = Color(0, 0, 0)
+        return local_hist
 
-        for _ in range(iter_count):
-            point, color = self.transform.transform_point(point, color)
+    def _thread_generate(self) -> BaseHistogram:
+        """Потоки пишут в свои гистограммы, в конце они суммируются.
 
-            local_hist.add_point(point, color)
+        Операции NumPy движка batch отпускают GIL, поэтому потоки считают
+        параллельно без запуска процессов и pickle гистограмм.
+        """
+        if self.config.engine != "batch":
+            logger.warning("Скалярный движок упирается в GIL, потоки его не ускорят")
 
-        return local_hist
+        chunks = self._create_worker_args()
+        # Гистограмма каждого потока, поток пишет только в свою
+        histograms = {}
+        lock = threading.Lock()
+        self._publish(lambda: list(histograms.values()))
+
+        def run(chunk: tuple) -> None:
+            thread_id = threading.get_ident()
+            with lock:
+                if thread_id not in histograms:
+                    histograms[thread_id] = self._create_histogram()
+            self._thread_worker(histograms[thread_id], chunk)
+
+        logger.info(f"Созданно {self.config.threads} потока")
+
+        with ThreadPoolExecutor(self.config.threads) as executor:
+            for done, _ in enumerate(executor.map(run, chunks), start=1):
+                self._log_progress(done, len(chunks))
+
+        return self._merge_histograms(list(histograms.values()))
+
+    @measure_time("Поток обработал чанк.")
+    def _thread_worker(self, hist: BaseHistogram, chunk: tuple) -> None:
+        """Независмый генератор, пишущий в гистограмму своего потока."""
+        first, stop = chunk
+        self._iterate(hist, first, stop)
+
+    def _shared_memory_generate(self) -> DenseHistogram:
+        """Процессы пишут в свои срезы разделяемой памяти, родитель их суммирует."""
+        buffer = self._create_buffer(slots=self._pool_size())
+        try:
+            chunks = [
+                (first, stop, buffer.name, buffer.slots)
+                for first, stop in self._create_worker_args()
+            ]
+
+            logger.info(f"Работают {self._pool_size()} процесса")
+            # Процессы пишут в срезы, пока родитель читает их для снимка
+            self._publish(lambda: self._buffer_slots(buffer))
+
+            for done, _ in enumerate(self._imap(self._shared_worker, chunks), start=1):
+                self._log_progress(done, len(chunks))
+
+            # Сведение файла в режиме тайлов меняет первый срез на месте
+            self._publish(None)
+            return self._reduce_shared(buffer)
+        finally:
+            self._publish(None)
+            buffer.close()
+            buffer.unlink()
+
+    def _buffer_slots(self, buffer: SharedHistogramBuffer) -> list:
+        """Гистограммы-представления срезов всех процессов буфера."""
+        return [
+            buffer.slot(
+                index,
+                self.config.gamma,
+                self.config.symmetry_level,
+                mirror=self.config.mirror,
+            )
+            for index in range(buffer.slots)
+        ]
+
+    @measure_time("Процесс обработал чанк.")
+    def _shared_worker(self, args: tuple) -> int:
+        """Независмый генератор, пишущий в срез разделяемой памяти своего процесса.
+
+        Процесс выполняет чанки по очереди, поэтому срез не пишут двое сразу.
+        """
+        first, stop, name, slots = args
+        buffer = self._create_buffer(slots, name)
+        try:
+            # Гистограмма-представление не должна пережить закрытие буфера
+            hist = buffer.slot(
+                self._slot,
+                self.config.gamma,
+                self.config.symmetry_level,
+                mirror=self.config.mirror,
+            )
+            self._iterate(hist, first, stop)
+            hist.flush()
+            del hist
+        finally:
+            buffer.close()
 
-    @measure_time("Гистограммы обедединены.")
-    def _merge_histograms(self, histograms: list) -> Histogram:
+        return stop - first
+
+    def _pool_size(self) -> int:
+        """Число процессов, которые могут писать в срезы буфера."""
+        if self.pool is not None:
+            return self.pool_processes
+        return self.config.threads
+
+    def _create_buffer(
+        self, slots: int, name: str | None = None
+    ) -> SharedHistogramBuffer:
+        """Срезы процессов в разделяемой памяти или, в режиме тайлов, в файле."""
+        width, height = self._hist_size()
+        if self.config.tile_size:
+            return FileHistogramBuffer(
+                slots,
+                width,
+                height,
+                name=name,
+                directory=self.config.tile_dir,
+                tile_rows=self.config.tile_size * self.config.oversample,
+            )
+        return SharedHistogramBuffer(slots, width, height, name=name)
+
+    @measure_time("Гистограммы обедединены.", stage="merge")
+    def _reduce_shared(self, buffer: SharedHistogramBuffer) -> DenseHistogram:
+        return buffer.reduce(
+            self.config.gamma, self.config.symmetry_level, mirror=self.config.mirror
+        )
+
+    @measure_time("Гистограммы обедединены.", stage="merge")
+    def _merge_histograms(self, histograms: list) -> BaseHistogram:
         merged_hist = histograms[0]
 
         for hist in histograms[1:]:
-            for (x, y), data in hist.data.items():
-                if (x, y) in merged_hist.data:
-                    # Суммируем count и color
-                    merged_hist.data[(x, y)]["count"] += data["count"]
-                    old_color = merged_hist.data[(x, y)]["color"]
-                    merged_hist.data[(x, y)]["color"] = (
-                        old_color[0] + data["color"][0],
-                        old_color[1] + data["color"][1],
-                        old_color[2] + data["color"][2],
-                    )
-                else:
-                    # Копируем данные
-                    merged_hist.data[(x, y)] = {
-                        "count": data["count"],
-                        "color": data["color"],
-                    }
+            merged_hist.merge(hist)
 
         return merged_hist
@@ -0,0 +1,119 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class DensityEstimation:
+    """Параметры адаптивного размытия: радиус ядра падает с ростом плотности.
+
+    Радиус пикселя - radius / count ** curve, но не меньше min_radius.
+    Радиусы заданы в пикселях гистограммы.
+    """
+
+    radius: float = 9.0
+    min_radius: float = 0.0
+    curve: float = 0.4
+
+    def scaled(self, oversample: int) -> "DensityEstimation":
+        """Те же параметры с радиусами из пикселей изображения в пиксели гистограммы."""
+        return DensityEstimation(
+            self.radius * oversample, self.min_radius * oversample, self.curve
+        )
+
+    def reach(self) -> int:
+        """Сколько пикселей вокруг себя может задеть ядро, при curve >= 0."""
+        return int(np.rint(max(self.radius, self.min_radius)))
+
+
+def density_estimation(
+    counts: np.ndarray, colors: np.ndarray, params: DensityEstimation
+) -> tuple:
+    """Размывает редкие пиксели шире плотных, сохраняя сумму попаданий.
+
+    Каждый пиксель раскладывается своим квадратным ядром, поэтому
+    пиксели группируются по целому радиусу и каждая группа размывается
+    одним проходом по всему кадру.
+    """
+    counts = counts.astype(np.float64)
+    hit = counts > 0
+
+    # Радиус ядра для каждого пикселя, пустые пиксели ничего не размывают
+    with np.errstate(divide="ignore"):
+        widths = params.radius / np.power(np.maximum(counts, 1.0), params.curve)
+    widths = np.maximum(widths, params.min_radius)
+    levels = np.rint(widths).astype(np.int64)
+
+    blurred_counts = np.zeros_like(counts)
+    blurred_colors = np.zeros(colors.shape, dtype=np.float64)
+
+    for level in np.unique(levels[hit]).tolist():
+        mask = hit & (levels == level)
+        blurred_counts += box_blur(np.where(mask, counts, 0.0), level)
+        blurred_colors += box_blur(np.where(mask, colors, 0.0), level)
+
+    return blurred_counts, blurred_colors
+
+
+def log_density(counts: np.ndarray, samples: int) -> np.ndarray:
+    """Логарифм плотности попаданий относительно равномерной.
+
+    Нормировка на число итераций убирает рост яркости с числом точек,
+    поэтому меняется только форма изображения.
+    """
+    return np.log1p(counts * (counts.size / max(samples, 1)))
+
+
+def relative_change(previous: np.ndarray, current: np.ndarray) -> float:
+    """Сумма модулей разности двух изображений относительно суммы текущего."""
+    total = np.abs(current).sum()
+    if total == 0:
+        return math.inf
+    return float(np.abs(current - previous).sum() / total)
+
+
+def box_blur(data: np.ndarray, radius: int) -> np.ndarray:
+    """Нормированное квадратное размытие окном 2 * radius + 1 по двум осям."""
+    if radius <= 0:
+        return data.astype(np.float64)
+
+    return _box_blur_axis(_box_blur_axis(data, radius, 0), radius, 1)
+
+
+def _box_blur_axis(data: np.ndarray, radius: int, axis: int) -> np.ndarray:
+    """Скользящее среднее вдоль оси через накопленные суммы.
+
+    Края дополняются нулями, поэтому у границы часть энергии уходит за кадр.
+    """
+    size = data.shape[axis]
+    window = 2 * radius + 1
+
+    # Нулевой префикс, чтобы сумма окна была разностью двух накопленных сумм
+    pad = [(0, 0)] * data.ndim
+    pad[axis] = (1, 0)
+    cumsum = np.pad(np.cumsum(data, axis=axis, dtype=np.float64), pad)
+
+    index = np.arange(size)
+    upper = np.minimum(index + radius + 1, size)
+    lower = np.maximum(index - radius, 0)
+
+    window_sum = np.take(cumsum, upper, axis=axis) - np.take(cumsum, lower, axis=axis)
+    return window_sum / window
+
+
+def downsample(counts: np.ndarray, colors: np.ndarray, factor: int) -> tuple:
+    """Сворачивает блоки factor x factor в один пиксель, суммируя данные."""
+    if factor <= 1:
+        return counts, colors
+
+    height = counts.shape[0] // factor
+    width = counts.shape[1] // factor
+    # Лишние строки и столбцы не кратные factor отбрасываются
+    counts = counts[: height * factor, : width * factor]
+    colors = colors[: height * factor, : width * factor]
+
+    return (
+        counts.reshape(height, factor, width, factor).sum(axis=(1, 3)),
+        colors.reshape(height, factor, width, factor).sum(axis=(1, 3)),
+    )
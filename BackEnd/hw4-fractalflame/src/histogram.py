@@ -1,11 +1,28 @@
-import math
+from abc import ABC, abstractmethod
+
+import numpy as np
 
 from logger_config import logger
-from models import Color, Point
+from models import Point
 
 
-class Histogram:
-    """Класс сбора гистораммы для определения цвета."""
+def pixels_to_arrays(data: dict, width: int, height: int) -> tuple:
+    """Счетчики и суммы индексов цвета словаря пикселей в виде массивов."""
+    counts = np.zeros((height, width), dtype=np.int64)
+    colors = np.zeros((height, width), dtype=np.float64)
+    if data:
+        xs, ys = (np.array(axis) for axis in zip(*data.keys(), strict=True))
+        counts[ys, xs] = [pixel["count"] for pixel in data.values()]
+        colors[ys, xs] = [pixel["color"] for pixel in data.values()]
+
+    return counts, colors
+
+
+class BaseHistogram(ABC):
+    """Общая логика гистограмм: симметрия и перевод координат в пиксели.
+
+    Цвет точки - индекс в палитре от 0 до 1, пиксель хранит сумму индексов.
+    """
 
     def __init__(
         self,
@@ -13,61 +30,275 @@ class Histogram:
         height: int = 1080,
         gamma: float = 2.2,
         symmetry_level: int = 1,
+        *,
+        mirror: bool = False,
     ) -> None:
         self.width = width
         self.height = height
         self.gamma = gamma
-        self.data = {}
         self.symmetry_level = symmetry_level
+        self.mirror = mirror
+
+        # Матрицы симметрий считаются один раз, а не на каждую точку
+        self.symmetry = self._symmetry_matrices(symmetry_level, mirror=mirror)
+        self._symmetry_rows = self.symmetry.reshape(-1, 4).tolist()
+
+    @staticmethod
+    def _symmetry_matrices(symmetry_level: int, *, mirror: bool) -> np.ndarray:
+        """Матрицы 2x2 поворотов на 2pi/n и, при mirror, их отражений по оси X."""
+        angles = 2 * np.pi * np.arange(max(1, symmetry_level)) / max(1, symmetry_level)
+        cos_a = np.cos(angles)
+        sin_a = np.sin(angles)
+        matrices = np.stack(
+            (np.stack((cos_a, -sin_a), axis=-1), np.stack((sin_a, cos_a), axis=-1)),
+            axis=1,
+        )
 
-    def add_point(self, point: Point, color: Color) -> None:
+        if mirror:
+            # Отражение (x, -y) перед поворотом дает диэдральную группу
+            reflection = np.array([[1.0, 0.0], [0.0, -1.0]])
+            matrices = np.concatenate((matrices, matrices @ reflection))
+
+        return matrices
+
+    def add_point(self, point: Point, color: float) -> None:
         """Добавление точки в гистограмму."""
+        self.add_xy(point.x, point.y, color)
+
+    def add_xy(self, x: float, y: float, color: float) -> None:
+        """Добавление точки по координатам, без объекта Point."""
         try:
-            if self.symmetry_level <= 1:
-                self._add_single_point(point, color)
+            if len(self._symmetry_rows) == 1:
+                self._add_xy(x, y, color)
             else:
-                self._add_multi_points(point, color)
+                self._add_multi_points(x, y, color)
         except (KeyError, ValueError, TypeError) as e:
             logger.critical(e)
 
-    def _rotate_point(self, point: Point, angle: float) -> Point:
-        """Поворачивает точку на заданный угол вокруг центра."""
-        cos_a = math.cos(angle)
-        sin_a = math.sin(angle)
+    def add_points(self, xs: np.ndarray, ys: np.ndarray, colors: np.ndarray) -> None:
+        """Пакетное добавление точек в гистограмму."""
+        copies = self.symmetry.shape[0]
+        if copies == 1:
+            self._add_batch(xs, ys, colors)
+            return
 
-        x_new = point.x * cos_a - point.y * sin_a
-        y_new = point.x * sin_a + point.y * cos_a
+        # Все симметричные копии пачки одним умножением: (k, 2, 2) x (2, n)
+        rotated = self.symmetry @ np.stack((xs, ys))
+        self._add_batch(
+            rotated[:, 0].reshape(-1),
+            rotated[:, 1].reshape(-1),
+            np.broadcast_to(colors, (copies, *colors.shape)).reshape(-1),
+        )
 
-        return Point(x_new, y_new)
+    @abstractmethod
+    def merge(self, other: "BaseHistogram") -> None:
+        """Добавляет к гистограмме данные другой гистограммы."""
 
-    def _add_single_point(self, point: Point, color: Color) -> None:
-        """Добавление точки в гистограмму."""
+    def flush(self) -> None:  # noqa: B027
+        """Дописывает отложенные точки, у обычных гистограмм их нет."""
+
+    @abstractmethod
+    def fill_ratio(self) -> float:
+        """Доля пикселей, в которые попала хотя бы одна точка."""
+
+    @abstractmethod
+    def count_array(self) -> np.ndarray:
+        """Счетчики попаданий в виде массива height x width."""
+
+    @abstractmethod
+    def to_arrays(self) -> tuple:
+        """Счетчики и суммы индексов цвета в виде массивов height x width."""
+
+    def _pixel(self, px: float, py: float) -> tuple | None:
+        """Переводит координаты в пиксель, None если точка вне изображения."""
         # Координата в фрактале от -2 до 2
         # 4 ширина диапазона (от -2 до 2)
-        x = int((point.x + 2) * self.width / 4)
-        y = int((point.y + 2) * self.height / 4)
+        x = int((px + 2) * self.width / 4)
+        y = int((py + 2) * self.height / 4)
 
         if 0 <= x < self.width and 0 <= y < self.height:
-            key = (x, y)
+            return x, y
+        return None
+
+    def _to_pixels(self, xs: np.ndarray, ys: np.ndarray) -> tuple:
+        """Переводит координаты в пиксели, возвращает пиксели и маску попадания."""
+        with np.errstate(invalid="ignore", over="ignore"):
+            fx = (xs + 2) * self.width / 4
+            fy = (ys + 2) * self.height / 4
+            # int() отбрасывает дробную часть к нулю, поэтому (-1, 0) дает 0
+            inside = (fx > -1) & (fx < self.width) & (fy > -1) & (fy < self.height)
+
+        return fx[inside].astype(np.int64), fy[inside].astype(np.int64), inside
+
+    @abstractmethod
+    def _add_xy(self, x: float, y: float, color: float) -> None:
+        """Добавление точки без симметрии."""
+
+    @abstractmethod
+    def _add_batch(self, xs: np.ndarray, ys: np.ndarray, colors: np.ndarray) -> None:
+        """Добавление пачки точек без симметрии."""
+
+    def _add_multi_points(self, x: float, y: float, color: float) -> None:
+        # Зеркалим точку готовыми матрицами симметрий. Копии передаются
+        # координатами, без объекта Point на каждую
+        for a, b, c, d in self._symmetry_rows:
+            self._add_xy(a * x + b * y, c * x + d * y, color)
+
+
+class Histogram(BaseHistogram):
+    """Класс сбора гистораммы для определения цвета."""
+
+    def __init__(
+        self,
+        width: int = 1920,
+        height: int = 1080,
+        gamma: float = 2.2,
+        symmetry_level: int = 1,
+        *,
+        mirror: bool = False,
+    ) -> None:
+        super().__init__(width, height, gamma, symmetry_level, mirror=mirror)
+        self.data = {}
 
+    def merge(self, other: "Histogram") -> None:
+        """Добавляет к гистограмме данные другой гистограммы."""
+        for (x, y), data in other.data.items():
+            if (x, y) in self.data:
+                # Суммируем count и color
+                self.data[(x, y)]["count"] += data["count"]
+                self.data[(x, y)]["color"] += data["color"]
+            else:
+                # Копируем данные
+                self.data[(x, y)] = {
+                    "count": data["count"],
+                    "color": data["color"],
+                }
+
+    def fill_ratio(self) -> float:
+        """Доля пикселей, в которые попала хотя бы одна точка."""
+        return len(self.data) / (self.width * self.height)
+
+    def count_array(self) -> np.ndarray:
+        """Счетчики попаданий в виде массива height x width."""
+        counts = np.zeros((self.height, self.width), dtype=np.int64)
+        if self.data:
+            x, y = np.array(list(self.data.keys())).T
+            counts[y, x] = [pixel["count"] for pixel in self.data.values()]
+        return counts
+
+    def to_arrays(self) -> tuple:
+        """Счетчики и суммы индексов цвета в виде массивов height x width."""
+        return pixels_to_arrays(self.data, self.width, self.height)
+
+    def _add_xy(self, x: float, y: float, color: float) -> None:
+        """Добавление точки в гистограмму."""
+        key = self._pixel(x, y)
+
+        if key is not None:
             if key not in self.data:
-                self.data[key] = {"count": 1, "color": (color.r, color.g, color.b)}
+                self.data[key] = {"count": 1, "color": color}
             else:
                 # Увеличиваем счетчик попаданий в пиксель
                 self.data[key]["count"] += 1
                 # Обновляем цвет
-                old_color = self.data[key]["color"]
-                self.data[key]["color"] = (
-                    old_color[0] + color.r,
-                    old_color[1] + color.g,
-                    old_color[2] + color.b,
-                )
-
-    def _add_multi_points(self, point: Point, color: Color) -> None:
-        angle_step = 2 * math.pi / self.symmetry_level
-
-        # Зеркалим точку symmetry_level
-        for rotation in range(self.symmetry_level):
-            angle = rotation * angle_step
-            rotated_point = self._rotate_point(point, angle)
-            self._add_single_point(rotated_point, color)
+                self.data[key]["color"] += color
+
+    def _add_batch(self, xs: np.ndarray, ys: np.ndarray, colors: np.ndarray) -> None:
+        """Сворачивает пачку точек по пикселям и добавляет в словарь."""
+        x, y, inside = self._to_pixels(xs, ys)
+        keys, inverse = np.unique(y * self.width + x, return_inverse=True)
+        counts = np.bincount(inverse, minlength=keys.size)
+        sums = np.bincount(inverse, weights=colors[inside], minlength=keys.size)
+
+        for key, count, color in zip(
+            keys.tolist(), counts.tolist(), sums.tolist(), strict=True
+        ):
+            pixel = (key % self.width, key // self.width)
+            if pixel not in self.data:
+                self.data[pixel] = {"count": count, "color": color}
+            else:
+                self.data[pixel]["count"] += count
+                self.data[pixel]["color"] += color
+
+
+class DenseHistogram(BaseHistogram):
+    """Гистограмма на плотных массивах: счетчики и суммы индексов цвета."""
+
+    def __init__(
+        self,
+        width: int = 1920,
+        height: int = 1080,
+        gamma: float = 2.2,
+        symmetry_level: int = 1,
+        counts: np.ndarray | None = None,
+        colors: np.ndarray | None = None,
+        *,
+        mirror: bool = False,
+    ) -> None:
+        super().__init__(width, height, gamma, symmetry_level, mirror=mirror)
+        # Готовые массивы позволяют писать в чужую память, например разделяемую
+        if counts is None:
+            counts = np.zeros((height, width), dtype=np.int64)
+        if colors is None:
+            colors = np.zeros((height, width), dtype=np.float64)
+        self.counts = counts
+        self.colors = colors
+
+    def __getstate__(self) -> dict:
+        """Между процессами передаются только пиксели с попаданиями."""
+        state = self.__dict__.copy()
+        counts = state.pop("counts")
+        colors = state.pop("colors")
+        hit = np.flatnonzero(counts)
+
+        state["shape"] = counts.shape
+        state["hit"] = hit
+        state["hit_counts"] = counts.reshape(-1)[hit]
+        state["hit_colors"] = colors.reshape(-1)[hit]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        shape = state.pop("shape")
+        hit = state.pop("hit")
+        counts = np.zeros(shape, dtype=np.int64)
+        colors = np.zeros(shape, dtype=np.float64)
+        counts.reshape(-1)[hit] = state.pop("hit_counts")
+        colors.reshape(-1)[hit] = state.pop("hit_colors")
+
+        self.__dict__.update(state)
+        self.counts = counts
+        self.colors = colors
+
+    def merge(self, other: "DenseHistogram") -> None:
+        """Добавляет к гистограмме данные другой гистограммы."""
+        self.counts += other.counts
+        self.colors += other.colors
+
+    def fill_ratio(self) -> float:
+        """Доля пикселей, в которые попала хотя бы одна точка."""
+        return np.count_nonzero(self.counts) / self.counts.size
+
+    def count_array(self) -> np.ndarray:
+        """Счетчики попаданий в виде массива height x width."""
+        return self.counts
+
+    def to_arrays(self) -> tuple:
+        """Счетчики и суммы индексов цвета в виде массивов height x width."""
+        return self.counts, self.colors
+
+    def _add_xy(self, x: float, y: float, color: float) -> None:
+        """Добавление точки в гистограмму."""
+        pixel = self._pixel(x, y)
+
+        if pixel is not None:
+            px, py = pixel
+            self.counts[py, px] += 1
+            self.colors[py, px] += color
+
+    def _add_batch(self, xs: np.ndarray, ys: np.ndarray, colors: np.ndarray) -> None:
+        """Добавляет пачку точек, повторные попадания в пиксель суммируются."""
+        x, y, inside = self._to_pixels(xs, ys)
+        flat = y * self.width + x
+
+        np.add.at(self.counts.reshape(-1), flat, 1)
+        np.add.at(self.colors.reshape(-1), flat, colors[inside])
@@ -0,0 +1,72 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from histogram import BaseHistogram, DenseHistogram
+
+# 1 - суммы RGB, 2 - суммы индексов цвета в палитре
+HISTOGRAM_FILE_VERSION = 2
+
+
+@dataclass
+class HistogramFile:
+    """Гистограмма готового рендера и параметры, нужные для тональной обработки."""
+
+    hist: DenseHistogram
+    width: int
+    height: int
+    oversample: int
+
+
+def save_histogram(
+    path: str, hist: BaseHistogram, width: int, height: int, oversample: int = 1
+) -> None:
+    """Сохраняет гистограмму в несжатый .npz, чтобы загрузка занимала доли секунды.
+
+    width и height - размер изображения, гистограмма больше в oversample раз.
+    """
+    counts, colors = hist.to_arrays()
+    tmp_path = Path(f"{path}.tmp")
+
+    with tmp_path.open("wb") as f:
+        np.savez(
+            f,
+            version=HISTOGRAM_FILE_VERSION,
+            width=width,
+            height=height,
+            oversample=oversample,
+            gamma=hist.gamma,
+            symmetry_level=hist.symmetry_level,
+            mirror=hist.mirror,
+            counts=counts,
+            colors=colors,
+        )
+    tmp_path.replace(path)
+
+
+def load_histogram(path: str) -> HistogramFile:
+    """Загружает гистограмму, сохраненную save_histogram."""
+    with np.load(path) as data:
+        if int(data["version"]) != HISTOGRAM_FILE_VERSION:
+            msg = f"Неподдерживаемая версия файла гистограммы: {int(data['version'])}"
+            raise ValueError(msg)
+
+        counts = data["counts"]
+        hist_height, hist_width = counts.shape
+        hist = DenseHistogram(
+            hist_width,
+            hist_height,
+            float(data["gamma"]),
+            int(data["symmetry_level"]),
+            counts=counts,
+            colors=data["colors"],
+            mirror=bool(data["mirror"]),
+        )
+
+        return HistogramFile(
+            hist=hist,
+            width=int(data["width"]),
+            height=int(data["height"]),
+            oversample=int(data["oversample"]),
+        )
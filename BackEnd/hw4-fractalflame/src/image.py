@@ -1,76 +1,216 @@
-import math
+from collections.abc import Iterator
+from dataclasses import dataclass
 
+import numpy as np
 from PIL import Image
 
+from filters import DensityEstimation, density_estimation, downsample
+from histogram import BaseHistogram
+from image_writer import Encoding
 from logger_config import logger
-from measure import measure_time
+from measure import measure_time, metrics
+from palette import palette_lut
+
+
+@dataclass
+class ToneMapping:
+    """Параметры перевода гистограммы в цвета, которые не влияют на генерацию.
+
+    Их можно менять без повторного рендера через retone.
+    """
+
+    # Яркость пикселя log(count + 1) / brightness_scale, меньше - ярче
+    brightness_scale: float = 10.0
+    # Имя палитры или список цветов, см. palette.parse_palette
+    palette: str | list = "flame"
+    # Цветов в таблице палитры, по которой ищется средний индекс пикселя
+    palette_size: int = 256
+
+    def lut(self) -> np.ndarray:
+        """Таблица цветов палитры размера palette_size x 3."""
+        return palette_lut(self.palette, self.palette_size)
 
 
 class ImageExporter:
     """Класс для сохранения изображений."""
 
-    def __init__(self, width: int, height: int, gamma: float, path: str) -> None:
+    # Параметры кадра и обработки, редкие передаются по имени
+    def __init__(  # noqa: PLR0913
+        self,
+        width: int,
+        height: int,
+        gamma: float,
+        path: str,
+        oversample: int = 1,
+        density: DensityEstimation | None = None,
+        tile_size: int = 0,
+        tone: ToneMapping | None = None,
+        encoding: Encoding | None = None,
+    ) -> None:
         self.width = width
         self.height = height
         self.gamma = gamma
         self.path = path
-
-    def save(self, hist: dict) -> None:
+        # Гистограмма накапливается в oversample раз крупнее изображения
+        self.oversample = oversample
+        # None - без размытия по плотности
+        self.density = density
+        # Высота полосы изображения в режиме тайлов, 0 - кадр целиком
+        self.tile_size = tile_size
+        self.tone = tone if tone is not None else ToneMapping()
+        self._lut = self.tone.lut()
+        # Формат по расширению path, PNG и TIFF пишутся полосами строк
+        self.encoding = encoding if encoding is not None else Encoding()
+
+    def save(self, hist: BaseHistogram) -> None:
         """Преобразования и сохранение изображение."""
         try:
-            image = self._hist_to_image(hist)
-            image.save(self.path)
+            if self.encoding.streams(self.path):
+                self._stream(hist)
+            else:
+                options = self.encoding.pil_options(self.path)
+                image = self._hist_to_image(hist)
+                with metrics.stage("png_encode"):
+                    image.save(self.path, **options)
             logger.info(f"Изображение сохранено в файл {self.path}")
         except (PermissionError, IsADirectoryError) as e:
             logger.critical(e)
 
-    @measure_time("Изображение создано.")
-    def _hist_to_image(self, hist: dict) -> Image:
+    def rgb(self, counts: np.ndarray, colors: np.ndarray) -> np.ndarray:
+        """Кадр RGB по массивам гистограммы без записи в файл, например снимок."""
+        return self._tone_map(*self._filter(counts, colors))
+
+    def _stream(self, hist: BaseHistogram) -> None:
+        """Кодирует полосы в файл по мере тонирования, без полного изображения.
+
+        В режиме тайлов в памяти одновременно только одна полоса.
+        """
+        counts, colors = hist.to_arrays()
+        bands = self._bands(counts, colors)
+
+        with self.encoding.open_writer(self.path, self.width, self.height) as writer:
+            while True:
+                with metrics.stage("tone_map"):
+                    band = next(bands, None)
+                if band is None:
+                    break
+                with metrics.stage("png_encode"):
+                    writer.write_rows(band[1])
+
+    @measure_time("Изображение создано.", stage="tone_map")
+    def _hist_to_image(self, hist: BaseHistogram) -> Image:
         """Создание изображения по гистограмме."""
-        image = Image.new("RGB", (self.width, self.height), "black")
-        pixels = image.load()
-
-        for (x, y), color_data in hist.items():
-            try:
-                pixels[x, y] = self._calculate_pixel_color(color_data)
-            except (ValueError, ZeroDivisionError, TypeError):
-                pixels[x, y] = (0, 0, 0)
-
+        counts, colors = hist.to_arrays()
+        bands = self._bands(counts, colors)
+        if self.tile_size <= 0:
+            return Image.fromarray(next(bands)[1], "RGB")
+
+        image = Image.new("RGB", (self.width, self.height))
+        for top, rgb in bands:
+            image.paste(Image.fromarray(rgb, "RGB"), (0, top))
         return image
 
-    def _calculate_pixel_color(self, color_data: dict) -> tuple:
-        count = color_data["count"]
-        r_sum, g_sum, b_sum = color_data["color"]
-        # Средний цвет
-        avg_r = self._avg_color(r_sum, count)
-        avg_g = self._avg_color(g_sum, count)
-        avg_b = self._avg_color(b_sum, count)
-
-        # Яркость на основе count
-        brightness = self._brightness(count)
-
-        brightness = self._gamma_correction(brightness)  # гамма-коррекция
-
-        r = self._rgb_color(avg_r, brightness)
-        g = self._rgb_color(avg_g, brightness)
-        b = self._rgb_color(avg_b, brightness)
-
-        return (r, g, b)
-
-    def _gamma_correction(self, brightness: float) -> float:
+    def _bands(self, counts: np.ndarray, colors: np.ndarray) -> Iterator[tuple]:
+        """Полосы RGB кадра сверху вниз в виде (первая строка, массив)."""
+        if self.tile_size <= 0:
+            counts, colors = self._filter(counts, colors)
+            yield 0, self._tone_map(counts, colors)
+            return
+
+        yield from self._tiles(counts, colors)
+
+    def _tiles(self, counts: np.ndarray, colors: np.ndarray) -> Iterator[tuple]:
+        """Тонирует кадр полосами, читая из гистограммы только полосу.
+
+        Размытию по плотности нужны соседние строки, поэтому полоса
+        читается с запасом на радиус ядра и обрезается после фильтра.
+        """
+        halo = self.density.reach() if self.density is not None else 0
+        # Запас кратен oversample, чтобы блоки суперсэмплинга не сдвигались
+        halo = -(-halo // self.oversample) * self.oversample
+        hist_height = counts.shape[0]
+
+        for top in range(0, self.height, self.tile_size):
+            bottom = min(top + self.tile_size, self.height)
+            start = max(top * self.oversample - halo, 0)
+            stop = min(bottom * self.oversample + halo, hist_height)
+
+            tile_counts, tile_colors = self._filter(
+                np.asarray(counts[start:stop]), np.asarray(colors[start:stop])
+            )
+            # Обрезаем запас до строк полосы уже в пикселях изображения
+            offset = top - start // self.oversample
+            rows = slice(offset, offset + bottom - top)
+            yield top, self._tone_map(tile_counts[rows], tile_colors[rows])
+
+    def _filter(self, counts: np.ndarray, colors: np.ndarray) -> tuple:
+        """Размытие по плотности и сворачивание суперсэмплинга до размера кадра."""
+        if self.density is not None:
+            counts, colors = density_estimation(counts, colors, self.density)
+
+        return downsample(counts, colors, self.oversample)
+
+    def _tone_map(self, counts: np.ndarray, colors: np.ndarray) -> np.ndarray:
+        """Переводит весь кадр гистограммы в RGB: средний цвет, яркость, гамма."""
+        hdr = self.encoding.hdr(self.path)
+        rgb = np.zeros(
+            (*counts.shape, 3), dtype=np.float32 if hdr else self.encoding.dtype
+        )
+
+        # Считаем только по пикселям с попаданиями, пустые остаются черными
+        hit = np.flatnonzero(counts)
+        count = counts.reshape(-1)[hit]
+
+        with np.errstate(invalid="ignore", over="ignore"):
+            # Средний индекс цвета переводится в цвет палитры только здесь
+            avg = self._palette_color(
+                self._avg_color(colors.reshape(-1)[hit], count), self._lut
+            )
+
+            if hdr:
+                # Линейная яркость без ограничения и гаммы: экспозицию и гамму
+                # выбирают при обработке, значения больше 1 сохраняются
+                brightness = np.log(count + 1) / self.tone.brightness_scale
+                rgb.reshape(-1, 3)[hit] = np.nan_to_num(
+                    avg * brightness[:, np.newaxis], nan=0.0
+                )
+                return rgb
+
+            # Яркость на основе count
+            brightness = self._brightness(count, self.tone.brightness_scale)
+
+            brightness = self._gamma_correction(brightness)  # гамма-коррекция
+
+            rgb.reshape(-1, 3)[hit] = self._rgb_color(
+                avg, brightness[:, np.newaxis], self.encoding.max_value
+            )
+
+        return rgb
+
+    def _gamma_correction(self, brightness: np.ndarray) -> np.ndarray:
         return brightness ** (1.0 / self.gamma)
 
     @staticmethod
-    def _avg_color(color_sum: float, count: int) -> float:
+    def _avg_color(color_sum: np.ndarray, count: np.ndarray) -> np.ndarray:
         return color_sum / count
 
     @staticmethod
-    def _brightness(count: int) -> float:
-        brightness_scale = 10
+    def _palette_color(index: np.ndarray, lut: np.ndarray) -> np.ndarray:
+        # Невалидный индекс дает nan, и пиксель становится черным в _rgb_color
+        valid = np.isfinite(index)
+        position = np.rint(np.clip(np.where(valid, index, 0), 0, 1) * (len(lut) - 1))
+        return np.where(valid[:, np.newaxis], lut[position.astype(np.intp)], np.nan)
+
+    @staticmethod
+    def _brightness(count: np.ndarray, brightness_scale: float = 10.0) -> np.ndarray:
         # Добавляем 1, что бы логарифм не дал ошибку
-        return min(1.0, math.log(count + 1) / brightness_scale)
+        return np.minimum(1.0, np.log(count + 1) / brightness_scale)
 
     @staticmethod
-    def _rgb_color(avg_color: float, brightness: float) -> int:
-        rgb_max_size = 255
-        return int(avg_color * brightness * rgb_max_size)
+    def _rgb_color(
+        avg_color: np.ndarray, brightness: np.ndarray, rgb_max_size: int = 255
+    ) -> np.ndarray:
+        rgb = avg_color * brightness * rgb_max_size
+        # Невалидные значения дают черный, дробная часть отбрасывается как в int()
+        rgb = np.where(np.isfinite(rgb), rgb, 0)
+        return np.clip(rgb, 0, rgb_max_size).astype(np.uint16)
@@ -0,0 +1,269 @@
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Тип цвета PNG для RGB без альфа-канала
+PNG_COLOR_RGB = 2
+# Строк в блоке фильтрации
+PNG_FILTER_ROWS = 256
+
+TIFF_HEADER_SIZE = 8
+TIFF_SHORT = 3
+TIFF_LONG = 4
+
+BIT_DEPTHS = (8, 16)
+WEBP_LOSSLESS_QUALITY = 100
+# Линейный кадр float32 без ограничения яркости для последующей обработки
+HDR_FORMAT = ".npy"
+# Форматы с построчной записью, остальные сохраняет PIL целиком
+STREAMING_FORMATS = (".png", ".tif", ".tiff", HDR_FORMAT)
+
+
+@dataclass
+class Encoding:
+    """Параметры кодирования файла изображения, формат берется из расширения."""
+
+    # Уровень zlib для PNG: 0 - без сжатия и быстрее всего, 9 - меньше файл
+    compress_level: int = 6
+    # Качество WebP, 100 - без потерь
+    quality: int = 90
+    # Бит на канал для PNG и TIFF: 8 или 16
+    bit_depth: int = 8
+
+    def __post_init__(self) -> None:
+        if self.bit_depth not in BIT_DEPTHS:
+            msg = f"Бит на канал может быть 8 или 16, а не {self.bit_depth}"
+            raise ValueError(msg)
+
+    def hdr(self, path: str) -> bool:
+        """Пишется ли линейный кадр float32 вместо изображения."""
+        return Path(path).suffix.lower() == HDR_FORMAT
+
+    @property
+    def max_value(self) -> int:
+        """Наибольшее значение канала при bit_depth."""
+        return (1 << self.bit_depth) - 1
+
+    @property
+    def dtype(self) -> type:
+        """Тип массива канала при bit_depth."""
+        return np.uint16 if self.bit_depth == BIT_DEPTHS[1] else np.uint8
+
+    def streams(self, path: str) -> bool:
+        """Пишется ли файл полосами строк без полного изображения в памяти."""
+        return Path(path).suffix.lower() in STREAMING_FORMATS
+
+    def pil_options(self, path: str) -> dict:
+        """Параметры Image.save для форматов, которые кодирует PIL."""
+        if self.bit_depth != BIT_DEPTHS[0]:
+            msg = f"16 бит на канал поддерживают только PNG и TIFF: {path}"
+            raise ValueError(msg)
+        if Path(path).suffix.lower() == ".webp":
+            return {
+                "quality": self.quality,
+                "lossless": self.quality >= WEBP_LOSSLESS_QUALITY,
+            }
+        return {}
+
+    def open_writer(self, path: str, width: int, height: int) -> "RowWriter":
+        """Построчный писатель для PNG или TIFF по расширению пути."""
+        if Path(path).suffix.lower() == ".png":
+            return PngWriter(path, width, height, self.bit_depth, self.compress_level)
+        if self.hdr(path):
+            return NpyWriter(path, width, height)
+        return TiffWriter(path, width, height, self.bit_depth)
+
+
+class RowWriter(ABC):
+    """Запись изображения RGB полосами строк сверху вниз."""
+
+    def __init__(self, path: str, width: int, height: int, bit_depth: int) -> None:
+        self.width = width
+        self.height = height
+        self.bit_depth = bit_depth
+        self.rows_written = 0
+        # Файл открыт между вызовами write_rows, закрывается в close
+        self._file = Path(path).open("wb")  # noqa: SIM115
+
+    def __enter__(self) -> "RowWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+
+    def write_rows(self, rgb: np.ndarray) -> None:
+        """Дописывает полосу строк размера rows x width x 3."""
+        if rgb.shape[1:] != (self.width, 3):
+            msg = f"Полоса {rgb.shape} не совпадает с шириной {self.width}"
+            raise ValueError(msg)
+        self._write(rgb)
+        self.rows_written += rgb.shape[0]
+
+    def close(self) -> None:
+        """Завершает файл, все строки должны быть записаны."""
+        if self.rows_written != self.height:
+            msg = f"Записано {self.rows_written} строк из {self.height}"
+            raise ValueError(msg)
+        self._finish()
+        self._file.close()
+
+    @abstractmethod
+    def _write(self, rgb: np.ndarray) -> None:
+        """Кодирует и дописывает полосу строк."""
+
+    def _finish(self) -> None:  # noqa: B027
+        """Дописывает конец файла после всех строк, если формату он нужен."""
+
+
+class PngWriter(RowWriter):
+    """PNG, сжимаемый потоком zlib по мере поступления строк."""
+
+    def __init__(
+        self,
+        path: str,
+        width: int,
+        height: int,
+        bit_depth: int = 8,
+        compress_level: int = 6,
+    ) -> None:
+        super().__init__(path, width, height, bit_depth)
+        self._compressor = zlib.compressobj(compress_level)
+        self._previous = None
+
+        self._file.write(PNG_SIGNATURE)
+        self._chunk(
+            b"IHDR",
+            struct.pack(">IIBBBBB", width, height, bit_depth, PNG_COLOR_RGB, 0, 0, 0),
+        )
+
+    def _write(self, rgb: np.ndarray) -> None:
+        # Байты строк в порядке PNG: 16 бит хранятся big-endian
+        dtype = ">u2" if self.bit_depth == BIT_DEPTHS[1] else np.uint8
+        rows = np.ascontiguousarray(rgb, dtype=dtype).reshape(len(rgb), -1)
+        rows = rows.view(np.uint8)
+
+        # Фильтр держит в памяти три копии строк, поэтому идет блоками
+        for start in range(0, len(rows), PNG_FILTER_ROWS):
+            block = self._filter(rows[start : start + PNG_FILTER_ROWS])
+            self._idat(self._compressor.compress(block.tobytes()))
+
+    def _filter(self, rows: np.ndarray) -> np.ndarray:
+        """Фильтрует строки байт перед сжатием, как это делают кодеры PNG.
+
+        Для каждой строки выбирается фильтр None, Sub или Up с наименьшей
+        суммой модулей байт: так фон и плавные переходы становятся нулями.
+        """
+        pixel_bytes = 3 * self.bit_depth // 8
+        left = np.zeros_like(rows)
+        left[:, pixel_bytes:] = rows[:, :-pixel_bytes]
+        # Строка над первой строкой полосы - последняя строка прошлой полосы
+        above = np.empty_like(rows)
+        above[0] = 0 if self._previous is None else self._previous
+        above[1:] = rows[:-1]
+        self._previous = rows[-1].copy()
+
+        # Номер кандидата совпадает с типом фильтра PNG: 0 - None, 1 - Sub, 2 - Up
+        candidates = np.stack((rows, rows - left, rows - above))
+        scores = np.abs(candidates.view(np.int8), dtype=np.int32).sum(axis=2)
+        best = scores.argmin(axis=0)
+
+        filtered = np.empty((len(rows), rows.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = best
+        filtered[:, 1:] = candidates[best, np.arange(len(rows))]
+        return filtered
+
+    def _finish(self) -> None:
+        self._idat(self._compressor.flush())
+        self._chunk(b"IEND", b"")
+
+    def _idat(self, data: bytes) -> None:
+        if data:
+            self._chunk(b"IDAT", data)
+
+    def _chunk(self, kind: bytes, data: bytes) -> None:
+        self._file.write(struct.pack(">I", len(data)))
+        self._file.write(kind)
+        self._file.write(data)
+        self._file.write(struct.pack(">I", zlib.crc32(kind + data)))
+
+
+class TiffWriter(RowWriter):
+    """Несжатый TIFF одной полосой, каталог тегов пишется в конце файла."""
+
+    def __init__(self, path: str, width: int, height: int, bit_depth: int = 8) -> None:
+        super().__init__(path, width, height, bit_depth)
+        # Смещение каталога пока неизвестно, заполняется в _finish
+        self._file.write(b"II*\x00" + struct.pack("<I", 0))
+
+    def _write(self, rgb: np.ndarray) -> None:
+        dtype = "<u2" if self.bit_depth == BIT_DEPTHS[1] else np.uint8
+        self._file.write(np.ascontiguousarray(rgb, dtype=dtype).tobytes())
+
+    def _finish(self) -> None:
+        data_size = self._file.tell() - TIFF_HEADER_SIZE
+        # Значения BitsPerSample не помещаются в тег и лежат отдельно
+        bits_offset = self._align()
+        self._file.write(struct.pack("<3H", *(self.bit_depth,) * 3))
+        ifd_offset = self._align()
+
+        entries = [
+            (256, TIFF_LONG, 1, self.width),  # ImageWidth
+            (257, TIFF_LONG, 1, self.height),  # ImageLength
+            (258, TIFF_SHORT, 3, bits_offset),  # BitsPerSample
+            (259, TIFF_SHORT, 1, 1),  # Compression: нет
+            (262, TIFF_SHORT, 1, 2),  # PhotometricInterpretation: RGB
+            (273, TIFF_LONG, 1, TIFF_HEADER_SIZE),  # StripOffsets
+            (277, TIFF_SHORT, 1, 3),  # SamplesPerPixel
+            (278, TIFF_LONG, 1, self.height),  # RowsPerStrip
+            (279, TIFF_LONG, 1, data_size),  # StripByteCounts
+            (284, TIFF_SHORT, 1, 1),  # PlanarConfiguration: RGBRGB
+        ]
+        self._file.write(struct.pack("<H", len(entries)))
+        for tag, kind, count, value in entries:
+            # Значение выравнивается к началу поля из 4 байт
+            packed = struct.pack(
+                "<H" if kind == TIFF_SHORT and count == 1 else "<I", value
+            )
+            self._file.write(
+                struct.pack("<HHI", tag, kind, count) + packed.ljust(4, b"\0")
+            )
+        self._file.write(struct.pack("<I", 0))
+
+        self._file.seek(4)
+        self._file.write(struct.pack("<I", ifd_offset))
+
+    def _align(self) -> int:
+        """Дополняет файл до четного смещения, которого требует TIFF."""
+        offset = self._file.tell()
+        if offset % 2:
+            self._file.write(b"\0")
+            offset += 1
+        return offset
+
+
+class NpyWriter(RowWriter):
+    """Массив float32 height x width x 3 в формате .npy, читается np.load."""
+
+    def __init__(self, path: str, width: int, height: int) -> None:
+        super().__init__(path, width, height, 32)
+        np.lib.format.write_array_header_1_0(
+            self._file,
+            {"descr": "<f4", "fortran_order": False, "shape": (height, width, 3)},
+        )
+
+    def _write(self, rgb: np.ndarray) -> None:
+        self._file.write(np.ascontiguousarray(rgb, dtype="<f4").tobytes())
@@ -1,28 +1,119 @@
 import sys
+from contextlib import AbstractContextManager, nullcontext
 
 from config import Config
 from engine import FractalEngine
+from histogram import BaseHistogram
+from histogram_file import save_histogram
 from image import ImageExporter
 from logger_config import logger
-from measure import measure_time
+from measure import measure_time, metrics, profiled
+from preview import LivePreview
+from render_cache import config_key
+
+
+def save_metrics(config: Config, hist: BaseHistogram | None) -> None:
+    """Дополняет замеры этапов показателями генерации и сохраняет отчет."""
+    # При остановке по сходимости движок записывает выполненные итерации сам
+    iterations = metrics.values.setdefault("iterations", config.iteration_count)
+    metrics.record("threads", config.threads)
+    metrics.record(
+        "resolution",
+        {
+            "width": config.width,
+            "height": config.height,
+            "oversample": config.oversample,
+        },
+    )
+
+    generate = metrics.stages.get("generate")
+    if generate and generate["seconds"] > 0:
+        metrics.record("samples_per_sec", iterations / generate["seconds"])
+    if hist is not None:
+        metrics.record("fill_ratio", hist.fill_ratio())
+
+    metrics.save(config.metrics_path)
+
+
+def render(config: Config, engine: FractalEngine) -> BaseHistogram | None:
+    """Гистограмма из кэша по хэшу конфига, иначе новая генерация."""
+    cache = config.render_cache()
+    if cache is None:
+        with metrics.stage("generate"):
+            return engine.generate()
+
+    key = config_key(
+        config, converging=engine.stops_early(), checkpointed=engine.checkpointed()
+    )
+    saved = cache.load(key)
+    if saved is not None:
+        logger.info(f"Гистограмма взята из кэша: {cache.path(key)}")
+        metrics.record("cache", "hit")
+        return saved.hist
+
+    metrics.record("cache", "miss")
+    with metrics.stage("generate"):
+        hist = engine.generate()
+    # Продолженный чекпоинт мог начаться с другим конфигом, его не кэшируем
+    if hist is not None and not engine.resumed:
+        cache.store(key, hist, config.width, config.height, config.oversample)
+    return hist
+
+
+def live_preview(config: Config, engine: FractalEngine) -> AbstractContextManager:
+    """Предпросмотр на время генерации, если он включен в конфиге."""
+    options = config.preview()
+    if options is None:
+        return nullcontext()
+
+    exporter = ImageExporter(
+        max(1, config.width // options.scale),
+        max(1, config.height // options.scale),
+        config.gamma,
+        options.path or "preview.png",
+        tone=config.tone_mapping(),
+    )
+    return LivePreview(engine.snapshot, exporter, options, config.oversample)
 
 
 @measure_time("Генерация завершена.")
 def main() -> None:
     """Точка входа в приложение."""
     try:
-        config = Config()
-        config.load_with_priority()
+        with metrics.stage("config_load"):
+            config = Config()
+            config.load_with_priority()
         logger.info("Аргументы собраны")
 
         engine = FractalEngine(config)
         exporter = ImageExporter(
-            config.width, config.height, config.gamma, config.output_path
+            config.width,
+            config.height,
+            config.gamma,
+            config.output_path,
+            oversample=config.oversample,
+            density=config.density_estimation(),
+            tile_size=config.tile_size,
+            tone=config.tone_mapping(),
+            encoding=config.encoding(),
         )
 
         logger.info("Начинается генерация")
-        hist = engine.generate()
-        exporter.save(hist.data)
+        with profiled(config.profile_path):
+            with live_preview(config, engine):
+                hist = render(config, engine)
+            exporter.save(hist)
+            if config.histogram_path:
+                save_histogram(
+                    config.histogram_path,
+                    hist,
+                    config.width,
+                    config.height,
+                    config.oversample,
+                )
+
+        if config.metrics_path:
+            save_metrics(config, hist)
     except KeyboardInterrupt:
         logger.info("Программа прервана пользователем")
         sys.exit(130)
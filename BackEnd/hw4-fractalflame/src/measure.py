@@ -1,11 +1,109 @@
+import cProfile
+import json
+import sys
+import threading
 import time
+from collections.abc import Iterator
+from contextlib import contextmanager
 from functools import wraps
+from pathlib import Path
 
 from logger_config import logger
 
+try:
+    import resource
+except ImportError:  # Нет на Windows
+    resource = None
 
-def measure_time(message: str = "Функция завершила работу.") -> callable:
-    """Надостройка над декоратор для принятия сообщения."""
+
+class Metrics:
+    """Машиночитаемые замеры: время этапов и показатели генерации."""
+
+    def __init__(self) -> None:
+        self.stages = {}
+        self.values = {}
+        # Этапы пишут и потоки движка
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, seconds: float, calls: int = 1) -> None:
+        """Добавляет время этапа, повторные вызовы суммируются."""
+        with self._lock:
+            stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+            stage["seconds"] += seconds
+            stage["calls"] += calls
+
+    def merge_stages(self, stages: dict) -> None:
+        """Добавляет замеры этапов другого процесса."""
+        for name, stage in stages.items():
+            self.add_stage(name, stage["seconds"], stage["calls"])
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Замеряет время блока как этап name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def record(self, name: str, value: object) -> None:
+        """Сохраняет показатель генерации."""
+        self.values[name] = value
+
+    def reset(self) -> None:
+        """Очищает замеры, например в начале задачи процесса."""
+        self.stages = {}
+        self.values = {}
+
+    def report(self) -> dict:
+        """Отчет: этапы, показатели и пиковая память процесса и его детей."""
+        return {"stages": self.stages, **self.values, "peak_rss_bytes": peak_rss()}
+
+    def save(self, path: str) -> None:
+        """Сохраняет отчет в JSON."""
+        with Path(path).open("w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        logger.info(f"Метрики сохранены в файл {path}")
+
+
+def peak_rss() -> dict | None:
+    """Пиковый RSS в байтах для процесса и самого большого из его детей."""
+    if resource is None:
+        return None
+
+    # Linux отдает килобайты, macOS - байты
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+
+# Замеры текущего процесса, процессы пула передают свои родителю
+metrics = Metrics()
+
+
+@contextmanager
+def profiled(path: str | None) -> Iterator[None]:
+    """Профилирует блок через cProfile и сохраняет статистику в path."""
+    if not path:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        logger.info(f"Профиль сохранен в файл {path}")
+
+
+def measure_time(
+    message: str = "Функция завершила работу.", stage: str | None = None
+) -> callable:
+    """Надостройка над декоратор для принятия сообщения и имени этапа."""
 
     def decorator(func: callable) -> callable:
         """Декоратор для замера времени."""
@@ -13,10 +111,12 @@ def measure_time(message: str = "Функция завершила работу.
         @wraps(func)
         def wrapper(*args: tuple, **kwargs: dict) -> callable:
             """Функция замера времени."""
-            start = time.time()
+            start = time.perf_counter()
             result = func(*args, **kwargs)
-            end = time.time()
-            logger.info(f"{message} Времени затрачено: {end - start:.2f}")
+            elapsed = time.perf_counter() - start
+            if stage is not None:
+                metrics.add_stage(stage, elapsed)
+            logger.info(f"{message} Времени затрачено: {elapsed:.2f}")
             return result
 
         return wrapper
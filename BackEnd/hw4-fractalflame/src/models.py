@@ -1,18 +1,12 @@
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class Point:
-    """Класс для точки."""
+    """Класс для точки.
+
+    Без __dict__: точка создается несколько раз на итерацию скалярного движка.
+    """
 
     x: int
     y: int
-
-
-@dataclass
-class Color:
-    """Класс для цвета."""
-
-    r: float
-    g: float
-    b: float
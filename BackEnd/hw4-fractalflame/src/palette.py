@@ -0,0 +1,69 @@
+import numpy as np
+
+# Опорные цвета палитр, между ними цвет интерполируется линейно.
+# В flame по порядку стоят прежние цвета вариаций, см. Transformations
+PALETTES = {
+    "flame": [
+        (0.7, 0.2, 0.1),
+        (0.9, 0.3, 0.1),
+        (0.9, 0.5, 0.1),
+        (0.95, 0.6, 0.1),
+        (0.95, 0.8, 0.3),
+        (0.95, 0.85, 0.1),
+        (0.8, 0.9, 0.2),
+    ],
+    "grayscale": [(0.0, 0.0, 0.0), (1.0, 1.0, 1.0)],
+    "ice": [(0.05, 0.1, 0.4), (0.2, 0.5, 0.9), (0.7, 0.9, 1.0), (1.0, 1.0, 1.0)],
+    "neon": [(0.5, 0.0, 0.9), (0.9, 0.1, 0.6), (1.0, 0.5, 0.1), (0.9, 1.0, 0.2)],
+}
+
+HEX_COLOR_LENGTH = 6
+
+
+def parse_palette(palette: str | list) -> np.ndarray:
+    """Опорные цвета палитры в виде массива (n, 3) со значениями от 0 до 1.
+
+    palette - имя из PALETTES, список цветов "#rrggbb" или [r, g, b],
+    либо строка цветов "#rrggbb" через запятую.
+    """
+    if isinstance(palette, str) and "," in palette:
+        palette = palette.split(",")
+    elif isinstance(palette, str):
+        if palette not in PALETTES:
+            msg = f"Неизвестная палитра: {palette}"
+            raise ValueError(msg)
+        palette = PALETTES[palette]
+
+    stops = np.array([_parse_color(color) for color in palette], dtype=np.float64)
+    if stops.size == 0:
+        msg = "Палитра должна содержать хотя бы один цвет"
+        raise ValueError(msg)
+    return stops
+
+
+def palette_lut(palette: str | list, size: int = 256) -> np.ndarray:
+    """Таблица из size цветов палитры для индексов от 0 до 1."""
+    if size < 1:
+        msg = f"Размер палитры должен быть положительным: {size}"
+        raise ValueError(msg)
+
+    stops = parse_palette(palette)
+    positions = np.linspace(0.0, 1.0, len(stops))
+    indices = np.linspace(0.0, 1.0, size)
+    return np.stack(
+        [np.interp(indices, positions, stops[:, channel]) for channel in range(3)],
+        axis=1,
+    )
+
+
+def _parse_color(color: str | list) -> tuple:
+    """Цвет "#rrggbb" или [r, g, b] со значениями от 0 до 1."""
+    if isinstance(color, str):
+        value = color.strip().removeprefix("#")
+        if len(value) != HEX_COLOR_LENGTH:
+            msg = f"Цвет палитры должен быть в виде #rrggbb: {color}"
+            raise ValueError(msg)
+        return tuple(int(value[i : i + 2], 16) / 255 for i in range(0, 6, 2))
+
+    r, g, b = color
+    return float(r), float(g), float(b)
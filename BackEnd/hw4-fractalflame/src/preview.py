@@ -0,0 +1,156 @@
+import io
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import TracebackType
+
+from PIL import Image
+
+from image import ImageExporter
+from logger_config import logger
+
+PREVIEW_HOST = "127.0.0.1"
+# Быстрое сжатие: снимок перезаписывается каждые несколько секунд
+PREVIEW_COMPRESS_LEVEL = 1
+PREVIEW_PAGE = """<!doctype html>
+<html><head><meta http-equiv="refresh" content="{interval}"></head>
+<body style="margin:0;background:#000"><img src="/preview.png"></body></html>
+"""
+
+
+@dataclass
+class PreviewOptions:
+    """Параметры предпросмотра незавершенного рендера."""
+
+    # Файл PNG со снимком, None - не писать
+    path: str | None = None
+    # Порт локального HTTP-сервера, None - без сервера, 0 - любой свободный
+    port: int | None = None
+    # Секунд между снимками
+    interval: float = 5.0
+    # Во сколько раз снимок меньше изображения
+    scale: int = 4
+
+
+class LivePreview:
+    """Снимок текущей гистограммы каждые interval секунд в фоновом потоке.
+
+    Снимок уменьшается, тонируется и пишется в файл и/или отдается
+    по HTTP. Генерация не останавливается: поток берет копию гистограммы
+    через snapshot движка.
+    """
+
+    def __init__(
+        self,
+        snapshot: Callable[[int], tuple | None],
+        exporter: ImageExporter,
+        options: PreviewOptions,
+        oversample: int = 1,
+    ) -> None:
+        # snapshot(factor) - счетчики и суммы цветов, уменьшенные в factor раз
+        self.snapshot = snapshot
+        self.exporter = exporter
+        self.options = options
+        self.factor = oversample * options.scale
+        # Последний снимок в PNG, None - данных еще не было
+        self.png = None
+        self.server = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def __enter__(self) -> "LivePreview":
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """Запускает поток снимков и, если задан порт, HTTP-сервер."""
+        if self.options.port is not None:
+            self.server = ThreadingHTTPServer(
+                (PREVIEW_HOST, self.options.port), self._handler()
+            )
+            self._run(self.server.serve_forever)
+            logger.info(
+                f"Предпросмотр: http://{PREVIEW_HOST}:{self.server.server_port}/"
+            )
+        self._run(self._loop)
+
+    def stop(self) -> None:
+        """Останавливает поток и сервер, итоговое изображение сохраняет exporter."""
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def update(self) -> bool:
+        """Делает снимок, False - генерация еще не дала данных."""
+        snapshot = self.snapshot(self.factor)
+        if snapshot is None:
+            return False
+
+        buffer = io.BytesIO()
+        Image.fromarray(self.exporter.rgb(*snapshot), "RGB").save(
+            buffer, "PNG", compress_level=PREVIEW_COMPRESS_LEVEL
+        )
+        self.png = buffer.getvalue()
+
+        if self.options.path:
+            # Через временный файл, чтобы просмотрщик не прочитал половину
+            tmp_path = Path(f"{self.options.path}.tmp")
+            tmp_path.write_bytes(self.png)
+            tmp_path.replace(self.options.path)
+        return True
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.options.interval):
+            try:
+                self.update()
+            except (OSError, ValueError, RuntimeError) as e:
+                # Ошибка снимка не должна прерывать рендер
+                logger.warning(f"Снимок предпросмотра не создан: {e}")
+
+    def _run(self, target: Callable) -> None:
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _handler(self) -> type:
+        """Обработчик запросов: страница с автообновлением и последний снимок."""
+        preview = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                if self.path == "/":
+                    page = PREVIEW_PAGE.format(interval=preview.options.interval)
+                    self._send(page.encode(), "text/html; charset=utf-8")
+                elif self.path != "/preview.png":
+                    self.send_error(404)
+                elif preview.png is None:
+                    self.send_error(503)
+                else:
+                    self._send(preview.png, "image/png")
+
+            def _send(self, body: bytes, content_type: str) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, message: str, *args: tuple) -> None:
+                logger.debug(message % args)
+
+        return Handler
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from histogram import BaseHistogram
+from histogram_file import (
+    HISTOGRAM_FILE_VERSION,
+    HistogramFile,
+    load_histogram,
+    save_histogram,
+)
+from logger_config import logger
+
+# 1 - гистограмма в формате histogram_file, 2 - число точек batch кратно пачкам
+CACHE_VERSION = 2
+
+# Поля конфига, от которых зависит гистограмма. Потоки, бэкенд и размер
+# чанка на нее не влияют: рендер воспроизводим при любом разбиении, см. rng.
+# Исключение - остановка по сходимости, см. config_key
+KEY_FIELDS = (
+    "width",
+    "height",
+    "seed",
+    "iteration_count",
+    "functions",
+    "affine_params",
+    "symmetry_level",
+    "mirror",
+    "engine",
+    "batch_size",
+    "burn_in",
+    "oversample",
+)
+
+
+def config_key(
+    config: object, *, converging: bool = False, checkpointed: bool = False
+) -> str:
+    """Хэш нормализованных полей конфига, влияющих на гистограмму.
+
+    converging - генерация остановится по сходимости, см.
+    FractalEngine.stops_early. Без этого порог в конфиге ни на что не влияет.
+    checkpointed - генерация с чекпоинтами, см. FractalEngine.checkpointed.
+    """
+    fields = {name: getattr(config, name) for name in KEY_FIELDS}
+    if converging:
+        # Проверка сходимости идет по чанкам, поэтому остановка зависит от них
+        fields["convergence_threshold"] = config.convergence_threshold
+        fields["chunk_size"] = config.chunk_size
+    if checkpointed:
+        # С чекпоинтами другое число точек batch, а с ним и гистограмма
+        fields["checkpointed"] = True
+    fields["versions"] = (CACHE_VERSION, HISTOGRAM_FILE_VERSION)
+
+    payload = json.dumps(_normalize(fields), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _normalize(value: object) -> object:
+    """Приводит значение к виду, одинаковому для равных конфигов: 2 и 2.0."""
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    if isinstance(value, list | tuple):
+        return [_normalize(item) for item in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, int | float):
+        return float(value)
+    return str(value)
+
+
+class RenderCache:
+    """Кэш гистограмм готовых рендеров на диске по хэшу конфига.
+
+    Файлы вытесняются по давности использования, когда общий размер
+    превышает max_bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def path(self, key: str) -> Path:
+        """Путь до файла гистограммы по ключу."""
+        return self.directory / f"{key}.npz"
+
+    def load(self, key: str) -> HistogramFile | None:
+        """Гистограмма из кэша, None если ее нет или файл поврежден."""
+        path = self.path(key)
+        if not path.exists():
+            return None
+
+        try:
+            saved = load_histogram(str(path))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Файл кэша {path} не прочитан: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        # Время изменения служит временем последнего использования для LRU
+        os.utime(path)
+        return saved
+
+    def store(
+        self,
+        key: str,
+        hist: BaseHistogram,
+        width: int,
+        height: int,
+        oversample: int = 1,
+    ) -> None:
+        """Сохраняет гистограмму и вытесняет давно не использованные файлы."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(key)
+        save_histogram(str(path), hist, width, height, oversample)
+        self._evict(keep=path)
+
+    def _evict(self, keep: Path) -> None:
+        """Удаляет самые старые файлы, пока кэш больше max_bytes."""
+        files = sorted(
+            (entry.stat().st_mtime, entry.stat().st_size, entry)
+            for entry in self.directory.glob("*.npz")
+        )
+        total = sum(size for _, size, _ in files)
+
+        for _, size, entry in files:
+            if total <= self.max_bytes:
+                break
+            # Только что сохраненный файл остается, даже если он больше лимита
+            if entry == keep:
+                continue
+            entry.unlink(missing_ok=True)
+            total -= size
+            logger.info(f"Из кэша вытеснен {entry.name}")
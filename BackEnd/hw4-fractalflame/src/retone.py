@@ -0,0 +1,133 @@
+import argparse
+import sys
+
+from filters import DensityEstimation
+from histogram_file import load_histogram
+from image import ImageExporter, ToneMapping
+from image_writer import Encoding
+from logger_config import logger
+from measure import measure_time
+from palette import PALETTES
+
+
+def retone(
+    histogram_path: str,
+    output_path: str,
+    gamma: float | None = None,
+    tone: ToneMapping | None = None,
+    density: DensityEstimation | None = None,
+    encoding: Encoding | None = None,
+) -> None:
+    """Строит изображение по сохраненной гистограмме без повторной генерации.
+
+    gamma None - гамма, с которой гистограмма была сгенерирована.
+    Гистограмма хранит индексы цвета, поэтому палитру тоже можно сменить.
+    density - радиусы в пикселях изображения, как de_radius в конфиге.
+    """
+    saved = load_histogram(histogram_path)
+    if density is not None:
+        density = density.scaled(saved.oversample)
+    exporter = ImageExporter(
+        saved.width,
+        saved.height,
+        saved.hist.gamma if gamma is None else gamma,
+        output_path,
+        oversample=saved.oversample,
+        density=density,
+        tone=tone,
+        encoding=encoding,
+    )
+    exporter.save(saved.hist)
+
+
+@measure_time("Перетонирование завершено.")
+def main() -> None:
+    """Точка входа в повторную тональную обработку гистограммы."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-i", "--input", required=True, help="Путь до .npz из --save-histogram"
+    )
+    parser.add_argument(
+        "-o",
+        "--output-path",
+        default="result.png",
+        help="Путь до изображения, .npy - линейный кадр float32 для обработки",
+    )
+    parser.add_argument("-g", "--gamma", type=float, help="Гамма коррекция")
+    parser.add_argument(
+        "--brightness-scale",
+        type=float,
+        default=10.0,
+        help="Делитель логарифма плотности при расчете яркости, меньше - ярче",
+    )
+    parser.add_argument(
+        "--palette",
+        default="flame",
+        help=f"Палитра: {', '.join(PALETTES)} или цвета #rrggbb через запятую",
+    )
+    parser.add_argument(
+        "--palette-size", type=int, default=256, help="Цветов в таблице палитры"
+    )
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        choices=range(10),
+        default=6,
+        help="Уровень сжатия PNG: 0 - быстрее всего, 9 - меньше файл",
+    )
+    parser.add_argument(
+        "--quality", type=int, default=90, help="Качество WebP, 100 - без потерь"
+    )
+    parser.add_argument(
+        "--bit-depth",
+        type=int,
+        choices=(8, 16),
+        default=8,
+        help="Бит на канал для PNG и TIFF",
+    )
+    parser.add_argument(
+        "--de-radius",
+        type=float,
+        default=0.0,
+        help="Максимальный радиус размытия по плотности, 0 - выключено",
+    )
+    parser.add_argument(
+        "--de-min-radius",
+        type=float,
+        default=0.0,
+        help="Минимальный радиус размытия по плотности",
+    )
+    parser.add_argument(
+        "--de-curve",
+        type=float,
+        default=0.4,
+        help="Скорость уменьшения радиуса размытия с ростом плотности",
+    )
+    args = parser.parse_args()
+
+    try:
+        density = (
+            DensityEstimation(args.de_radius, args.de_min_radius, args.de_curve)
+            if args.de_radius > 0
+            else None
+        )
+        retone(
+            args.input,
+            args.output_path,
+            args.gamma,
+            ToneMapping(args.brightness_scale, args.palette, args.palette_size),
+            density,
+            Encoding(args.compress_level, args.quality, args.bit_depth),
+        )
+    except KeyboardInterrupt:
+        logger.info("Программа прервана пользователем")
+        sys.exit(130)
+    except Exception as e:  # noqa: BLE001
+        logger.critical(e)
+        return 1
+    else:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
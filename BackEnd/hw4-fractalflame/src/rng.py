@@ -0,0 +1,133 @@
+import random
+import struct
+
+import numpy as np
+
+# Точек в группе с собственным генератором. Группа - неделимая единица работы,
+# поэтому результат не зависит от числа процессов и размера чанков
+GROUP_SIZE = 256
+
+# Итераций в потоке скалярного движка, у каждого потока свой генератор
+SCALAR_STREAM_ITERATIONS = 1 << 16
+
+# Шаг округления цвета точки. Суммы кратных 2^-16 в float64 точны,
+# пока пиксель набирает меньше 2^37 попаданий, и не зависят от порядка сложения
+COLOR_STEP = 2.0**-16
+
+
+def seed_entropy(seed: float) -> int:
+    """Переводит seed в целое число для генератора NumPy без потери точности."""
+    return struct.unpack("<Q", struct.pack("<d", float(seed)))[0]
+
+
+def stream_seed(seed: float, stream: int) -> np.random.SeedSequence:
+    """Независимая последовательность потока stream, не зависящая от соседних."""
+    return np.random.SeedSequence(seed_entropy(seed), spawn_key=(stream,))
+
+
+def group_generator(seed: float, group: int) -> np.random.Generator:
+    """Счетчиковый генератор Philox для группы точек."""
+    return np.random.Generator(np.random.Philox(stream_seed(seed, group)))
+
+
+def scalar_generator(seed: float, stream: int) -> random.Random:
+    """Генератор потока скалярного движка."""
+    state = stream_seed(seed, stream).generate_state(4)
+    return random.Random(int.from_bytes(state.tobytes(), "little"))
+
+
+def quantize_colors(colors: np.ndarray) -> np.ndarray:
+    """Округляет цвета пачки до COLOR_STEP, чтобы суммы в пикселях были точными."""
+    return np.rint(colors / COLOR_STEP) * COLOR_STEP
+
+
+def quantize_color(color: float) -> float:
+    """Округляет индекс цвета точки до COLOR_STEP."""
+    return round(color / COLOR_STEP) * COLOR_STEP
+
+
+class WalkerStreams:
+    """Генераторы подряд идущих групп точек, работающие как один на всю пачку.
+
+    Каждая группа тянет числа только из своего генератора и только для своих
+    точек, поэтому траектория точки зависит от seed и номера группы,
+    но не от того, какие еще группы попали в пачку.
+    """
+
+    def __init__(self, seed: float, groups: range, walkers: int) -> None:
+        self.generators = [group_generator(seed, group) for group in groups]
+        # Номер первой точки во всей пачке
+        self.start = groups.start * GROUP_SIZE
+        # Границы групп внутри пачки, последняя группа может быть неполной
+        self.bounds = [
+            (
+                group * GROUP_SIZE - self.start,
+                min((group + 1) * GROUP_SIZE, walkers) - self.start,
+            )
+            for group in groups
+        ]
+
+    @property
+    def size(self) -> int:
+        """Число точек во всех группах."""
+        return self.bounds[-1][1] if self.bounds else 0
+
+    def random(self, size: int | None = None) -> np.ndarray:
+        """Равномерные числа из [0, 1), по одному на точку."""
+        if size is not None and size != self.size:
+            msg = f"Ожидалась пачка из {self.size} точек, получено {size}"
+            raise ValueError(msg)
+        return self._concatenate(
+            [
+                generator.random(stop - start)
+                for generator, (start, stop) in zip(
+                    self.generators, self.bounds, strict=True
+                )
+            ]
+        )
+
+    def spawn(self) -> tuple:
+        """Случайные стартовые точки и нулевой индекс цвета для всех групп."""
+        xs, ys = [], []
+        for generator, (start, stop) in zip(self.generators, self.bounds, strict=True):
+            xs.append(generator.uniform(-1, 1, stop - start))
+            ys.append(generator.uniform(-1, 1, stop - start))
+        return self._concatenate(xs), self._concatenate(ys), np.zeros(self.size)
+
+    def restart(self, lost: np.ndarray) -> tuple:
+        """Новые координаты для потерянных точек, каждая группа берет свои числа."""
+        xs, ys = [], []
+        for generator, (start, stop) in zip(self.generators, self.bounds, strict=True):
+            count = int(np.count_nonzero(lost[start:stop]))
+            if count:
+                xs.append(generator.uniform(-1, 1, count))
+                ys.append(generator.uniform(-1, 1, count))
+        return self._concatenate(xs), self._concatenate(ys)
+
+    @property
+    def state(self) -> list[dict]:
+        """Состояния генераторов групп в виде, пригодном для JSON."""
+        return [
+            _to_json(generator.bit_generator.state) for generator in self.generators
+        ]
+
+    @state.setter
+    def state(self, states: list[dict]) -> None:
+        if len(states) != len(self.generators):
+            msg = "Число состояний не совпадает с числом групп точек"
+            raise ValueError(msg)
+        for generator, state in zip(self.generators, states, strict=True):
+            generator.bit_generator.state = state
+
+    @staticmethod
+    def _concatenate(parts: list) -> np.ndarray:
+        return np.concatenate(parts) if parts else np.empty(0)
+
+
+def _to_json(value: object) -> object:
+    """Заменяет массивы в состоянии генератора списками."""
+    if isinstance(value, dict):
+        return {key: _to_json(item) for key, item in value.items()}
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
@@ -0,0 +1,296 @@
+import shutil
+import tempfile
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+
+from histogram import DenseHistogram
+from logger_config import logger
+
+try:
+    import fcntl
+except ImportError:  # Нет на Windows
+    fcntl = None
+
+# Сколько памяти процесс держит под попадания до записи в файл
+FLUSH_BYTES = 16 << 20
+# Байт на попадание: номер пикселя int64 и индекс цвета float64
+HIT_BYTES = 16
+GIB = 1 << 30
+
+
+class SharedHistogramBuffer:
+    """Срезы плотных гистограмм процессов в одном блоке разделяемой памяти."""
+
+    def __init__(
+        self, slots: int, width: int, height: int, name: str | None = None
+    ) -> None:
+        self.slots = slots
+        self.width = width
+        self.height = height
+
+        pixels = slots * width * height
+        # Сначала счетчики int64, затем суммы индексов цвета float64 - по 8 байт
+        size = pixels * np.dtype(np.int64).itemsize * 2
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.counts = np.ndarray(
+            (slots, height, width), dtype=np.int64, buffer=self.shm.buf
+        )
+        self.colors = np.ndarray(
+            (slots, height, width),
+            dtype=np.float64,
+            buffer=self.shm.buf,
+            offset=self.counts.nbytes,
+        )
+
+        if name is None:
+            self.counts.fill(0)
+            self.colors.fill(0)
+
+    @property
+    def name(self) -> str:
+        """Имя блока для подключения из процессов."""
+        return self.shm.name
+
+    def slot(
+        self, index: int, gamma: float, symmetry_level: int, *, mirror: bool = False
+    ) -> DenseHistogram:
+        """Гистограмма поверх среза процесса, без копирования данных."""
+        return DenseHistogram(
+            self.width,
+            self.height,
+            gamma,
+            symmetry_level,
+            counts=self.counts[index],
+            colors=self.colors[index],
+            mirror=mirror,
+        )
+
+    def reduce(
+        self, gamma: float, symmetry_level: int, *, mirror: bool = False
+    ) -> DenseHistogram:
+        """Суммирует срезы всех процессов в обычную гистограмму."""
+        return DenseHistogram(
+            self.width,
+            self.height,
+            gamma,
+            symmetry_level,
+            counts=self.counts.sum(axis=0),
+            colors=self.colors.sum(axis=0),
+            mirror=mirror,
+        )
+
+    def close(self) -> None:
+        """Отключается от блока, представления массивов становятся недоступны."""
+        del self.counts
+        del self.colors
+        self.shm.close()
+
+    def unlink(self) -> None:
+        """Освобождает блок, вызывается создателем после close."""
+        self.shm.unlink()
+
+
+class BandLockedHistogram(DenseHistogram):
+    """Гистограмма общего среза файла, в который пишут несколько процессов.
+
+    Попадания копятся в массивах на FLUSH_BYTES и пишутся, когда те заполнятся,
+    отсортированные по пикселю:
+    полоса строк за полосой, каждая под блокировкой своего диапазона байт.
+    Процессы не теряют добавления друг друга, а файл обходится по порядку.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        tile_rows: int,
+        counts: np.ndarray,
+        colors: np.ndarray,
+        gamma: float = 2.2,
+        symmetry_level: int = 1,
+        *,
+        mirror: bool = False,
+    ) -> None:
+        height, width = counts.shape
+        super().__init__(
+            width,
+            height,
+            gamma,
+            symmetry_level,
+            counts=counts,
+            colors=colors,
+            mirror=mirror,
+        )
+        self.path = path
+        self.tile_rows = tile_rows
+        capacity = FLUSH_BYTES // HIT_BYTES
+        self._pixels = np.empty(capacity, dtype=np.int64)
+        self._weights = np.empty(capacity, dtype=np.float64)
+        self._size = 0
+
+    def flush(self) -> None:
+        """Записывает накопленные попадания в файл."""
+        if not self._size:
+            return
+
+        # Уникальные пиксели отсортированы, поэтому += не теряет повторы
+        keys, inverse = np.unique(self._pixels[: self._size], return_inverse=True)
+        counts = np.bincount(inverse, minlength=keys.size)
+        sums = np.bincount(
+            inverse, weights=self._weights[: self._size], minlength=keys.size
+        )
+        self._size = 0
+
+        band_pixels = self.tile_rows * self.width
+        band_bytes = band_pixels * self.counts.itemsize
+        bands, starts = np.unique(keys // band_pixels, return_index=True)
+        ends = [*starts[1:], keys.size]
+        with Path(self.path).open("r+b") as f:
+            for band, start, end in zip(bands.tolist(), starts, ends, strict=True):
+                part = slice(start, end)
+                # Блокируется диапазон счетчиков полосы, он же защищает ее цвета
+                fcntl.lockf(f, fcntl.LOCK_EX, band_bytes, band * band_bytes)
+                try:
+                    self.counts.reshape(-1)[keys[part]] += counts[part]
+                    self.colors.reshape(-1)[keys[part]] += sums[part]
+                finally:
+                    fcntl.lockf(f, fcntl.LOCK_UN, band_bytes, band * band_bytes)
+
+    def _add_xy(self, x: float, y: float, color: float) -> None:
+        """Откладывает точку скалярного движка до записи."""
+        pixel = self._pixel(x, y)
+
+        if pixel is not None:
+            px, py = pixel
+            self._pixels[self._size] = py * self.width + px
+            self._weights[self._size] = color
+            self._size += 1
+            if self._size == self._pixels.size:
+                self.flush()
+
+    def _add_batch(self, xs: np.ndarray, ys: np.ndarray, colors: np.ndarray) -> None:
+        """Откладывает пачку точек до записи."""
+        x, y, inside = self._to_pixels(xs, ys)
+        self._defer(y * self.width + x, colors[inside])
+
+    def _defer(self, flat: np.ndarray, colors: np.ndarray) -> None:
+        """Копирует попадания в массивы, по частям, если пачка в них не влезает."""
+        start = 0
+        while start < flat.size:
+            take = min(flat.size - start, self._pixels.size - self._size)
+            part = slice(start, start + take)
+            self._pixels[self._size : self._size + take] = flat[part]
+            self._weights[self._size : self._size + take] = colors[part]
+            self._size += take
+            start += take
+            if self._size == self._pixels.size:
+                self.flush()
+
+
+class FileHistogramBuffer(SharedHistogramBuffer):
+    """Гистограмма в файле на диске через memmap.
+
+    Размер гистограммы ограничен диском, а не памятью: в памяти
+    держатся только страницы, к которым обращаются процессы. Процессы
+    пишут в один общий срез под блокировками полос строк, поэтому файл
+    не растет с числом процессов. Без fcntl срез у каждого процесса свой.
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        width: int,
+        height: int,
+        name: str | None = None,
+        directory: str | None = None,
+        tile_rows: int = 256,
+    ) -> None:
+        self.slots = 1 if fcntl is not None else slots
+        self.width = width
+        self.height = height
+        self.tile_rows = tile_rows
+
+        pixels = self.slots * width * height
+        if name is None:
+            size = pixels * np.dtype(np.int64).itemsize * 2
+            self._check_disk(size, directory or tempfile.gettempdir())
+            # Файл нужного размера без записи: незаписанные страницы читаются нулями
+            with tempfile.NamedTemporaryFile(
+                suffix=".hist", dir=directory, delete=False
+            ) as f:
+                f.truncate(size)
+                name = f.name
+        self.path = name
+
+        self.counts = np.memmap(
+            name, dtype=np.int64, mode="r+", shape=(self.slots, height, width)
+        )
+        self.colors = np.memmap(
+            name,
+            dtype=np.float64,
+            mode="r+",
+            offset=self.counts.nbytes,
+            shape=(self.slots, height, width),
+        )
+
+    @property
+    def name(self) -> str:
+        """Путь до файла для подключения из процессов."""
+        return self.path
+
+    def slot(
+        self, index: int, gamma: float, symmetry_level: int, *, mirror: bool = False
+    ) -> DenseHistogram:
+        """Гистограмма для записи процессом, общий срез - под блокировками."""
+        if fcntl is None:
+            return super().slot(index, gamma, symmetry_level, mirror=mirror)
+
+        return BandLockedHistogram(
+            self.path,
+            self.tile_rows,
+            self.counts[0],
+            self.colors[0],
+            gamma,
+            symmetry_level,
+            mirror=mirror,
+        )
+
+    def reduce(
+        self, gamma: float, symmetry_level: int, *, mirror: bool = False
+    ) -> DenseHistogram:
+        """Суммирует срезы в первый по полосам строк, не загружая файл целиком."""
+        if self.slots > 1:
+            for start in range(0, self.height, self.tile_rows):
+                rows = slice(start, start + self.tile_rows)
+                self.counts[0, rows] += self.counts[1:, rows].sum(axis=0)
+                self.colors[0, rows] += self.colors[1:, rows].sum(axis=0)
+
+        return super().slot(0, gamma, symmetry_level, mirror=mirror)
+
+    def close(self) -> None:
+        """Отключается от файла, уже выданные гистограммы остаются рабочими."""
+        self.counts.flush()
+        self.colors.flush()
+        del self.counts
+        del self.colors
+
+    def unlink(self) -> None:
+        """Удаляет файл, открытые отображения держат данные до освобождения."""
+        Path(self.path).unlink(missing_ok=True)
+
+    @staticmethod
+    def _check_disk(size: int, directory: str) -> None:
+        """Проверяет место под файл заранее, а не посреди рендера."""
+        free = shutil.disk_usage(directory).free
+        logger.info(f"Гистограмма на диске: {size / GIB:.2f} ГБ в {directory}")
+        if size > free:
+            msg = (
+                f"Для гистограммы нужно {size / GIB:.2f} ГБ, "
+                f"свободно {free / GIB:.2f} ГБ в {directory}"
+            )
+            raise OSError(msg)
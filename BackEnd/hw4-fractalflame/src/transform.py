@@ -1,95 +1,97 @@
 import math
 import random
+from bisect import bisect_left
+from itertools import accumulate
+from typing import ClassVar
+
+import numpy as np
 
 from logger_config import logger
-from models import Color, Point
+from models import Point
+from rng import WalkerStreams
 
 
 class Transformations:
-    """Класс с трансормациями."""
+    """Класс с трансормациями.
+
+    Вариации принимают и возвращают координаты: скалярный движок держит
+    точку в локальных переменных, без объекта на каждый шаг.
+    """
+
+    # Индексы цвета вариаций в палитре, с ними смешивается индекс точки.
+    # В палитре flame по этим индексам стоят прежние цвета вариаций
+    COLOR_INDICES: ClassVar[dict] = {
+        "spherical": 0.0,  # Темно-красный, бордовый
+        "swirl": 1 / 6,  # Огненно-красный
+        "vortex_rings": 2 / 6,  # Яркий оранжевый
+        "horseshoe": 3 / 6,  # Насыщенный оранжевый
+        "spiral_waves": 4 / 6,  # Светлое золото
+        "linear": 5 / 6,  # Яркое золото
+        "sinusoidal": 1.0,
+    }
 
     @staticmethod
-    def linear(point: Point, color: Color) -> Point:
+    def linear(x: float, y: float) -> tuple:
         """Без изменений."""
-        function_color = Color(0.95, 0.85, 0.1)  # Яркое золото
-        return point, Transformations._new_color(function_color, color)
+        return x, y
 
     @staticmethod
-    def swirl(point: Point, color: Color) -> Point:
+    def swirl(x: float, y: float) -> tuple:
         """Закручивание вокруг центра."""
-        function_color = Color(0.9, 0.3, 0.1)  # Огненно-красный
-        r = math.sqrt(abs(point.x * point.x + point.y * point.y))
-        return Point(
-            point.x * math.sin(r * r) - point.y * math.cos(r * r),
-            point.x * math.cos(r * r) + point.y * math.sin(r * r),
-        ), Transformations._new_color(function_color, color)
+        r = math.sqrt(abs(x * x + y * y))
+        return (
+            x * math.sin(r * r) - y * math.cos(r * r),
+            x * math.cos(r * r) + y * math.sin(r * r),
+        )
 
     @staticmethod
-    def horseshoe(point: Point, color: Color) -> Point:
+    def horseshoe(x: float, y: float) -> tuple:
         """Отражение как в подкове."""
-        function_color = Color(0.95, 0.6, 0.1)  # Насыщенный оранжевый
-        r = math.sqrt(point.x * point.x + point.y * point.y)
+        r = math.sqrt(x * x + y * y)
         if r == 0:
-            return Point(0, 0)
-        return Point(
-            (point.x - point.y) * (point.x + point.y) / r, 2 * point.x * point.y / r
-        ), Transformations._new_color(function_color, color)
+            return 0, 0
+        return (x - y) * (x + y) / r, 2 * x * y / r
 
     @staticmethod
-    def sinusoidal(point: Point, color: Color) -> tuple:
+    def sinusoidal(x: float, y: float) -> tuple:
         """Синусоидальное искажение с расширенным диапазоном."""
-        function_color = Color(0.8, 0.9, 0.2)
-
         # РАСШИРЕННЫЙ диапазон - умножаем на коэффициент
         scale = 3.0  # увеличивает амплитуду
         # Без увеличения, очень малый диапазон значении функции
-        return Point(
-            math.sin(point.x) * scale, math.sin(point.y) * scale
-        ), Transformations._new_color(function_color, color)
+        return math.sin(x) * scale, math.sin(y) * scale
 
     @staticmethod
-    def spherical(point: Point, color: Color) -> Point:
+    def spherical(x: float, y: float) -> tuple:
         """Сферическое искажение."""
-        function_color = Color(0.7, 0.2, 0.1)  # Темно-красный, бордовый
-        r = math.sqrt(point.x * point.x + point.y * point.y)
+        r = math.sqrt(x * x + y * y)
         if r == 0:
-            return Point(0, 0), Transformations._new_color(function_color, color)
-        return Point(point.x / (r * r), point.y / (r * r)), Transformations._new_color(
-            function_color, color
-        )
+            return 0, 0
+        return x / (r * r), y / (r * r)
 
     @staticmethod
-    def spiral_waves(point: Point, color: Color) -> Point:
+    def spiral_waves(x: float, y: float) -> tuple:
         """Спиральные волны."""
-        function_color = Color(0.95, 0.8, 0.3)  # Светлое золото
-
-        r = math.sqrt(abs(point.x * point.x + point.y * point.y))
-        theta = math.atan2(point.y, point.x)
+        r = math.sqrt(abs(x * x + y * y))
+        theta = math.atan2(y, x)
 
         wave = math.sin(theta * 5) * 0.3
         new_r = r * (1 + wave)
         new_theta = theta + r * 1.5
 
-        return Point(
-            new_r * math.cos(new_theta), new_r * math.sin(new_theta)
-        ), Transformations._new_color(function_color, color)
+        return new_r * math.cos(new_theta), new_r * math.sin(new_theta)
 
     @staticmethod
-    def vortex_rings(point: Point, color: Color) -> Point:
+    def vortex_rings(x: float, y: float) -> tuple:
         """Вихревые кольца."""
-        function_color = Color(0.9, 0.5, 0.1)  # Яркий оранжевый
-
-        r = math.sqrt(abs(point.x * point.x + point.y * point.y))
-        theta = math.atan2(point.y, point.x)
+        r = math.sqrt(abs(x * x + y * y))
+        theta = math.atan2(y, x)
 
         rings = math.sin(r * 8) * 0.2
         new_r = r * (1 + rings)
 
         new_theta = theta + math.log(abs(r) + 1) * 2
 
-        return Point(
-            new_r * math.cos(new_theta), new_r * math.sin(new_theta)
-        ), Transformations._new_color(function_color, color)
+        return new_r * math.cos(new_theta), new_r * math.sin(new_theta)
 
     @staticmethod
     def get_variation(name: str) -> callable:
@@ -105,20 +107,103 @@ class Transformations:
         }
         return variations.get(name, Transformations.linear)
 
+
+class BatchTransformations:
+    """Векторизованные трансформации над массивами координат."""
+
     @staticmethod
-    def _new_color(function_color: Color, new_color: Color) -> Color:
-        return Color(
-            (new_color.r + function_color.r) / 2,
-            (new_color.g + function_color.g) / 2,
-            (new_color.b + function_color.b) / 2,
+    def linear(xs: np.ndarray, ys: np.ndarray) -> tuple:
+        """Без изменений."""
+        return xs, ys
+
+    @staticmethod
+    def swirl(xs: np.ndarray, ys: np.ndarray) -> tuple:
+        """Закручивание вокруг центра."""
+        r2 = xs * xs + ys * ys
+        sin_r2 = np.sin(r2)
+        cos_r2 = np.cos(r2)
+        return xs * sin_r2 - ys * cos_r2, xs * cos_r2 + ys * sin_r2
+
+    @staticmethod
+    def horseshoe(xs: np.ndarray, ys: np.ndarray) -> tuple:
+        """Отражение как в подкове."""
+        r = np.sqrt(xs * xs + ys * ys)
+        # Нулевой радиус переводим в начало координат без деления на ноль
+        safe_r = np.where(r == 0, 1.0, r)
+        return (
+            np.where(r == 0, 0.0, (xs - ys) * (xs + ys) / safe_r),
+            np.where(r == 0, 0.0, 2 * xs * ys / safe_r),
         )
 
+    @staticmethod
+    def sinusoidal(xs: np.ndarray, ys: np.ndarray) -> tuple:
+        """Синусоидальное искажение с расширенным диапазоном."""
+        scale = 3.0
+        return np.sin(xs) * scale, np.sin(ys) * scale
+
+    @staticmethod
+    def spherical(xs: np.ndarray, ys: np.ndarray) -> tuple:
+        """Сферическое искажение."""
+        r2 = xs * xs + ys * ys
+        safe_r2 = np.where(r2 == 0, 1.0, r2)
+        return (
+            np.where(r2 == 0, 0.0, xs / safe_r2),
+            np.where(r2 == 0, 0.0, ys / safe_r2),
+        )
+
+    @staticmethod
+    def spiral_waves(xs: np.ndarray, ys: np.ndarray) -> tuple:
+        """Спиральные волны."""
+        r = np.sqrt(xs * xs + ys * ys)
+        theta = np.arctan2(ys, xs)
+
+        new_r = r * (1 + np.sin(theta * 5) * 0.3)
+        new_theta = theta + r * 1.5
+
+        return new_r * np.cos(new_theta), new_r * np.sin(new_theta)
+
+    @staticmethod
+    def vortex_rings(xs: np.ndarray, ys: np.ndarray) -> tuple:
+        """Вихревые кольца."""
+        r = np.sqrt(xs * xs + ys * ys)
+        theta = np.arctan2(ys, xs)
+
+        new_r = r * (1 + np.sin(r * 8) * 0.2)
+        new_theta = theta + np.log(r + 1) * 2
+
+        return new_r * np.cos(new_theta), new_r * np.sin(new_theta)
+
+    @staticmethod
+    def get_variation(name: str) -> callable:
+        """Возвращает векторизованную функцию вариации по имени."""
+        variations: dict = {
+            "linear": BatchTransformations.linear,
+            "swirl": BatchTransformations.swirl,
+            "horseshoe": BatchTransformations.horseshoe,
+            "sinusoidal": BatchTransformations.sinusoidal,
+            "spherical": BatchTransformations.spherical,
+            "spiral_waves": BatchTransformations.spiral_waves,
+            "vortex_rings": BatchTransformations.vortex_rings,
+        }
+        return variations.get(name, BatchTransformations.linear)
+
 
 class AffineTransformer:
     """Выполняет аффинные преобразования."""
 
+    # Порядок коэффициентов в упакованных массивах TransformationSystem
+    COEFFICIENTS = ("a", "b", "c", "d", "e", "f")
+
     def __init__(
-        self, a: float, b: float, c: float, d: float, e: float, f: float
+        self,
+        a: float,
+        b: float,
+        c: float,
+        d: float,
+        e: float,
+        f: float,
+        *,
+        normalize: bool = True,
     ) -> None:
         self.a = a
         self.b = b
@@ -127,13 +212,27 @@ class AffineTransformer:
         self.e = e
         self.f = f
 
-        self._normalize()
+        # Пост-преобразование только переносит точку в кадр и может растягивать
+        if normalize:
+            self._normalize()
+
+    def coefficients(self) -> tuple:
+        """Коэффициенты в порядке COEFFICIENTS."""
+        return tuple(getattr(self, name) for name in self.COEFFICIENTS)
 
     def transform(self, point: Point) -> Point:
         """Применяет аффинное преобразование к точке."""
-        return Point(
-            self.a * point.x + self.b * point.y + self.c,
-            self.d * point.x + self.e * point.y + self.f,
+        return Point(*self.transform_xy(point.x, point.y))
+
+    def transform_xy(self, x: float, y: float) -> tuple:
+        """Применяет аффинное преобразование к координатам."""
+        return self.a * x + self.b * y + self.c, self.d * x + self.e * y + self.f
+
+    def transform_batch(self, xs: np.ndarray, ys: np.ndarray) -> tuple:
+        """Применяет аффинное преобразование к массивам координат."""
+        return (
+            self.a * xs + self.b * ys + self.c,
+            self.d * xs + self.e * ys + self.f,
         )
 
     def _normalize(self) -> None:
@@ -156,38 +255,199 @@ class AffineTransformer:
 
 
 class TransformationSystem:
-    """Управление трансформациями."""
+    """Управление трансформациями.
+
+    У каждой функции свое аффинное преобразование перед вариацией (поле
+    affine, по умолчанию affine_params) и необязательное пост-преобразование
+    после нее (поле post).
+    """
 
     def __init__(self, function_params: list, affine_params: dict) -> None:
         self.ap_transformer = AffineTransformer(**affine_params)
         # Сортируем по возрастанию
         self.function_params = sorted(function_params, key=lambda x: x["weight"])
 
-        self.function_total_weight = sum(func["weight"] for func in function_params)
-
-    def transform_point(self, point: Point, color: Color) -> Point:
-        """Применить трнасформацию к точке."""
+        # Выбор вариации компилируется один раз: накопленные веса для bisect,
+        # функции и индексы цвета по тем же индексам. Без функций - linear
+        compiled = self.function_params or [{"name": "linear", "weight": 1.0}]
+        self._cumulative = list(accumulate(func["weight"] for func in compiled))
+        self._total_weight = self._cumulative[-1]
+        self._names = [func["name"] for func in compiled]
+        self._variations = [Transformations.get_variation(name) for name in self._names]
+        # Индекс цвета можно задать у функции полем color
+        self._color_indices = [
+            float(
+                func.get(
+                    "color",
+                    Transformations.COLOR_INDICES.get(
+                        func["name"], Transformations.COLOR_INDICES["linear"]
+                    ),
+                )
+            )
+            for func in compiled
+        ]
+        self._affines = [
+            (
+                AffineTransformer(**func["affine"])
+                if "affine" in func
+                else self.ap_transformer
+            )
+            for func in compiled
+        ]
+        self._posts = [
+            (
+                AffineTransformer(**func["post"], normalize=False)
+                if "post" in func
+                else None
+            )
+            for func in compiled
+        ]
+
+        # Те же таблицы в виде массивов для пакетного режима
+        self._cumulative_weights = np.array(self._cumulative)
+        self._batch_variations = [
+            BatchTransformations.get_variation(name) for name in self._names
+        ]
+        # Функции с одной вариацией считаются одним проходом по пачке: номер
+        # различной вариации для каждой функции и сами вариации кроме linear,
+        # которая точку не меняет
+        distinct = list(dict.fromkeys(self._batch_variations))
+        self._variation_ids = np.array(
+            [distinct.index(variation) for variation in self._batch_variations]
+        )
+        self._distinct_variations = [
+            (variation_id, variation)
+            for variation_id, variation in enumerate(distinct)
+            if variation is not BatchTransformations.linear
+        ]
+        # Вариация всех функций, если она у них одна, - без масок
+        self._shared_variation = distinct[0] if len(distinct) == 1 else None
+        self._batch_colors = np.array(self._color_indices)
+        # Коэффициенты упакованы по строкам a..f, чтобы каждой точке пачки
+        # выбрать свое преобразование одной выборкой по индексу функции
+        self._affine_coefficients = self._pack(
+            [affine.coefficients() for affine in self._affines]
+        )
+        self._post_coefficients = None
+        if any(post is not None for post in self._posts):
+            identity = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0)
+            self._post_coefficients = self._pack(
+                [
+                    post.coefficients() if post is not None else identity
+                    for post in self._posts
+                ]
+            )
+
+    def transform_point(
+        self, point: Point, color: float, rng: random.Random | None = None
+    ) -> tuple:
+        """Применить трнасформацию к точке.
+
+        color - индекс цвета точки в палитре, смешивается с индексом вариации.
+        rng - генератор потока, по умолчанию общий генератор модуля random.
+        """
+        x, y, color = self.transform_xy(point.x, point.y, color, rng)
+        return Point(x, y), color
+
+    def transform_xy(
+        self, x: float, y: float, color: float, rng: random.Random | None = None
+    ) -> tuple:
+        """То же, что transform_point, но на координатах без объектов Point."""
         try:
-            point = self.ap_transformer.transform(point)
-
-            trans = Transformations.get_variation(self._choose_random_transform())
-            point, color = trans(point, color)
+            index = self._choose_random_index(rng)
+            x, y = self._affines[index].transform_xy(x, y)
+            x, y = self._variations[index](x, y)
+            post = self._posts[index]
+            if post is not None:
+                x, y = post.transform_xy(x, y)
+            color = (color + self._color_indices[index]) / 2
 
         except (ZeroDivisionError, ValueError, TypeError):
-            return point, color
+            return x, y, color
         else:
-            return point, color
+            return x, y, color
+
+    def transform_batch(
+        self,
+        xs: np.ndarray,
+        ys: np.ndarray,
+        colors: np.ndarray,
+        rng: WalkerStreams,
+    ) -> tuple:
+        """Применить трансформацию к пачке независимых точек.
+
+        Случайные числа берутся из генераторов групп точек, поэтому траектории
+        не зависят от состава пачки.
+        """
+        choice = self._choose_random_transforms(rng, xs.size)
+        new_xs, new_ys = self._apply_variations(
+            choice, *self._gather_affine(self._affine_coefficients, choice, xs, ys)
+        )
+
+        if self._post_coefficients is not None:
+            new_xs, new_ys = self._gather_affine(
+                self._post_coefficients, choice, new_xs, new_ys
+            )
+
+        colors = (colors + self._batch_colors[choice]) / 2
 
-    def _choose_random_transform(self) -> str:
-        """Выбрать вариацию трансформацию."""
-        rand = random.random() * self.function_total_weight
-        cur_weight = 0
+        # Улетевшие в бесконечность точки перезапускаем из случайного места
+        lost = ~(np.isfinite(new_xs) & np.isfinite(new_ys))
+        if lost.any():
+            new_xs[lost], new_ys[lost] = rng.restart(lost)
 
-        # Накапливаем вес, начиная с минимальных.
-        # Когда вес стал больше рандомного значения, мы выбрали функцию
-        for func in self.function_params:
-            cur_weight += func["weight"]
-            if cur_weight >= rand:
-                return func["name"]
+        return new_xs, new_ys, colors
 
-        return "linear"
+    def _apply_variations(
+        self, choice: np.ndarray, xs: np.ndarray, ys: np.ndarray
+    ) -> tuple:
+        """Вариации выбранных функций, по одному проходу на различную вариацию.
+
+        xs и ys - новые массивы после аффинного преобразования, точки linear
+        в них остаются как есть.
+        """
+        with np.errstate(all="ignore"):
+            if self._shared_variation is not None:
+                return self._shared_variation(xs, ys)
+
+            kinds = self._variation_ids[choice]
+            for variation_id, variation in self._distinct_variations:
+                mask = kinds == variation_id
+                xs[mask], ys[mask] = variation(xs[mask], ys[mask])
+        return xs, ys
+
+    @staticmethod
+    def _pack(coefficients: list) -> np.ndarray:
+        """Коэффициенты функций массивом 6 x n, одинаковые - одним столбцом."""
+        packed = np.array(coefficients, dtype=np.float64).T
+        if (packed == packed[:, :1]).all():
+            return packed[:, :1]
+        return packed
+
+    @staticmethod
+    def _gather_affine(
+        coefficients: np.ndarray, choice: np.ndarray, xs: np.ndarray, ys: np.ndarray
+    ) -> tuple:
+        """Аффинные преобразования выбранных функций для каждой точки пачки.
+
+        Общее для всех функций преобразование применяется без выборки.
+        """
+        if coefficients.shape[1] == 1:
+            a, b, c, d, e, f = coefficients[:, 0]
+        else:
+            a, b, c, d, e, f = coefficients[:, choice]
+        with np.errstate(all="ignore"):
+            return a * xs + b * ys + c, d * xs + e * ys + f
+
+    def _choose_random_transforms(self, rng: WalkerStreams, size: int) -> np.ndarray:
+        """Выбрать индексы вариаций для пачки точек."""
+        rand = rng.random(size) * self._total_weight
+        choice = np.searchsorted(self._cumulative_weights, rand)
+        # Защита от погрешности накопленной суммы на правой границе
+        return np.minimum(choice, len(self._batch_variations) - 1)
+
+    def _choose_random_index(self, rng: random.Random | None = None) -> int:
+        """Выбрать индекс вариации бинарным поиском по накопленным весам."""
+        rand = (rng or random).random() * self._total_weight
+        # Первый накопленный вес, не меньший случайного значения
+        return min(bisect_left(self._cumulative, rand), len(self._variations) - 1)
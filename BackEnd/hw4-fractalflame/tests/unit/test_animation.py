@@ -0,0 +1,149 @@
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+from animation import FrameRenderer, interpolate_keyframes, load_frames, numbered_path
+from engine import FractalEngine
+
+
+class TestAnimation:
+    """Тесты для рендера серии кадров."""
+
+    def test_interpolate_keyframes(self) -> None:
+        """Проверяет линейную интерполяцию между ключевыми кадрами."""
+        test_frames = 5
+        keyframes = [
+            {"frame": 4, "gamma": 3.0, "affine_params": {"a": 1.0}, "engine": "b"},
+            {"frame": 0, "gamma": 1.0, "affine_params": {"a": 0.0}, "engine": "a"},
+        ]
+
+        frames = interpolate_keyframes(keyframes)
+
+        assert len(frames) == test_frames
+        assert [frame["gamma"] for frame in frames] == [1.0, 1.5, 2.0, 2.5, 3.0]
+        assert frames[2]["affine_params"] == {"a": 0.5}
+        assert frames[1]["engine"] == "a"
+        assert frames[-1]["engine"] == "b"
+        assert all("frame" not in frame for frame in frames)
+
+    def test_interpolate_function_weights(self) -> None:
+        """Проверяет интерполяцию весов функций и округление целых полей."""
+        test_iterations = 150
+        keyframes = [
+            {
+                "frame": 0,
+                "iteration_count": 100,
+                "functions": [{"name": "swirl", "weight": 0.0}],
+            },
+            {
+                "frame": 2,
+                "iteration_count": 200,
+                "functions": [{"name": "swirl", "weight": 1.0}],
+            },
+        ]
+
+        middle = interpolate_keyframes(keyframes)[1]
+
+        assert middle["iteration_count"] == test_iterations
+        assert middle["functions"] == [{"name": "swirl", "weight": 0.5}]
+
+    def test_load_frames_applies_base_and_numbers_outputs(self) -> None:
+        """Проверяет наложение кадров на base и нумерацию файлов."""
+        test_width = 40
+        spec = {
+            "base": {"width": test_width, "output_path": "out/flame.png"},
+            "frames": [{"seed": 1.0}, {"seed": 2.0}],
+        }
+
+        frames = load_frames(spec)
+
+        assert [frame.width for frame in frames] == [test_width, test_width]
+        assert [frame.seed for frame in frames] == [1.0, 2.0]
+        assert frames[1].output_path == str(Path("out/flame_0001.png"))
+
+    def test_load_frames_requires_frames(self) -> None:
+        """Проверяет ошибку для описания без кадров."""
+        with pytest.raises(ValueError, match="frames"):
+            load_frames({"base": {}})
+
+    def test_numbered_path(self) -> None:
+        """Проверяет номер кадра в имени файла."""
+        assert numbered_path("result.png", 7) == "result_0007.png"
+
+    @pytest.mark.parametrize("parallel_frames", [False, True])
+    def test_render_writes_numbered_frames(
+        self, tmp_path: Path, *, parallel_frames: bool
+    ) -> None:
+        """Проверяет что все кадры серии сохраняются общим пулом."""
+        spec = {
+            "base": {
+                "width": 20,
+                "height": 10,
+                "iteration_count": 500,
+                "threads": 2,
+                "engine": "batch",
+                "histogram": "dense",
+                "output_path": str(tmp_path / "frame.png"),
+            },
+            "keyframes": [
+                {"frame": 0, "affine_params": dict.fromkeys("abcdef", 0.5)},
+                {"frame": 2, "affine_params": dict.fromkeys("abcdef", 0.7)},
+            ],
+        }
+
+        renderer = FrameRenderer(2, parallel_frames=parallel_frames)
+        paths = renderer.render(load_frames(spec))
+
+        assert paths == [str(tmp_path / f"frame_000{index}.png") for index in range(3)]
+        assert all(Path(path).exists() for path in paths)
+
+    def test_parallel_frames_in_tile_mode(self, tmp_path: Path) -> None:
+        """Проверяет кадры в тайлах, которые процессы пула считают у себя.
+
+        Буфер кадра в процессе пула состоит из одного среза, поэтому номер
+        процесса пула не должен использоваться как номер среза.
+        """
+        spec = {
+            "base": {
+                "width": 20,
+                "height": 10,
+                "iteration_count": 500,
+                "engine": "batch",
+                "tile_size": 8,
+                "tile_dir": str(tmp_path),
+                "output_path": str(tmp_path / "frame.png"),
+            },
+            "frames": [{"seed": float(seed)} for seed in range(4)],
+        }
+
+        paths = FrameRenderer(2, parallel_frames=True).render(load_frames(spec))
+
+        assert all(Path(path).exists() for path in paths)
+
+    def test_sequential_frames_use_pool_by_default(self, tmp_path: Path) -> None:
+        """Проверяет что кадры без threads в конфиге считаются пулом серии."""
+        spec = {
+            "base": {
+                "width": 20,
+                "height": 10,
+                "iteration_count": 500,
+                "engine": "batch",
+                "output_path": str(tmp_path / "frame.png"),
+            },
+            "frames": [{"seed": 1.0}, {"seed": 2.0}],
+        }
+        original = FractalEngine._single_thread_generate
+
+        with patch.object(
+            FractalEngine,
+            "_single_thread_generate",
+            autospec=True,
+            side_effect=original,
+        ) as single_thread:
+            paths = FrameRenderer(2).render(load_frames(spec))
+
+        assert single_thread.call_count == 0
+        assert all(Path(path).exists() for path in paths)
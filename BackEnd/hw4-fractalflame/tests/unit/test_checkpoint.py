@@ -0,0 +1,88 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+from checkpoint import Checkpoint, load_checkpoint, save_checkpoint
+from histogram import DenseHistogram
+from rng import WalkerStreams
+
+# Точек в чекпоинте тестов, две группы генераторов
+TEST_WALKERS = 300
+
+
+def make_checkpoint(symmetry_level: int = 1) -> Checkpoint:
+    """Небольшой чекпоинт для тестов."""
+    streams = WalkerStreams(0, range(2), TEST_WALKERS)
+    hist = DenseHistogram(8, 6, 2.2, symmetry_level)
+    hist.counts[2, 3] = 4
+    hist.colors[2, 3] = 0.3
+    xs, ys, colors = streams.spawn()
+    return Checkpoint(
+        hist=hist,
+        iterations=1000,
+        xs=xs,
+        ys=ys,
+        colors=colors,
+        rng_state=streams.state,
+    )
+
+
+class TestCheckpoint:
+    """Тесты сохранения и загрузки чекпоинтов."""
+
+    def test_roundtrip(self, tmp_path: Path) -> None:
+        """Проверяет что загруженный чекпоинт совпадает с сохраненным."""
+        path = str(tmp_path / "flame.npz")
+        checkpoint = make_checkpoint()
+
+        save_checkpoint(path, checkpoint)
+        loaded = load_checkpoint(path, 2.2, 1)
+
+        assert loaded.iterations == checkpoint.iterations
+        assert np.array_equal(loaded.hist.counts, checkpoint.hist.counts)
+        assert np.array_equal(loaded.hist.colors, checkpoint.hist.colors)
+        assert np.array_equal(loaded.xs, checkpoint.xs)
+        assert np.array_equal(loaded.colors, checkpoint.colors)
+        assert loaded.rng_state == checkpoint.rng_state
+
+    def test_restored_rng_continues_sequence(self, tmp_path: Path) -> None:
+        """Проверяет что генераторы групп продолжают те же последовательности."""
+        path = str(tmp_path / "flame.npz")
+        checkpoint = make_checkpoint()
+
+        save_checkpoint(path, checkpoint)
+        streams = WalkerStreams(0, range(2), TEST_WALKERS)
+        streams.state = load_checkpoint(path, 2.2, 1).rng_state
+
+        # Генераторы чекпоинта уже выдали стартовые точки
+        reference = WalkerStreams(0, range(2), TEST_WALKERS)
+        reference.spawn()
+        assert np.array_equal(streams.random(), reference.random())
+
+    def test_save_leaves_no_temp_file(self, tmp_path: Path) -> None:
+        """Проверяет что временный файл заменяется итоговым."""
+        path = tmp_path / "flame.npz"
+
+        save_checkpoint(str(path), make_checkpoint())
+
+        assert path.exists()
+        assert not Path(f"{path}.tmp").exists()
+
+    def test_load_rejects_other_symmetry(self, tmp_path: Path) -> None:
+        """Проверяет отказ загружать чекпоинт с другой симметрией."""
+        path = str(tmp_path / "flame.npz")
+        save_checkpoint(path, make_checkpoint(symmetry_level=2))
+
+        with pytest.raises(ValueError, match="симметрии"):
+            load_checkpoint(path, 2.2, 1)
+
+    def test_load_rejects_other_mirror(self, tmp_path: Path) -> None:
+        """Проверяет отказ загружать чекпоинт без отражений при mirror."""
+        path = str(tmp_path / "flame.npz")
+        save_checkpoint(path, make_checkpoint())
+
+        with pytest.raises(ValueError, match="Зеркальная"):
+            load_checkpoint(path, 2.2, 1, mirror=True)
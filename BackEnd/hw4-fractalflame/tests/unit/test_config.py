@@ -25,6 +25,9 @@ class TestConfig:
         assert config.threads == 1
         assert config.gamma == default_gamma
         assert config.symmetry_level == 1
+        assert config.engine == "scalar"
+        assert config.oversample == 1
+        assert config.density_estimation() is None
 
     def test_parse_functions_valid_string(self) -> None:
         """Проверяет парсинг строки функций."""
@@ -43,6 +46,19 @@ class TestConfig:
         expected = {"a": 1.0, "b": 2.0, "c": 3.0, "d": 4.0, "e": 5.0, "f": 6.0}
         assert result == expected
 
+    def test_density_estimation_scaled_by_oversample(self) -> None:
+        """Проверяет перевод радиусов размытия в пиксели гистограммы."""
+        test_radius = 3.0
+        test_oversample = 2
+        config = Config()
+        config.de_radius = test_radius
+        config.oversample = test_oversample
+
+        params = config.density_estimation()
+
+        assert params.radius == test_radius * test_oversample
+        assert params.curve == config.de_curve
+
     @patch("config.Config._parse_cli_args")
     def test_load_with_priority_no_config_file(self, mock_parse_args: Mock) -> None:
         """Проверяет загрузку без конфиг файла."""
@@ -164,6 +180,7 @@ class TestConfig:
         test_threads = 2
         test_gamma = 2.0
         test_symmetry = 3
+        test_batch_size = 512
         config = Config()
         json_config = {
             "width": test_width,
@@ -174,6 +191,8 @@ class TestConfig:
             "threads": test_threads,
             "gamma": test_gamma,
             "symmetry_level": test_symmetry,
+            "engine": "batch",
+            "batch_size": test_batch_size,
             "functions": [{"name": "linear", "weight": 1.0}],
             "affine_params": {
                 "a": 1.0,
@@ -195,6 +214,8 @@ class TestConfig:
         assert config.threads == test_threads
         assert config.gamma == test_gamma
         assert config.symmetry_level == test_symmetry
+        assert config.engine == "batch"
+        assert config.batch_size == test_batch_size
         assert config.functions == [{"name": "linear", "weight": 1.0}]
         assert config.affine_params == {
             "a": 1.0,
@@ -204,3 +225,18 @@ class TestConfig:
             "e": 1.0,
             "f": 1.0,
         }
+
+    def test_preview_from_json_object(self) -> None:
+        """Проверяет что предпросмотр выключен по умолчанию и задается объектом."""
+        test_port = 8000
+        test_scale = 2
+        config = Config()
+
+        assert config.preview() is None
+
+        config._apply_json({"preview": {"port": test_port, "scale": test_scale}})
+        options = config.preview()
+
+        assert options.port == test_port
+        assert options.scale == test_scale
+        assert options.path is None
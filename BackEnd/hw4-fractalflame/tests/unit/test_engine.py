@@ -1,10 +1,31 @@
 import sys
+from itertools import pairwise
 from pathlib import Path
 from unittest.mock import Mock, patch
 
+import numpy as np
+import pytest
+
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
-from engine import FractalEngine
-from histogram import Histogram
+from checkpoint import load_checkpoint
+from config import Config
+from engine import WALKER_STEPS, FractalEngine, create_pool
+from histogram import DenseHistogram, Histogram
+from measure import metrics
+from rng import GROUP_SIZE, SCALAR_STREAM_ITERATIONS, seed_entropy
+
+
+def as_arrays(hist: Histogram | DenseHistogram) -> tuple:
+    """Счетчики и цвета гистограммы любого типа в виде массивов."""
+    if isinstance(hist, DenseHistogram):
+        return hist.counts, hist.colors
+
+    counts = np.zeros((hist.height, hist.width), dtype=np.int64)
+    colors = np.zeros((hist.height, hist.width))
+    for (x, y), pixel in hist.data.items():
+        counts[y, x] = pixel["count"]
+        colors[y, x] = pixel["color"]
+    return counts, colors
 
 
 class TestFractalEngine:
@@ -31,12 +52,17 @@ class TestFractalEngine:
         """Проверяет однопоточную генерацию."""
         mock_config = Mock()
         mock_config.threads = 1
+        mock_config.tile_size = 0
+        mock_config.convergence_threshold = 0
         mock_config.width = 800
         mock_config.height = 600
+        mock_config.oversample = 1
         mock_config.gamma = 2.2
         mock_config.symmetry_level = 1
+        mock_config.mirror = False
         mock_config.seed = 1.0
         mock_config.iteration_count = 100
+        mock_config.burn_in = 0
         mock_config.functions = [{"name": "linear", "weight": 1.0}]
         mock_config.affine_params = {
             "a": 1.0,
@@ -52,11 +78,94 @@ class TestFractalEngine:
 
         assert isinstance(result, Histogram)
 
+    def test_generate_batch_engine(self) -> None:
+        """Проверяет генерацию пакетным движком."""
+        mock_config = Mock()
+        mock_config.threads = 1
+        mock_config.tile_size = 0
+        mock_config.convergence_threshold = 0
+        mock_config.engine = "batch"
+        mock_config.batch_size = 64
+        mock_config.burn_in = 20
+        mock_config.checkpoint_path = None
+        mock_config.width = 80
+        mock_config.height = 60
+        mock_config.oversample = 1
+        mock_config.gamma = 2.2
+        mock_config.symmetry_level = 1
+        mock_config.mirror = False
+        mock_config.seed = 1.0
+        mock_config.iteration_count = 1000
+        mock_config.functions = [{"name": "swirl", "weight": 1.0}]
+        mock_config.affine_params = {
+            "a": 0.6,
+            "b": 0.6,
+            "c": 0.6,
+            "d": 0.6,
+            "e": 0.6,
+            "f": 0.6,
+        }
+
+        engine = FractalEngine(mock_config)
+        result = engine.generate()
+
+        assert isinstance(result, Histogram)
+        total = sum(pixel["count"] for pixel in result.data.values())
+        assert 0 < total <= mock_config.iteration_count
+
+    def test_batch_engine_matches_scalar_distribution(self) -> None:
+        """Проверяет статистическую эквивалентность пакетного и скалярного движков."""
+        grid = 4
+        test_tolerance = 0.02
+        histograms = {}
+        for engine_name in ("scalar", "batch"):
+            mock_config = Mock()
+            mock_config.threads = 1
+            mock_config.tile_size = 0
+            mock_config.convergence_threshold = 0
+            mock_config.engine = engine_name
+            mock_config.batch_size = 256
+            mock_config.burn_in = 20
+            mock_config.checkpoint_path = None
+            mock_config.width = grid
+            mock_config.height = grid
+            mock_config.oversample = 1
+            mock_config.gamma = 2.2
+            mock_config.symmetry_level = 1
+            mock_config.mirror = False
+            mock_config.seed = 3.0
+            mock_config.iteration_count = 20000
+            mock_config.functions = [
+                {"name": "swirl", "weight": 1.0},
+                {"name": "horseshoe", "weight": 0.8},
+            ]
+            mock_config.affine_params = {
+                "a": 0.6,
+                "b": 0.6,
+                "c": 0.6,
+                "d": 0.6,
+                "e": 0.6,
+                "f": 0.6,
+            }
+            hist = FractalEngine(mock_config).generate()
+            density = np.zeros((grid, grid))
+            for (x, y), pixel in hist.data.items():
+                density[y, x] = pixel["count"]
+            histograms[engine_name] = density / density.sum()
+
+        assert np.abs(histograms["scalar"] - histograms["batch"]).max() < test_tolerance
+
+    def test_seed_entropy_is_deterministic(self) -> None:
+        """Проверяет перевод seed в целое число."""
+        assert seed_entropy(5.1234) == seed_entropy(5.1234)
+        assert seed_entropy(1.0) != seed_entropy(2.0)
+
     def test_create_worker_args(self) -> None:
         """Проверяет создание аргументов для воркеров."""
         mock_config = Mock()
         mock_config.threads = 3
         mock_config.iteration_count = 100
+        mock_config.chunk_size = 0
         mock_config.functions = [{"name": "linear", "weight": 1.0}]
         mock_config.affine_params = {
             "a": 1.0,
@@ -72,14 +181,36 @@ class TestFractalEngine:
 
         assert all(isinstance(arg, tuple) for arg in args)
 
+    def test_create_worker_args_covers_all_units(self) -> None:
+        """Проверяет что чанки подряд покрывают все группы точек."""
+        test_groups = 10
+        config = Config()
+        config.threads = 3
+        config.engine = "batch"
+        config.batch_size = test_groups * GROUP_SIZE
+        config.iteration_count = config.batch_size * 4
+        config.chunk_size = GROUP_SIZE * 4 * 3
+
+        args = FractalEngine(config)._create_worker_args()
+
+        assert args[0][0] == 0
+        assert args[-1][1] == test_groups
+        assert all(prev[1] == nxt[0] for prev, nxt in pairwise(args))
+        assert [stop - first for first, stop in args[:-1]] == [3] * (len(args) - 1)
+        assert len(args) > config.threads
+
     def test_worker_function(self) -> None:
         """Проверяет функцию воркера."""
         mock_config = Mock()
         mock_config.width = 800
         mock_config.height = 600
+        mock_config.oversample = 1
         mock_config.gamma = 2.2
         mock_config.symmetry_level = 1
+        mock_config.mirror = False
         mock_config.seed = 1.0
+        mock_config.iteration_count = 10
+        mock_config.burn_in = 0
         mock_config.functions = [{"name": "linear", "weight": 1.0}]
         mock_config.affine_params = {
             "a": 1.0,
@@ -91,7 +222,7 @@ class TestFractalEngine:
         }
 
         engine = FractalEngine(mock_config)
-        test_args = (1, 10)
+        test_args = (0, 1)
 
         result = engine._worker(test_args)
 
@@ -112,20 +243,350 @@ class TestFractalEngine:
 
         engine = FractalEngine(mock_config)
 
+        test_color = 3.0
         hist1 = Histogram()
-        hist1.data = {(1, 1): {"count": 2, "color": (1.0, 1.0, 1.0)}}
+        hist1.data = {(1, 1): {"count": 2, "color": 1.0}}
 
         hist2 = Histogram()
-        hist2.data = {(1, 1): {"count": 3, "color": (2.0, 2.0, 2.0)}}
+        hist2.data = {(1, 1): {"count": 3, "color": 2.0}}
+
+        result = engine._merge_histograms([hist1, hist2])
+
+        assert result.data[(1, 1)]["color"] == test_color
+
+    def test_merge_dense_histograms(self) -> None:
+        """Проверяет объединение плотных гистограмм."""
+        mock_config = Mock()
+        mock_config.functions = [{"name": "linear", "weight": 1.0}]
+        mock_config.affine_params = {
+            "a": 1.0,
+            "b": 1.0,
+            "c": 1.0,
+            "d": 1.0,
+            "e": 1.0,
+            "f": 1.0,
+        }
+        test_count = 5
+
+        engine = FractalEngine(mock_config)
+
+        hist1 = DenseHistogram(10, 10)
+        hist1.counts[1, 1] = 2
+        hist2 = DenseHistogram(10, 10)
+        hist2.counts[1, 1] = 3
 
         result = engine._merge_histograms([hist1, hist2])
 
-        assert result.data[(1, 1)]["color"] == (3.0, 3.0, 3.0)
+        assert result.counts[1, 1] == test_count
+
+    def test_create_dense_histogram(self) -> None:
+        """Проверяет выбор плотной гистограммы через конфиг."""
+        mock_config = Mock()
+        mock_config.histogram = "dense"
+        mock_config.width = 80
+        mock_config.height = 60
+        mock_config.oversample = 1
+        mock_config.gamma = 2.2
+        mock_config.symmetry_level = 1
+        mock_config.mirror = False
+        mock_config.functions = [{"name": "linear", "weight": 1.0}]
+        mock_config.affine_params = {
+            "a": 1.0,
+            "b": 1.0,
+            "c": 1.0,
+            "d": 1.0,
+            "e": 1.0,
+            "f": 1.0,
+        }
+
+        engine = FractalEngine(mock_config)
+
+        assert isinstance(engine._create_histogram(), DenseHistogram)
+
+    def test_create_histogram_with_oversample(self) -> None:
+        """Проверяет что суперсэмплинг увеличивает гистограмму по каждой оси."""
+        test_oversample = 3
+        config = Config()
+        config.histogram = "dense"
+        config.width = 8
+        config.height = 6
+        config.oversample = test_oversample
+
+        hist = FractalEngine(config)._create_histogram()
+
+        assert hist.counts.shape == (6 * test_oversample, 8 * test_oversample)
+
+    def test_shared_memory_matches_process_backend(self) -> None:
+        """Проверяет что разделяемая память дает те же счетчики, что и pickle."""
+        results = {}
+        for backend in ("process", "shared_memory"):
+            config = Config()
+            config.threads = 2
+            config.parallel_backend = backend
+            config.engine = "batch"
+            config.histogram = "dense"
+            config.batch_size = 64
+            config.width = 40
+            config.height = 30
+            config.seed = 1.0
+            config.iteration_count = 2000
+            results[backend] = FractalEngine(config).generate()
+
+        assert isinstance(results["shared_memory"], DenseHistogram)
+        assert np.array_equal(
+            results["process"].counts, results["shared_memory"].counts
+        )
+
+    @pytest.mark.parametrize("backend", ["process", "shared_memory"])
+    def test_shared_pool_matches_own_pool(self, backend: str) -> None:
+        """Проверяет что генерация в общем пуле совпадает с генерацией в своем."""
+        config = Config()
+        config.threads = 2
+        config.parallel_backend = backend
+        config.engine = "batch"
+        config.histogram = "dense"
+        config.batch_size = 64
+        config.width = 40
+        config.height = 30
+        config.iteration_count = 2000
+
+        expected = FractalEngine(config).generate()
+        # Процессов в общем пуле больше, чем threads - срезов должно хватить всем
+        with create_pool(3) as pool:
+            engine = FractalEngine(config, pool=pool, processes=3)
+            result = engine.generate()
+            assert engine.__getstate__()["pool"] is None
+
+        assert np.array_equal(expected.counts, result.counts)
+
+    def test_shared_pool_needs_process_count(self) -> None:
+        """Проверяет что общий пул передается вместе с числом его процессов."""
+        with pytest.raises(ValueError, match="число его процессов"):
+            FractalEngine(Config(), pool=Mock())
+
+    def test_pool_workers_report_stage_metrics(self) -> None:
+        """Проверяет что замеры процессов пула попадают в замеры родителя."""
+        config = Config()
+        config.threads = 2
+        config.engine = "batch"
+        config.batch_size = GROUP_SIZE
+        config.width = 20
+        config.height = 10
+        # Две пачки точек, чтобы было два чанка
+        config.iteration_count = 2 * GROUP_SIZE * WALKER_STEPS
+        metrics.reset()
+
+        engine = FractalEngine(config)
+        engine.generate()
+
+        chunks = len(engine._create_worker_args())
+        assert metrics.stages["iterate"]["calls"] == chunks
+        assert metrics.stages["pickle"]["calls"] == chunks
+        assert {"worker_spawn", "unpickle", "merge"} <= metrics.stages.keys()
+
+    def test_thread_backend_uses_histogram_per_thread(self) -> None:
+        """Проверяет что потоки не создают гистограмму на каждый чанк."""
+        test_threads = 2
+        config = Config()
+        config.threads = test_threads
+        config.parallel_backend = "thread"
+        config.engine = "batch"
+        config.histogram = "dense"
+        config.batch_size = GROUP_SIZE
+        config.width = 20
+        config.height = 10
+        config.iteration_count = 8 * GROUP_SIZE * WALKER_STEPS
+        engine = FractalEngine(config)
+
+        with patch.object(
+            engine, "_create_histogram", wraps=engine._create_histogram
+        ) as create:
+            hist = engine.generate()
+        chunks = len(engine._create_worker_args())
+
+        config.threads = 1
+        expected = FractalEngine(config).generate()
+
+        assert chunks > test_threads
+        assert create.call_count <= test_threads
+        assert np.array_equal(hist.counts, expected.counts)
+
+    def test_tiled_mode_matches_shared_memory(self, tmp_path: Path) -> None:
+        """Проверяет что гистограмма на диске дает те же счетчики, что и в памяти."""
+        results = {}
+        for tile_size in (0, 8):
+            config = Config()
+            config.threads = 2
+            config.parallel_backend = "shared_memory"
+            config.engine = "batch"
+            config.batch_size = 64
+            config.width = 40
+            config.height = 30
+            config.seed = 1.0
+            config.iteration_count = 2000
+            config.tile_size = tile_size
+            config.tile_dir = str(tmp_path)
+            results[tile_size] = FractalEngine(config).generate()
+
+        assert np.array_equal(results[0].counts, results[8].counts)
+        assert not list(tmp_path.iterdir())
+
+    def test_checkpoint_walkers_do_not_depend_on_iterations(self) -> None:
+        """Проверяет что точек с чекпоинтами одна пачка при любом числе итераций."""
+        test_batch = 2 * GROUP_SIZE
+        plans = []
+        for iterations in (1000, 2_000_000, 1_000_000_000):
+            config = Config()
+            config.engine = "batch"
+            config.batch_size = test_batch
+            config.iteration_count = iterations
+            config.checkpoint_path = "render.npz"
+            plans.append(FractalEngine(config)._walker_plan())
+
+        assert {walkers for walkers, _ in plans} == {test_batch}
+        assert [steps for _, steps in plans] == [2, 3907, 1953125]
+
+    @pytest.mark.parametrize(
+        ("interval", "total", "batch_size"),
+        [
+            (1000, 2000, 100),
+            # Без чекпоинтов этим числам итераций соответствуют 1 и 3 пачки точек
+            (GROUP_SIZE * WALKER_STEPS, 3 * GROUP_SIZE * WALKER_STEPS, GROUP_SIZE),
+        ],
+    )
+    def test_resume_matches_uninterrupted_render(
+        self, tmp_path: Path, interval: int, total: int, batch_size: int
+    ) -> None:
+        """Проверяет что продолжение с чекпоинта равно непрерывной генерации."""
+
+        def make_config(path: str, iterations: int, *, resume: bool) -> Config:
+            config = Config()
+            config.engine = "batch"
+            config.batch_size = batch_size
+            config.width = 40
+            config.height = 30
+            config.iteration_count = iterations
+            config.checkpoint_path = path
+            config.checkpoint_interval = interval
+            config.resume = resume
+            return config
+
+        resumed_path = str(tmp_path / "resumed.npz")
+        FractalEngine(make_config(resumed_path, interval, resume=False)).generate()
+        resumed = FractalEngine(
+            make_config(resumed_path, total, resume=True)
+        ).generate()
+
+        straight_path = str(tmp_path / "straight.npz")
+        straight = FractalEngine(
+            make_config(straight_path, total, resume=False)
+        ).generate()
+
+        checkpoint = load_checkpoint(resumed_path, 2.2, 1)
+        assert checkpoint.iterations == total
+        # В чекпоинте одна пачка точек и генераторы только ее групп
+        assert checkpoint.xs.size == batch_size
+        assert len(checkpoint.rng_state) == -(-batch_size // GROUP_SIZE)
+        assert np.array_equal(resumed.counts, straight.counts)
+        assert np.allclose(resumed.colors, straight.colors)
+
+    @pytest.mark.parametrize(
+        ("engine_name", "histogram"),
+        [("batch", "dense"), ("batch", "dict"), ("scalar", "dense")],
+    )
+    def test_render_does_not_depend_on_split(
+        self, engine_name: str, histogram: str
+    ) -> None:
+        """Проверяет побитовое совпадение при разном числе процессов и чанков."""
+        results = []
+        for threads, chunk_size, backend in (
+            (1, 0, "process"),
+            (2, 0, "process"),
+            (3, 1, "process"),
+            (2, 0, "shared_memory"),
+            (3, 0, "thread"),
+        ):
+            config = Config()
+            config.engine = engine_name
+            config.histogram = histogram
+            config.threads = threads
+            config.chunk_size = chunk_size
+            config.parallel_backend = backend
+            config.batch_size = 5 * GROUP_SIZE - 10
+            config.width = 40
+            config.height = 30
+            config.seed = 2.0
+            config.iteration_count = (
+                20_000 if engine_name == "batch" else SCALAR_STREAM_ITERATIONS + 500
+            )
+            results.append(as_arrays(FractalEngine(config).generate()))
+
+        for counts, colors in results[1:]:
+            assert np.array_equal(results[0][0], counts)
+            assert np.array_equal(results[0][1], colors)
+
+    def test_burn_in_is_not_plotted(self) -> None:
+        """Проверяет что итерации разгона не попадают в гистограмму."""
+        totals = {}
+        for burn_in in (0, 50):
+            config = Config()
+            config.engine = "batch"
+            config.histogram = "dense"
+            config.batch_size = 100
+            config.burn_in = burn_in
+            config.width = 40
+            config.height = 30
+            config.iteration_count = 1000
+            # Вариация sinusoidal не выводит точки за пределы кадра
+            config.functions = [{"name": "sinusoidal", "weight": 1.0}]
+            config.affine_params = {"a": 0.1, "b": 0, "c": 0, "d": 0, "e": 0.1, "f": 0}
+            totals[burn_in] = FractalEngine(config).generate().counts.sum()
+
+        assert totals[0] == totals[50] == config.iteration_count
+
+    def test_convergence_stops_before_cap(self) -> None:
+        """Проверяет раннюю остановку и ее независимость от числа процессов."""
+        results = {}
+        for threads in (1, 2):
+            config = Config()
+            config.engine = "batch"
+            config.histogram = "dense"
+            config.threads = threads
+            config.batch_size = 2 * GROUP_SIZE
+            config.width = 40
+            config.height = 30
+            # Чанк - пачка точек, их 16 на весь рендер
+            config.iteration_count = config.batch_size * WALKER_STEPS * 16
+            config.convergence_threshold = 0.05
+            metrics.reset()
+            hist = FractalEngine(config).generate()
+            results[threads] = (hist.counts, metrics.values["iterations"])
+
+        assert results[1][1] < config.iteration_count
+        assert results[1][1] == results[2][1]
+        assert np.array_equal(results[1][0], results[2][0])
+
+    def test_resume_rejects_other_size(self, tmp_path: Path) -> None:
+        """Проверяет отказ продолжать чекпоинт другого размера."""
+        config = Config()
+        config.engine = "batch"
+        config.width = 40
+        config.height = 30
+        config.iteration_count = 100
+        config.checkpoint_path = str(tmp_path / "flame.npz")
+        FractalEngine(config).generate()
+
+        config.width = 50
+        config.resume = True
+
+        assert FractalEngine(config).generate() is None
 
     def test_generate_handles_exception(self) -> None:
         """Проверяет обработку исключений в generate."""
         mock_config = Mock()
         mock_config.threads = 1
+        mock_config.tile_size = 0
+        mock_config.convergence_threshold = 0
         mock_config.functions = [{"name": "linear", "weight": 1.0}]
         mock_config.affine_params = {
             "a": 1.0,
@@ -143,3 +604,55 @@ class TestFractalEngine:
         ):
             result = engine.generate()
         assert result is None
+
+    @pytest.mark.parametrize("histogram", ["dense", "dict"])
+    def test_snapshot_during_generation(self, histogram: str) -> None:
+        """Проверяет снимок незавершенной гистограммы и его уменьшение."""
+        test_factor = 2
+        config = Config()
+        config.engine = "batch"
+        config.histogram = histogram
+        config.width = 40
+        config.height = 30
+        config.iteration_count = 2000
+        engine = FractalEngine(config)
+        snapshots = []
+        original_iterate = engine._iterate
+
+        def iterate(hist: DenseHistogram, first: int, stop: int) -> None:
+            snapshots.append(engine.snapshot(test_factor))
+            original_iterate(hist, first, stop)
+            snapshots.append(engine.snapshot(test_factor))
+
+        with patch.object(engine, "_iterate", side_effect=iterate):
+            hist = engine.generate()
+
+        counts, _ = as_arrays(hist)
+        assert not snapshots[0][0].any()
+        assert snapshots[1][0].shape == (15, 20)
+        assert snapshots[1][0].sum() == counts.sum()
+        assert engine.snapshot() is None
+
+    def test_snapshot_reads_shared_memory_slots(self) -> None:
+        """Проверяет что снимок суммирует срезы процессов в разделяемой памяти."""
+        config = Config()
+        config.engine = "batch"
+        config.histogram = "dense"
+        config.threads = 2
+        config.parallel_backend = "shared_memory"
+        config.width = 40
+        config.height = 30
+        config.iteration_count = 2000
+        snapshots = []
+
+        def log_progress(engine: FractalEngine, *_: int) -> None:
+            snapshots.append(engine.snapshot())
+
+        # Движок передается в процессы, поэтому патчится класс, а не экземпляр
+        with patch.object(
+            FractalEngine, "_log_progress", autospec=True, side_effect=log_progress
+        ):
+            hist = FractalEngine(config).generate()
+
+        # После последнего чанка снимок совпадает с итоговой гистограммой
+        assert np.array_equal(snapshots[-1][0], hist.counts)
@@ -0,0 +1,116 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+from filters import (
+    DensityEstimation,
+    box_blur,
+    density_estimation,
+    downsample,
+    log_density,
+    relative_change,
+)
+
+
+class TestFilters:
+    """Тесты для размытия по плотности и суперсэмплинга."""
+
+    def test_box_blur_preserves_sum_inside_frame(self) -> None:
+        """Проверяет что размытие вдали от края не теряет энергию."""
+        data = np.zeros((9, 9))
+        data[4, 4] = 9.0
+
+        result = box_blur(data, 1)
+
+        assert np.isclose(result.sum(), data.sum())
+        assert np.allclose(result[3:6, 3:6], 1.0)
+
+    def test_box_blur_zero_radius_is_identity(self) -> None:
+        """Проверяет что нулевой радиус не меняет данные."""
+        data = np.arange(12, dtype=np.float64).reshape(3, 4)
+
+        assert np.array_equal(box_blur(data, 0), data)
+
+    def test_box_blur_matches_direct_window(self) -> None:
+        """Проверяет накопленные суммы против прямого окна с нулевыми краями."""
+        test_radius = 2
+        rng = np.random.default_rng(0)
+        data = rng.random((7, 6))
+
+        result = box_blur(data, test_radius)
+
+        padded = np.pad(data, test_radius)
+        window = 2 * test_radius + 1
+        for y, x in np.ndindex(data.shape):
+            expected = padded[y : y + window, x : x + window].sum() / window**2
+            assert np.isclose(result[y, x], expected)
+
+    def test_density_estimation_spreads_sparse_more(self) -> None:
+        """Проверяет что редкий пиксель размывается шире плотного."""
+        counts = np.zeros((21, 41), dtype=np.int64)
+        colors = np.zeros((21, 41))
+        counts[10, 10] = 1
+        counts[10, 30] = 10_000
+        colors[10, 10] = 1.0
+        colors[10, 30] = 5_000.0
+
+        params = DensityEstimation(radius=4.0, min_radius=0.0, curve=0.5)
+        blurred_counts, blurred_colors = density_estimation(counts, colors, params)
+
+        assert np.count_nonzero(blurred_counts[:, :20]) == 9 * 9
+        assert blurred_counts[10, 30] == counts[10, 30]
+        assert np.isclose(blurred_counts.sum(), counts.sum())
+        assert np.isclose(blurred_colors.sum(), colors.sum())
+
+    def test_density_estimation_keeps_average_color(self) -> None:
+        """Проверяет что размытие не меняет средний цвет одиночного пикселя."""
+        counts = np.zeros((9, 9), dtype=np.int64)
+        colors = np.zeros((9, 9))
+        counts[4, 4] = 2
+        colors[4, 4] = 1.5
+
+        blurred_counts, blurred_colors = density_estimation(
+            counts, colors, DensityEstimation(radius=2.0)
+        )
+
+        hit = blurred_counts > 0
+        avg = blurred_colors[hit] / blurred_counts[hit]
+        assert np.allclose(avg, 0.75)
+
+    def test_downsample_sums_blocks(self) -> None:
+        """Проверяет сворачивание блоков factor x factor."""
+        test_factor = 2
+        counts = np.arange(24).reshape(4, 6)
+        colors = np.ones((4, 6))
+
+        small_counts, small_colors = downsample(counts, colors, test_factor)
+
+        assert small_counts.shape == (2, 3)
+        assert small_counts[0, 0] == counts[:2, :2].sum()
+        assert small_counts.sum() == counts.sum()
+        assert np.all(small_colors == test_factor * test_factor)
+
+    def test_downsample_factor_one_is_identity(self) -> None:
+        """Проверяет что factor=1 возвращает данные без изменений."""
+        counts = np.ones((2, 2), dtype=np.int64)
+        colors = np.ones((2, 2))
+
+        result_counts, result_colors = downsample(counts, colors, 1)
+
+        assert result_counts is counts
+        assert result_colors is colors
+
+    def test_log_density_does_not_grow_with_samples(self) -> None:
+        """Проверяет что вдвое больше точек той же формы не меняют плотность."""
+        counts = np.array([[0, 1], [3, 4]])
+
+        assert np.array_equal(log_density(counts, 8), log_density(counts * 2, 16))
+        assert relative_change(log_density(counts, 8), log_density(counts, 8)) == 0
+
+    def test_relative_change_of_empty_image(self) -> None:
+        """Проверяет что пустое изображение не считается сошедшимся."""
+        empty = np.zeros((2, 2))
+
+        assert relative_change(empty, empty) == float("inf")
@@ -1,12 +1,25 @@
 import math
+import pickle
 import sys
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
-from histogram import Histogram
-from models import Color, Point
+from histogram import BaseHistogram, DenseHistogram, Histogram
+from models import Point
+
+
+def test_incomplete_histogram_fails_on_creation() -> None:
+    """Проверяет что гистограмма без части методов не создается."""
+
+    class PartialHistogram(BaseHistogram):
+        def merge(self, other: BaseHistogram) -> None:
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        PartialHistogram()
 
 
 class TestHistogram:
@@ -30,29 +43,29 @@ class TestHistogram:
         assert hist.symmetry_level == test_symmetry_level
         assert hist.data == {}
 
-    def test_add_single_point_within_bounds(self) -> None:
+    def test_add_point_within_bounds(self) -> None:
         """Проверяет добавление точки в пределах изображения."""
         test_width = 800
         test_height = 600
         hist = Histogram(width=test_width, height=test_height)
         point = Point(0.0, 0.0)
-        color = Color(0.5, 0.5, 0.5)
+        color = 0.5
 
-        hist._add_single_point(point, color)
+        hist.add_point(point, color)
 
         assert (400, 300) in hist.data
         assert hist.data[(400, 300)]["count"] == 1
-        assert hist.data[(400, 300)]["color"] == (0.5, 0.5, 0.5)
+        assert hist.data[(400, 300)]["color"] == color
 
-    def test_add_single_point_out_of_bounds(self) -> None:
+    def test_add_point_out_of_bounds(self) -> None:
         """Проверяет что точки вне изображения не добавляются."""
         test_width = 800
         test_height = 600
         hist = Histogram(width=test_width, height=test_height)
         point = Point(10.0, 10.0)
-        color = Color(0.5, 0.5, 0.5)
+        color = 0.5
 
-        hist._add_single_point(point, color)
+        hist.add_point(point, color)
 
         assert hist.data == {}
 
@@ -63,27 +76,204 @@ class TestHistogram:
         test_count = 2
         hist = Histogram(width=test_width, height=test_height)
         point = Point(0.0, 0.0)
-        color = Color(0.5, 0.5, 0.5)
+        color = 0.5
 
-        hist._add_single_point(point, color)
-        hist._add_single_point(point, color)
+        hist.add_point(point, color)
+        hist.add_point(point, color)
 
         assert hist.data[(400, 300)]["count"] == test_count
-        assert hist.data[(400, 300)]["color"] == (1.0, 1.0, 1.0)
+        assert hist.data[(400, 300)]["color"] == 1.0
 
-    def test_rotate_point(self) -> None:
-        """Проверяет поворот точки."""
-        test_tolerance = 0.001
-        hist = Histogram()
-        point = Point(1.0, 0.0)
+    def test_add_xy_matches_add_point(self) -> None:
+        """Проверяет добавление по координатам против добавления Point."""
+        xy_hist = Histogram(width=40, height=30, symmetry_level=3)
+        point_hist = Histogram(width=40, height=30, symmetry_level=3)
+
+        xy_hist.add_xy(0.7, -0.4, 0.5)
+        point_hist.add_point(Point(0.7, -0.4), 0.5)
 
-        rotated = hist._rotate_point(point, math.pi / 2)
+        assert xy_hist.data == point_hist.data
+        assert len(xy_hist.data) == len(xy_hist.symmetry)
 
-        assert abs(rotated.x - 0.0) < test_tolerance
-        assert abs(rotated.y - 1.0) < test_tolerance
+    def test_to_arrays(self) -> None:
+        """Проверяет перевод словарной гистограммы в массивы."""
+        test_count = 5
+        test_color = 3.0
+        hist = Histogram(width=4, height=2)
+        hist.data = {(3, 1): {"count": test_count, "color": test_color}}
+
+        counts, colors = hist.to_arrays()
+
+        assert counts.shape == (2, 4)
+        assert counts[1, 3] == test_count
+        assert colors[1, 3] == test_color
 
     def test_add_point_handles_exception(self) -> None:
         """Проверяет обработку исключений в add_point."""
         hist = Histogram()
         with pytest.raises(AttributeError):
             hist.add_point("invalid_point", "invalid_color")
+
+    def test_add_points_matches_add_point(self) -> None:
+        """Проверяет что пакетное добавление совпадает с поточечным."""
+        rng = np.random.default_rng(0)
+        xs = rng.uniform(-2.5, 2.5, 500)
+        ys = rng.uniform(-2.5, 2.5, 500)
+        colors = rng.random(500)
+        batch_hist = Histogram(width=40, height=30, symmetry_level=3)
+        scalar_hist = Histogram(width=40, height=30, symmetry_level=3)
+
+        batch_hist.add_points(xs, ys, colors)
+        for x, y, color in zip(xs, ys, colors, strict=True):
+            scalar_hist.add_point(Point(x, y), color)
+
+        assert batch_hist.data.keys() == scalar_hist.data.keys()
+        for key, value in scalar_hist.data.items():
+            assert batch_hist.data[key]["count"] == value["count"]
+            assert np.allclose(batch_hist.data[key]["color"], value["color"])
+
+    def test_symmetry_matrices_rotate_point(self) -> None:
+        """Проверяет готовые матрицы симметрии против поворота точки."""
+        test_level = 5
+        hist = Histogram(symmetry_level=test_level)
+        point = Point(0.3, -0.7)
+
+        for rotation, matrix in enumerate(hist.symmetry):
+            angle = rotation * 2 * math.pi / test_level
+            x, y = matrix @ (point.x, point.y)
+            assert math.isclose(
+                x, point.x * math.cos(angle) - point.y * math.sin(angle), abs_tol=1e-12
+            )
+            assert math.isclose(
+                y, point.x * math.sin(angle) + point.y * math.cos(angle), abs_tol=1e-12
+            )
+
+    def test_mirror_adds_reflected_copies(self) -> None:
+        """Проверяет что отражение удваивает копии и зеркалит точку по оси X."""
+        test_copies = 2
+        hist = Histogram(width=4, height=4, mirror=True)
+
+        hist.add_point(Point(0.5, 1.5), 1.0)
+
+        assert hist.symmetry.shape == (test_copies, 2, 2)
+        assert set(hist.data) == {(2, 3), (2, 0)}
+
+    def test_add_points_with_mirror_matches_add_point(self) -> None:
+        """Проверяет пакетную диэдральную симметрию против поточечной."""
+        rng = np.random.default_rng(1)
+        xs = rng.uniform(-2.5, 2.5, 200)
+        ys = rng.uniform(-2.5, 2.5, 200)
+        colors = rng.random(200)
+        batch_hist = DenseHistogram(width=40, height=30, symmetry_level=4, mirror=True)
+        scalar_hist = DenseHistogram(width=40, height=30, symmetry_level=4, mirror=True)
+
+        batch_hist.add_points(xs, ys, colors)
+        for x, y, color in zip(xs, ys, colors, strict=True):
+            scalar_hist.add_point(Point(x, y), color)
+
+        assert np.array_equal(batch_hist.counts, scalar_hist.counts)
+        assert np.allclose(batch_hist.colors, scalar_hist.colors)
+
+    def test_add_points_skips_non_finite(self) -> None:
+        """Проверяет что бесконечные координаты не попадают в гистограмму."""
+        hist = Histogram(width=800, height=600)
+
+        hist.add_points(np.array([np.inf, np.nan]), np.array([0.0, 0.0]), np.ones(2))
+
+        assert hist.data == {}
+
+
+class TestDenseHistogram:
+    """Тесты для класса DenseHistogram."""
+
+    def test_dense_histogram_initialization(self) -> None:
+        """Проверяет размеры массивов плотной гистограммы."""
+        test_width = 80
+        test_height = 60
+        hist = DenseHistogram(width=test_width, height=test_height)
+
+        assert hist.counts.shape == (test_height, test_width)
+        assert hist.colors.shape == (test_height, test_width)
+        assert hist.counts.sum() == 0
+
+    def test_add_single_point_increments_count(self) -> None:
+        """Проверяет накопление счетчика и цвета в пикселе."""
+        test_count = 2
+        hist = DenseHistogram(width=800, height=600)
+        point = Point(0.0, 0.0)
+        color = 0.5
+
+        hist.add_point(point, color)
+        hist.add_point(point, color)
+
+        assert hist.counts[300, 400] == test_count
+        assert hist.colors[300, 400] == 1.0
+
+    def test_add_points_matches_dict_histogram(self) -> None:
+        """Проверяет совпадение плотной гистограммы со словарной."""
+        rng = np.random.default_rng(1)
+        xs = rng.uniform(-2.5, 2.5, 1000)
+        ys = rng.uniform(-2.5, 2.5, 1000)
+        colors = rng.random(1000)
+        dense = DenseHistogram(width=20, height=10, symmetry_level=2)
+        sparse = Histogram(width=20, height=10, symmetry_level=2)
+
+        dense.add_points(xs, ys, colors)
+        sparse.add_points(xs, ys, colors)
+
+        assert dense.counts.sum() == sum(v["count"] for v in sparse.data.values())
+        for (x, y), value in sparse.data.items():
+            assert dense.counts[y, x] == value["count"]
+            assert np.allclose(dense.colors[y, x], value["color"])
+
+    def test_pickle_keeps_only_hit_pixels(self) -> None:
+        """Проверяет что сжатая передача между процессами не теряет данные."""
+        hist = DenseHistogram(400, 300, symmetry_level=2)
+        hist.counts[10, 20] = 4
+        hist.colors[10, 20] = 3.0
+
+        payload = pickle.dumps(hist)
+        restored = pickle.loads(payload)  # noqa: S301
+
+        assert len(payload) < hist.counts.nbytes
+        assert np.array_equal(restored.counts, hist.counts)
+        assert np.array_equal(restored.colors, hist.colors)
+        assert restored.symmetry_level == hist.symmetry_level
+
+    def test_fill_ratio(self) -> None:
+        """Проверяет долю пикселей с попаданиями."""
+        test_ratio = 0.25
+        dense = DenseHistogram(4, 2)
+        dense.counts[0, :2] = 3
+        sparse = Histogram(4, 2)
+        sparse.data = {(x, 0): {"count": 1, "color": 0.0} for x in range(2)}
+
+        assert dense.fill_ratio() == test_ratio
+        assert sparse.fill_ratio() == test_ratio
+
+    def test_count_array_matches_dense(self) -> None:
+        """Проверяет что словарь и плотные массивы дают одинаковые счетчики."""
+        rng = np.random.default_rng(4)
+        xs, ys = rng.uniform(-2, 2, (2, 500))
+        colors = rng.random(500)
+        dense = DenseHistogram(16, 12)
+        sparse = Histogram(16, 12)
+
+        dense.add_points(xs, ys, colors)
+        sparse.add_points(xs, ys, colors)
+
+        assert np.array_equal(sparse.count_array(), dense.count_array())
+        assert not Histogram(4, 2).count_array().any()
+
+    def test_merge(self) -> None:
+        """Проверяет сложение двух плотных гистограмм."""
+        test_count = 2
+        first = DenseHistogram(width=10, height=10)
+        second = DenseHistogram(width=10, height=10)
+        first.add_point(Point(0.0, 0.0), 0.2)
+        second.add_point(Point(0.0, 0.0), 0.3)
+
+        first.merge(second)
+
+        assert first.counts[5, 5] == test_count
+        assert np.isclose(first.colors[5, 5], 0.5)
@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+from histogram import DenseHistogram, Histogram
+from histogram_file import load_histogram, save_histogram
+
+
+def filled(histogram_class: type) -> Histogram | DenseHistogram:
+    """Гистограмма 16x12 с сотней случайных точек."""
+    rng = np.random.default_rng(5)
+    hist = histogram_class(16, 12, 1.8, 3, mirror=True)
+    hist.add_points(rng.uniform(-2, 2, 100), rng.uniform(-2, 2, 100), rng.random(100))
+    return hist
+
+
+class TestHistogramFile:
+    """Тесты сохранения и загрузки гистограммы рендера."""
+
+    @pytest.mark.parametrize("histogram_class", [Histogram, DenseHistogram])
+    def test_roundtrip(self, tmp_path: Path, histogram_class: type) -> None:
+        """Проверяет что загруженная гистограмма совпадает с сохраненной."""
+        path = str(tmp_path / "flame.npz")
+        hist = filled(histogram_class)
+
+        save_histogram(path, hist, 8, 6, oversample=2)
+        saved = load_histogram(path)
+
+        counts, colors = hist.to_arrays()
+        assert np.array_equal(saved.hist.counts, counts)
+        assert np.array_equal(saved.hist.colors, colors)
+        assert (saved.width, saved.height, saved.oversample) == (8, 6, 2)
+        assert saved.hist.gamma == hist.gamma
+        assert saved.hist.symmetry_level == hist.symmetry_level
+        assert saved.hist.mirror
+        assert not list(tmp_path.glob("*.tmp"))
+
+    def test_rejects_unknown_version(self, tmp_path: Path) -> None:
+        """Проверяет отказ загружать файл другой версии."""
+        path = tmp_path / "flame.npz"
+        with path.open("wb") as f:
+            np.savez(f, version=99)
+
+        with pytest.raises(ValueError, match="версия"):
+            load_histogram(str(path))
@@ -1,9 +1,24 @@
+import math
 import sys
 from pathlib import Path
 from unittest.mock import Mock, patch
 
+import numpy as np
+from PIL import Image
+
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
-from image import ImageExporter
+from filters import DensityEstimation
+from histogram import DenseHistogram, Histogram
+from image import ImageExporter, ToneMapping
+from image_writer import Encoding
+from palette import palette_lut
+
+
+def dict_hist(width: int, height: int, data: dict) -> Histogram:
+    """Словарная гистограмма с готовыми пикселями."""
+    hist = Histogram(width, height)
+    hist.data = data
+    return hist
 
 
 class TestImageExporter:
@@ -65,25 +80,25 @@ class TestImageExporter:
     @patch("image.logger")
     def test_save_success(self, mock_logger: Mock, mock_image_new: Mock) -> None:
         """Проверяет успешное сохранение изображения."""
-        test_hist = {(1, 1): {"count": 5, "color": (10.0, 20.0, 30.0)}}
+        test_hist = dict_hist(800, 600, {(1, 1): {"count": 5, "color": 2.5}})
         mock_image = Mock()
         mock_image_new.return_value = mock_image
 
-        exporter = ImageExporter(800, 600, 2.2, "test.png")
+        exporter = ImageExporter(800, 600, 2.2, "test.webp")
         with patch.object(exporter, "_hist_to_image", return_value=mock_image):
             exporter.save(test_hist)
 
-        mock_image.save.assert_called_once_with("test.png")
+        mock_image.save.assert_called_once_with("test.webp", quality=90, lossless=False)
         mock_logger.info.assert_called_once_with(
-            "Изображение сохранено в файл test.png"
+            "Изображение сохранено в файл test.webp"
         )
 
     @patch("image.logger")
     def test_save_handles_permission_error(self, mock_logger: Mock) -> None:
         """Проверяет обработку ошибки прав доступа."""
-        test_hist = {(1, 1): {"count": 5, "color": (10.0, 20.0, 30.0)}}
+        test_hist = dict_hist(800, 600, {(1, 1): {"count": 5, "color": 2.5}})
 
-        exporter = ImageExporter(800, 600, 2.2, "test.png")
+        exporter = ImageExporter(800, 600, 2.2, "test.webp")
         with patch.object(
             exporter, "_hist_to_image", side_effect=PermissionError("No permission")
         ):
@@ -93,35 +108,214 @@ class TestImageExporter:
 
     def test_hist_to_image_handles_invalid_data(self) -> None:
         """Проверяет обработку невалидных данных в гистограмме."""
-        test_hist = {
-            (1, 1): {"count": 5, "color": (10.0, 20.0, 30.0)},
-            (2, 2): {
-                "count": 0,
-                "color": (0.0, 0.0, 0.0),
-            },  # count = 0 вызовет ZeroDivisionError
-        }
+        test_hist = dict_hist(
+            800,
+            600,
+            {
+                (1, 1): {"count": 5, "color": 2.5},
+                (2, 2): {
+                    "count": 0,
+                    "color": 0.0,
+                },  # count = 0 вызовет ZeroDivisionError
+            },
+        )
 
         exporter = ImageExporter(800, 600, 2.2, "test.png")
         result = exporter._hist_to_image(test_hist)
 
-        assert isinstance(result, type(ImageExporter(1, 1, 1, "")._hist_to_image({})))
+        assert isinstance(result, Image.Image)
 
     def test_hist_to_image_with_valid_data(self) -> None:
         """Проверяет создание изображения с валидными данными."""
-        test_hist = {(1, 1): {"count": 5, "color": (10.0, 20.0, 30.0)}}
+        test_hist = dict_hist(800, 600, {(1, 1): {"count": 5, "color": 2.5}})
 
         exporter = ImageExporter(800, 600, 2.2, "test.png")
         result = exporter._hist_to_image(test_hist)
 
-        assert isinstance(result, type(ImageExporter(1, 1, 1, "")._hist_to_image({})))
+        assert isinstance(result, Image.Image)
 
     @patch("image.logger")
     def test_save_handles_is_a_directory_error(self, mock_logger: Mock) -> None:
         """Проверяет обработку ошибки когда путь это директория."""
-        test_hist = {(1, 1): {"count": 5, "color": (10.0, 20.0, 30.0)}}
+        test_hist = dict_hist(800, 600, {(1, 1): {"count": 5, "color": 2.5}})
 
-        exporter = ImageExporter(800, 600, 2.2, "test.png")
+        exporter = ImageExporter(800, 600, 2.2, "test.webp")
         with patch.object(exporter, "_hist_to_image", side_effect=IsADirectoryError()):
             exporter.save(test_hist)
 
         mock_logger.critical.assert_called_once()
+
+    def test_hist_to_image_dense_matches_dict(self) -> None:
+        """Проверяет одинаковое изображение для плотной и словарной гистограмм."""
+        test_hist = dict_hist(4, 4, {(1, 1): {"count": 5, "color": 3.0}})
+        dense = DenseHistogram(4, 4)
+        dense.counts[1, 1] = 5
+        dense.colors[1, 1] = 3.0
+
+        exporter = ImageExporter(4, 4, 2.2, "test.png")
+
+        assert exporter._hist_to_image(dense).tobytes() == (
+            exporter._hist_to_image(test_hist).tobytes()
+        )
+
+    def test_tone_map_matches_pixel_formula(self) -> None:
+        """Проверяет совпадение векторного тонмаппинга с формулой для пикселя."""
+        test_gamma = 2.2
+        rng = np.random.default_rng(0)
+        counts = rng.integers(0, 5000, (6, 8))
+        colors = rng.random((6, 8)) * counts
+        lut = palette_lut("flame", 256)
+
+        exporter = ImageExporter(8, 6, test_gamma, "test.png")
+        result = exporter._tone_map(counts, colors)
+
+        for y, x in np.ndindex(counts.shape):
+            count = int(counts[y, x])
+            if count == 0:
+                expected = (0, 0, 0)
+            else:
+                brightness = min(1.0, math.log(count + 1) / 10) ** (1 / test_gamma)
+                color = lut[round(colors[y, x] / count * 255)]
+                expected = tuple(int(c * brightness * 255) for c in color)
+            assert tuple(result[y, x]) == expected
+
+    def test_tone_map_invalid_color_is_black(self) -> None:
+        """Проверяет что невалидный цвет дает черный пиксель."""
+        counts = np.array([[5]])
+        colors = np.array([[np.nan]])
+
+        exporter = ImageExporter(1, 1, 2.2, "test.png")
+        result = exporter._tone_map(counts, colors)
+
+        assert not result.any()
+
+    def test_palette_changes_colors(self) -> None:
+        """Проверяет что индекс цвета переводится в цвет выбранной палитры."""
+        counts = np.array([[100, 100]])
+        colors = np.array([[0.0, 100.0]])
+
+        exporter = ImageExporter(
+            2, 1, 1.0, "test.png", tone=ToneMapping(palette="#ff0000,#0000ff")
+        )
+        result = exporter._tone_map(counts, colors)
+
+        assert result[0, 0, 0] > 0
+        assert result[0, 0, 2] == 0
+        assert result[0, 1, 0] == 0
+        assert result[0, 1, 2] > 0
+
+    def test_hist_to_image_empty_is_black(self) -> None:
+        """Проверяет что пустая гистограмма дает черное изображение."""
+        exporter = ImageExporter(4, 3, 2.2, "test.png")
+
+        result = exporter._hist_to_image(Histogram(4, 3))
+
+        assert result.size == (4, 3)
+        assert not np.asarray(result).any()
+
+    def test_hist_to_image_downsamples_oversampled_hist(self) -> None:
+        """Проверяет сворачивание гистограммы суперсэмплинга до размера кадра."""
+        test_oversample = 2
+        dense = DenseHistogram(8, 6)
+        dense.counts[0:2, 0:2] = 10
+        dense.colors[0:2, 0:2] = 10.0
+
+        exporter = ImageExporter(4, 3, 2.2, "test.png", oversample=test_oversample)
+        result = np.asarray(exporter._hist_to_image(dense))
+
+        assert result.shape == (3, 4, 3)
+        assert result[0, 0].all()
+        assert not result[1:].any()
+
+    def test_hist_to_image_with_density_estimation(self) -> None:
+        """Проверяет что размытие по плотности освещает соседей редкого пикселя."""
+        test_hist = dict_hist(5, 5, {(2, 2): {"count": 1, "color": 1.0}})
+        test_channels = 3
+
+        plain = ImageExporter(5, 5, 2.2, "test.png")
+        blurred = ImageExporter(
+            5, 5, 2.2, "test.png", density=DensityEstimation(radius=1.0)
+        )
+
+        assert np.count_nonzero(np.asarray(plain._hist_to_image(test_hist))) == (
+            test_channels
+        )
+        assert np.asarray(blurred._hist_to_image(test_hist))[1:4, 1:4].all()
+
+    def test_tiled_image_matches_whole_frame(self) -> None:
+        """Проверяет что сборка полосами совпадает с обработкой кадра целиком."""
+        test_oversample = 2
+        rng = np.random.default_rng(0)
+        dense = DenseHistogram(18, 14)
+        dense.counts[:] = rng.integers(0, 4, (14, 18)) * rng.integers(0, 2, (14, 18))
+        dense.colors[:] = rng.random((14, 18)) * dense.counts
+        density = DensityEstimation(radius=3.0)
+
+        whole = ImageExporter(
+            9, 7, 2.2, "test.png", oversample=test_oversample, density=density
+        )
+        tiled = ImageExporter(
+            9,
+            7,
+            2.2,
+            "test.png",
+            oversample=test_oversample,
+            density=density,
+            tile_size=2,
+        )
+
+        expected = np.asarray(whole._hist_to_image(dense)).astype(int)
+        result = np.asarray(tiled._hist_to_image(dense)).astype(int)
+        assert np.abs(expected - result).max() <= 1
+
+    def test_streamed_png_matches_image(self, tmp_path: Path) -> None:
+        """Проверяет что PNG, записанный полосами, совпадает с изображением PIL."""
+        rng = np.random.default_rng(1)
+        dense = DenseHistogram(12, 10)
+        dense.counts[:] = rng.integers(0, 50, (10, 12))
+        dense.colors[:] = rng.random((10, 12)) * dense.counts
+        path = tmp_path / "flame.png"
+
+        exporter = ImageExporter(12, 10, 2.2, str(path), tile_size=3)
+        exporter.save(dense)
+
+        with Image.open(path) as image:
+            assert np.array_equal(
+                np.asarray(image), np.asarray(exporter._hist_to_image(dense))
+            )
+
+    def test_tone_map_16_bits(self) -> None:
+        """Проверяет что 16 бит на канал дают тот же кадр с большей точностью."""
+        rng = np.random.default_rng(2)
+        counts = rng.integers(0, 5000, (6, 8))
+        colors = rng.random((6, 8)) * counts
+
+        low = ImageExporter(8, 6, 2.2, "test.png")._tone_map(counts, colors)
+        high = ImageExporter(
+            8, 6, 2.2, "test.png", encoding=Encoding(bit_depth=16)
+        )._tone_map(counts, colors)
+
+        assert high.dtype == np.uint16
+        assert np.abs((high / 65535 * 255).astype(int) - low).max() <= 1
+
+    def test_hdr_npy_is_linear_and_unclamped(self, tmp_path: Path) -> None:
+        """Проверяет что .npy хранит линейную яркость, которую PNG обрезает до 1."""
+        test_gamma = 1.0
+        rng = np.random.default_rng(3)
+        dense = DenseHistogram(8, 6)
+        dense.counts[:] = rng.integers(0, 5000, (6, 8))
+        dense.colors[:] = rng.random((6, 8)) * dense.counts
+        dense.counts[0, 0] = 10**6
+        dense.colors[0, 0] = 10**6
+        path = tmp_path / "flame.npy"
+
+        ImageExporter(8, 6, test_gamma, str(path), tile_size=4).save(dense)
+        hdr = np.load(path)
+        low = ImageExporter(8, 6, test_gamma, "test.png")._tone_map(
+            dense.counts, dense.colors
+        )
+
+        assert hdr.shape == (6, 8, 3)
+        assert hdr.max() > 1
+        # Без яркого пикселя в первой строке и при гамме 1 PNG - тот же кадр
+        assert np.abs(hdr[1:] * 255 - low[1:]).max() <= 1
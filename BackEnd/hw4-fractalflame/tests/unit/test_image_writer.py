@@ -0,0 +1,106 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+from image_writer import Encoding, NpyWriter, PngWriter, RowWriter, TiffWriter
+
+
+def random_rgb(bit_depth: int, height: int = 9, width: int = 5) -> np.ndarray:
+    """Случайный кадр с повторяющимися строками, чтобы работали все фильтры."""
+    rng = np.random.default_rng(bit_depth)
+    rgb = rng.integers(0, 1 << bit_depth, (height, width, 3))
+    rgb[4:6] = rgb[3]
+    return rgb.astype(np.uint16 if bit_depth == 16 else np.uint8)  # noqa: PLR2004
+
+
+class TestRowWriters:
+    """Тесты построчной записи PNG и TIFF."""
+
+    @pytest.mark.parametrize("writer_class", [PngWriter, TiffWriter])
+    @pytest.mark.parametrize("bit_depth", [8, 16])
+    def test_bands_match_whole_image(
+        self, tmp_path: Path, writer_class: type, bit_depth: int
+    ) -> None:
+        """Проверяет что файл из нескольких полос читается как исходный кадр."""
+        rgb = random_rgb(bit_depth)
+        path = tmp_path / "image"
+
+        with writer_class(str(path), 5, 9, bit_depth) as writer:
+            writer.write_rows(rgb[:4])
+            writer.write_rows(rgb[4:])
+
+        # PIL читает 16 бит на канал как 8, оставляя старший байт
+        expected = rgb if rgb.dtype == np.uint8 else (rgb >> 8).astype(np.uint8)
+        with Image.open(path) as image:
+            assert np.array_equal(np.asarray(image), expected)
+
+    def test_tiff_keeps_16_bits(self, tmp_path: Path) -> None:
+        """Проверяет что TIFF хранит полные 16 бит после заголовка."""
+        test_header = 8
+        rgb = random_rgb(16)
+        path = tmp_path / "image.tif"
+
+        with TiffWriter(str(path), 5, 9, 16) as writer:
+            writer.write_rows(rgb)
+
+        data = np.frombuffer(path.read_bytes(), "<u2", rgb.size, test_header)
+        assert np.array_equal(data.reshape(rgb.shape), rgb)
+
+    def test_missing_rows_raise(self, tmp_path: Path) -> None:
+        """Проверяет ошибку, если записаны не все строки."""
+        writer = PngWriter(str(tmp_path / "image.png"), 5, 9)
+        writer.write_rows(random_rgb(8)[:3])
+
+        with pytest.raises(ValueError, match="строк"):
+            writer.close()
+
+    def test_writer_without_write_fails_on_creation(self, tmp_path: Path) -> None:
+        """Проверяет что формат без _write не создается и не открывает файл."""
+
+        class PartialWriter(RowWriter):
+            pass
+
+        with pytest.raises(TypeError, match="abstract"):
+            PartialWriter(str(tmp_path / "image"), 5, 9, 8)
+
+        assert not list(tmp_path.iterdir())
+
+
+class TestEncoding:
+    """Тесты параметров кодирования."""
+
+    def test_format_by_suffix(self) -> None:
+        """Проверяет выбор построчной записи по расширению."""
+        encoding = Encoding()
+
+        assert encoding.streams("a.png")
+        assert encoding.streams("a.TIFF")
+        assert not encoding.streams("a.webp")
+        assert encoding.pil_options("a.webp") == {"quality": 90, "lossless": False}
+
+    def test_16_bits_need_png_or_tiff(self) -> None:
+        """Проверяет ошибку 16 бит для формата, который кодирует PIL."""
+        with pytest.raises(ValueError, match="16 бит"):
+            Encoding(bit_depth=16).pil_options("a.webp")
+
+    def test_invalid_bit_depth_raises(self) -> None:
+        """Проверяет что поддерживаются только 8 и 16 бит."""
+        with pytest.raises(ValueError, match="Бит на канал"):
+            Encoding(bit_depth=12)
+
+    def test_npy_bands_match_array(self, tmp_path: Path) -> None:
+        """Проверяет что .npy из нескольких полос читается np.load как float32."""
+        rgb = np.random.default_rng(0).random((9, 5, 3)) * 4
+        path = tmp_path / "image.npy"
+
+        with NpyWriter(str(path), 5, 9) as writer:
+            writer.write_rows(rgb[:2])
+            writer.write_rows(rgb[2:])
+
+        saved = np.load(path)
+        assert saved.dtype == np.float32
+        assert np.array_equal(saved, rgb.astype(np.float32))
@@ -1,8 +1,11 @@
+import json
+import pstats
 import sys
 from pathlib import Path
 from unittest.mock import Mock, patch
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+from engine import FractalEngine
 from main import main
 
 
@@ -45,14 +48,80 @@ class TestMain:
         mock_engine_instance.generate.return_value = mock_hist
 
         main()
-        mock_exporter_instance.save.assert_called_once_with(mock_hist.data)
+        mock_exporter_instance.save.assert_called_once_with(mock_hist)
 
     def test_main_returns_zero_on_success(self) -> None:
         """Проверяет возврат 0 при успехе."""
         with (
-            patch("main.Config"),
+            patch("main.Config") as mock_config,
             patch("main.FractalEngine"),
             patch("main.ImageExporter"),
         ):
+            mock_config.return_value.profile_path = None
+            mock_config.return_value.metrics_path = None
+            mock_config.return_value.histogram_path = None
+            mock_config.return_value.render_cache.return_value = None
+            mock_config.return_value.preview.return_value = None
             result = main()
             assert result == 0
+
+    def test_main_reuses_cached_histogram(self, tmp_path: Path) -> None:
+        """Проверяет что повторный рендер того же конфига берется из кэша."""
+        argv = [
+            "main.py",
+            "-W",
+            "40",
+            "-H",
+            "30",
+            "-i",
+            "1000",
+            "--cache-dir",
+            str(tmp_path / "cache"),
+        ]
+        images = []
+        original_generate = FractalEngine.generate
+
+        for run in range(2):
+            output = tmp_path / f"flame_{run}.png"
+            images.append(output)
+            with (
+                patch.object(sys, "argv", [*argv, "-o", str(output)]),
+                patch("main.FractalEngine.generate", autospec=True) as generate,
+            ):
+                generate.side_effect = original_generate
+                assert main() == 0
+            assert generate.call_count == (1 if run == 0 else 0)
+
+        assert images[0].read_bytes() == images[1].read_bytes()
+
+    def test_main_writes_metrics_and_profile(self, tmp_path: Path) -> None:
+        """Проверяет JSON с замерами этапов и файл профиля cProfile."""
+        metrics_path = tmp_path / "metrics.json"
+        profile_path = tmp_path / "flame.prof"
+        argv = [
+            "main.py",
+            "-W",
+            "40",
+            "-H",
+            "30",
+            "-i",
+            "1000",
+            "-o",
+            str(tmp_path / "flame.png"),
+            "--metrics",
+            str(metrics_path),
+            "--profile",
+            str(profile_path),
+        ]
+
+        with patch.object(sys, "argv", argv):
+            result = main()
+
+        report = json.loads(metrics_path.read_text(encoding="utf-8"))
+        assert result == 0
+        assert {"config_load", "generate", "iterate", "tone_map", "png_encode"} <= (
+            report["stages"].keys()
+        )
+        assert report["samples_per_sec"] > 0
+        assert 0 < report["fill_ratio"] <= 1
+        assert pstats.Stats(str(profile_path)).total_calls > 0
@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+from measure import Metrics, measure_time, metrics
+
+
+class TestMetrics:
+    """Тесты для замеров этапов."""
+
+    def test_stage_accumulates_calls(self) -> None:
+        """Проверяет суммирование повторных замеров этапа."""
+        test_calls = 2
+        report = Metrics()
+
+        for _ in range(test_calls):
+            with report.stage("iterate"):
+                pass
+
+        assert report.stages["iterate"]["calls"] == test_calls
+        assert report.stages["iterate"]["seconds"] >= 0
+
+    def test_merge_stages_from_other_process(self) -> None:
+        """Проверяет добавление замеров процесса пула."""
+        test_seconds = 1.5
+        report = Metrics()
+        report.add_stage("iterate", 1.0)
+
+        report.merge_stages({"iterate": {"seconds": 0.5, "calls": 3}})
+
+        assert report.stages["iterate"] == {"seconds": test_seconds, "calls": 4}
+
+    def test_report_contains_values(self) -> None:
+        """Проверяет показатели и пиковую память в отчете."""
+        test_ratio = 0.25
+        report = Metrics()
+        report.record("fill_ratio", test_ratio)
+
+        result = report.report()
+
+        assert result["fill_ratio"] == test_ratio
+        assert "peak_rss_bytes" in result
+
+    def test_measure_time_records_stage(self) -> None:
+        """Проверяет что декоратор с именем этапа пишет замер."""
+        metrics.reset()
+
+        @measure_time("Готово.", stage="merge")
+        def merge() -> int:
+            return 1
+
+        assert merge() == 1
+        assert metrics.stages["merge"]["calls"] == 1
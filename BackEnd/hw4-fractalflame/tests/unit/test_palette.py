@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+from palette import PALETTES, palette_lut, parse_palette
+
+
+class TestPalette:
+    """Тесты для палитр и таблиц цветов."""
+
+    @pytest.mark.parametrize("name", list(PALETTES))
+    def test_lut_starts_and_ends_with_stops(self, name: str) -> None:
+        """Проверяет что таблица проходит от первого до последнего цвета."""
+        test_size = 1024
+
+        lut = palette_lut(name, test_size)
+
+        assert lut.shape == (test_size, 3)
+        assert np.allclose(lut[0], PALETTES[name][0])
+        assert np.allclose(lut[-1], PALETTES[name][-1])
+
+    def test_lut_interpolates_between_stops(self) -> None:
+        """Проверяет линейную интерполяцию между опорными цветами."""
+        lut = palette_lut([(0, 0, 0), (1.0, 0.5, 0)], 3)
+
+        assert np.allclose(lut[1], (0.5, 0.25, 0))
+
+    def test_parse_hex_colors(self) -> None:
+        """Проверяет разбор цветов #rrggbb через запятую."""
+        stops = parse_palette("#ff0000, #00ff00")
+
+        assert np.allclose(stops, [(1, 0, 0), (0, 1, 0)])
+
+    def test_parse_unknown_name_raises(self) -> None:
+        """Проверяет ошибку для неизвестной палитры."""
+        with pytest.raises(ValueError, match="Неизвестная палитра"):
+            parse_palette("unknown")
@@ -0,0 +1,61 @@
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+from image import ImageExporter
+from preview import LivePreview, PreviewOptions
+
+
+def snapshot_arrays(factor: int) -> tuple:
+    """Снимок 8 x 6 пикселей, уменьшенный в factor раз, как у движка."""
+    counts = np.full((6 // factor, 8 // factor), 100 * factor * factor)
+    return counts, counts * 0.5
+
+
+class TestLivePreview:
+    """Тесты для класса LivePreview."""
+
+    def test_update_writes_png(self, tmp_path: Path) -> None:
+        """Проверяет запись уменьшенного снимка в файл."""
+        path = tmp_path / "preview.png"
+        options = PreviewOptions(path=str(path), scale=2)
+        exporter = ImageExporter(4, 3, 2.2, str(path))
+        preview = LivePreview(snapshot_arrays, exporter, options)
+
+        assert preview.update()
+
+        with Image.open(path) as image:
+            assert image.size == (4, 3)
+            assert np.asarray(image).all()
+
+    def test_no_data_is_skipped(self, tmp_path: Path) -> None:
+        """Проверяет что без данных генерации файл не создается."""
+        path = tmp_path / "preview.png"
+        options = PreviewOptions(path=str(path))
+        exporter = ImageExporter(2, 2, 2.2, str(path))
+        preview = LivePreview(lambda _: None, exporter, options)
+
+        assert not preview.update()
+        assert not path.exists()
+
+    def test_http_serves_snapshot(self) -> None:
+        """Проверяет отдачу страницы и последнего снимка по HTTP."""
+        options = PreviewOptions(port=0, interval=60.0)
+        exporter = ImageExporter(8, 6, 2.2, "preview.png")
+
+        with LivePreview(snapshot_arrays, exporter, options) as preview:
+            url = f"http://127.0.0.1:{preview.server.server_port}"
+            with pytest.raises(urllib.error.HTTPError, match="503"):
+                urllib.request.urlopen(f"{url}/preview.png")  # noqa: S310
+
+            preview.update()
+            with urllib.request.urlopen(f"{url}/preview.png") as response:  # noqa: S310
+                assert response.read() == preview.png
+            with urllib.request.urlopen(f"{url}/") as response:  # noqa: S310
+                assert b"/preview.png" in response.read()
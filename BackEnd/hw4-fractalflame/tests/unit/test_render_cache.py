@@ -0,0 +1,125 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+from config import Config
+from engine import FractalEngine
+from histogram import DenseHistogram
+from render_cache import RenderCache, config_key
+
+
+def filled_histogram(seed: int) -> DenseHistogram:
+    """Небольшая гистограмма со случайными точками."""
+    rng = np.random.default_rng(seed)
+    hist = DenseHistogram(16, 12)
+    hist.add_points(rng.uniform(-2, 2, 200), rng.uniform(-2, 2, 200), rng.random(200))
+    return hist
+
+
+class TestConfigKey:
+    """Тесты ключа кэша по конфигу."""
+
+    def test_key_ignores_fields_not_affecting_render(self) -> None:
+        """Проверяет что потоки, бэкенд и путь вывода не меняют ключ."""
+        first = Config()
+        second = Config()
+        second.threads = 8
+        second.parallel_backend = "thread"
+        second.output_path = "other.png"
+        second.gamma = 1.0
+
+        assert config_key(first) == config_key(second)
+
+    def test_key_normalizes_numbers(self) -> None:
+        """Проверяет что 2 и 2.0 дают один ключ."""
+        first = Config()
+        second = Config()
+        first.seed = 2
+        second.seed = 2.0
+
+        assert config_key(first) == config_key(second)
+
+    def test_key_depends_on_render_fields(self) -> None:
+        """Проверяет что seed и функции меняют ключ."""
+        base = Config()
+        other_seed = Config()
+        other_seed.seed = 1.0
+        other_functions = Config()
+        other_functions.functions = [{"name": "swirl", "weight": 2.0}]
+
+        keys = {config_key(base), config_key(other_seed), config_key(other_functions)}
+
+        assert len(keys) == len(("base", "seed", "functions"))
+
+    def test_key_depends_on_effective_convergence(self) -> None:
+        """Проверяет что порог сходимости меняет ключ только там, где действует."""
+        process = Config()
+        process.threads = 2
+        process.convergence_threshold = 0.05
+        thread = Config()
+        thread.threads = 2
+        thread.convergence_threshold = 0.05
+        # Бэкенд thread не останавливается по сходимости и рендерит все итерации
+        thread.parallel_backend = "thread"
+
+        process_key, thread_key = (
+            config_key(config, converging=FractalEngine(config).stops_early())
+            for config in (process, thread)
+        )
+
+        assert process_key != thread_key
+        assert thread_key == config_key(Config())
+
+    def test_key_depends_on_checkpoints(self) -> None:
+        """Проверяет что рендер с чекпоинтами не берет гистограмму обычного."""
+        config = Config()
+        config.engine = "batch"
+        config.checkpoint_path = "render.npz"
+
+        key = config_key(config, checkpointed=FractalEngine(config).checkpointed())
+
+        assert key != config_key(Config())
+
+
+class TestRenderCache:
+    """Тесты для класса RenderCache."""
+
+    def test_store_and_load(self, tmp_path: Path) -> None:
+        """Проверяет чтение сохраненной гистограммы."""
+        cache = RenderCache(str(tmp_path), 1 << 30)
+        hist = filled_histogram(0)
+
+        cache.store("key", hist, 8, 6, oversample=2)
+        saved = cache.load("key")
+
+        assert cache.load("missing") is None
+        assert saved.oversample == 2  # noqa: PLR2004
+        assert np.array_equal(saved.hist.counts, hist.counts)
+
+    def test_evicts_least_recently_used(self, tmp_path: Path) -> None:
+        """Проверяет вытеснение давно не использованного файла."""
+        cache = RenderCache(str(tmp_path), 1 << 30)
+        for index, key in enumerate(("old", "used", "new")):
+            cache.store(key, filled_histogram(index), 16, 12)
+            os.utime(cache.path(key), (index, index))
+        # Чтение обновляет время использования
+        cache.load("old")
+        cache.max_bytes = cache.path("new").stat().st_size * 2
+
+        cache.store("newest", filled_histogram(3), 16, 12)
+
+        assert not cache.path("used").exists()
+        assert not cache.path("new").exists()
+        assert cache.path("old").exists()
+        assert cache.path("newest").exists()
+
+    def test_broken_file_is_a_miss(self, tmp_path: Path) -> None:
+        """Проверяет что поврежденный файл кэша удаляется и не мешает рендеру."""
+        cache = RenderCache(str(tmp_path), 1 << 30)
+        cache.path("key").write_bytes(b"broken")
+
+        assert cache.load("key") is None
+        assert not cache.path("key").exists()
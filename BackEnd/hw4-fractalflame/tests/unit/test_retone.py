@@ -0,0 +1,101 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+from config import Config
+from filters import DensityEstimation
+from histogram import DenseHistogram
+from histogram_file import save_histogram
+from image import ImageExporter, ToneMapping
+from retone import retone
+
+
+class TestRetone:
+    """Тесты повторной тональной обработки сохраненной гистограммы."""
+
+    def test_retone_matches_direct_export(self, tmp_path: Path) -> None:
+        """Проверяет что retone дает то же, что экспорт с новыми параметрами."""
+        test_gamma = 1.5
+        test_scale = 4.0
+        rng = np.random.default_rng(6)
+        hist = DenseHistogram(16, 12)
+        hist.add_points(
+            rng.uniform(-2, 2, 2000), rng.uniform(-2, 2, 2000), rng.random(2000)
+        )
+        hist_path = str(tmp_path / "flame.npz")
+        save_histogram(hist_path, hist, 8, 6, oversample=2)
+
+        retone(
+            hist_path,
+            str(tmp_path / "retoned.png"),
+            gamma=test_gamma,
+            tone=ToneMapping(test_scale, "ice"),
+        )
+        ImageExporter(
+            8,
+            6,
+            test_gamma,
+            str(tmp_path / "direct.png"),
+            oversample=2,
+            tone=ToneMapping(test_scale, "ice"),
+        ).save(hist)
+
+        with (
+            Image.open(tmp_path / "retoned.png") as retoned,
+            Image.open(tmp_path / "direct.png") as direct,
+        ):
+            assert retoned.size == (8, 6)
+            assert np.array_equal(np.asarray(retoned), np.asarray(direct))
+
+    def test_density_radius_in_image_pixels(self, tmp_path: Path) -> None:
+        """Проверяет что радиусы размытия масштабируются как в основном конфиге."""
+        config = Config()
+        config.width, config.height = 8, 6
+        config.oversample = 2
+        config.de_radius = 1.5
+        config.de_min_radius = 0.5
+        config.de_curve = 0.3
+        rng = np.random.default_rng(7)
+        hist = DenseHistogram(16, 12)
+        hist.add_points(
+            rng.uniform(-2, 2, 500), rng.uniform(-2, 2, 500), rng.random(500)
+        )
+        hist_path = str(tmp_path / "flame.npz")
+        save_histogram(hist_path, hist, 8, 6, oversample=2)
+
+        retone(
+            hist_path,
+            str(tmp_path / "retoned.png"),
+            density=DensityEstimation(
+                config.de_radius, config.de_min_radius, config.de_curve
+            ),
+        )
+        ImageExporter(
+            8,
+            6,
+            hist.gamma,
+            str(tmp_path / "direct.png"),
+            oversample=2,
+            density=config.density_estimation(),
+        ).save(hist)
+
+        with (
+            Image.open(tmp_path / "retoned.png") as retoned,
+            Image.open(tmp_path / "direct.png") as direct,
+        ):
+            assert np.array_equal(np.asarray(retoned), np.asarray(direct))
+
+    def test_brightness_scale_brightens(self) -> None:
+        """Проверяет что меньший brightness_scale дает более яркий кадр."""
+        counts = np.full((2, 2), 20)
+        colors = np.full((2, 2), 10.0)
+
+        dim = ImageExporter(2, 2, 2.2, "x.png", tone=ToneMapping(10.0))
+        bright = ImageExporter(2, 2, 2.2, "x.png", tone=ToneMapping(5.0))
+
+        assert (
+            bright._tone_map(counts, colors).sum() > dim._tone_map(counts, colors).sum()
+        )
@@ -0,0 +1,67 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+from rng import GROUP_SIZE, WalkerStreams, quantize_colors, scalar_generator
+
+
+class TestWalkerStreams:
+    """Тесты генераторов групп точек."""
+
+    def test_group_does_not_depend_on_neighbours(self) -> None:
+        """Проверяет что числа группы не зависят от состава пачки."""
+        test_walkers = 4 * GROUP_SIZE - 7
+
+        whole = WalkerStreams(1.5, range(4), test_walkers).random()
+        part = WalkerStreams(1.5, range(1, 4), test_walkers).random()
+
+        assert whole.size == test_walkers
+        assert np.array_equal(whole[GROUP_SIZE:], part)
+
+    def test_restart_draws_only_for_lost_groups(self) -> None:
+        """Проверяет что перезапуск точек одной группы не сдвигает другую."""
+        test_walkers = 2 * GROUP_SIZE
+        streams = WalkerStreams(1.5, range(2), test_walkers)
+        reference = WalkerStreams(1.5, range(2), test_walkers)
+        lost = np.zeros(test_walkers, dtype=bool)
+        lost[[3, 10]] = True
+
+        xs, ys = streams.restart(lost)
+
+        assert xs.size == ys.size == lost.sum()
+        assert np.array_equal(
+            streams.random()[GROUP_SIZE:], reference.random()[GROUP_SIZE:]
+        )
+
+    def test_state_survives_json(self) -> None:
+        """Проверяет что состояние генераторов переживает JSON."""
+        streams = WalkerStreams(3.0, range(2), GROUP_SIZE + 1)
+        streams.random()
+        state = json.loads(json.dumps(streams.state))
+
+        restored = WalkerStreams(3.0, range(2), GROUP_SIZE + 1)
+        restored.state = state
+
+        assert np.array_equal(restored.random(), streams.random())
+
+    def test_scalar_streams_differ(self) -> None:
+        """Проверяет что потоки скалярного движка независимы и повторяемы."""
+        assert scalar_generator(1.0, 0).random() == scalar_generator(1.0, 0).random()
+        assert scalar_generator(1.0, 0).random() != scalar_generator(1.0, 1).random()
+
+
+def test_quantized_sums_do_not_depend_on_order() -> None:
+    """Проверяет что сумма округленных цветов не зависит от порядка сложения."""
+    colors = quantize_colors(np.random.default_rng(0).random(10_000))
+
+    forward = 0.0
+    for value in colors.tolist():
+        forward += value
+    backward = 0.0
+    for value in reversed(colors.tolist()):
+        backward += value
+
+    assert forward == backward == colors[::-1].sum()
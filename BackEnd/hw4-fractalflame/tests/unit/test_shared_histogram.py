@@ -0,0 +1,182 @@
+import sys
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+from histogram import DenseHistogram
+from models import Point
+from shared_histogram import HIT_BYTES, FileHistogramBuffer, SharedHistogramBuffer
+
+
+class TestSharedHistogramBuffer:
+    """Тесты для класса SharedHistogramBuffer."""
+
+    def test_buffer_starts_empty(self) -> None:
+        """Проверяет что новый буфер заполнен нулями."""
+        test_slots = 2
+        buffer = SharedHistogramBuffer(test_slots, 8, 6)
+        try:
+            assert buffer.counts.shape == (test_slots, 6, 8)
+            assert buffer.colors.shape == (test_slots, 6, 8)
+            assert buffer.counts.sum() == 0
+        finally:
+            buffer.close()
+            buffer.unlink()
+
+    def test_slot_writes_into_shared_memory(self) -> None:
+        """Проверяет что гистограмма среза пишет в разделяемую память."""
+        buffer = SharedHistogramBuffer(2, 10, 10)
+        try:
+            hist = buffer.slot(1, 2.2, 1)
+            hist.add_point(Point(0.0, 0.0), 0.5)
+
+            assert isinstance(hist, DenseHistogram)
+            assert buffer.counts[1, 5, 5] == 1
+            assert buffer.counts[0].sum() == 0
+            del hist
+        finally:
+            buffer.close()
+            buffer.unlink()
+
+    def test_attach_by_name_sees_same_data(self) -> None:
+        """Проверяет подключение к существующему блоку по имени."""
+        test_count = 7
+        owner = SharedHistogramBuffer(1, 4, 4)
+        try:
+            attached = SharedHistogramBuffer(1, 4, 4, name=owner.name)
+            attached.counts[0, 1, 1] = test_count
+            attached.close()
+
+            assert owner.counts[0, 1, 1] == test_count
+        finally:
+            owner.close()
+            owner.unlink()
+
+    def test_reduce_sums_slots(self) -> None:
+        """Проверяет суммирование срезов всех процессов."""
+        test_count = 3
+        buffer = SharedHistogramBuffer(3, 4, 4)
+        try:
+            buffer.counts[:, 2, 2] = 1
+            buffer.colors[:, 2, 2] = 0.3
+
+            result = buffer.reduce(2.2, 1)
+        finally:
+            buffer.close()
+            buffer.unlink()
+
+        assert result.counts[2, 2] == test_count
+        assert np.isclose(result.colors[2, 2], 0.9)
+
+
+class TestFileHistogramBuffer:
+    """Тесты для класса FileHistogramBuffer."""
+
+    def test_processes_share_one_slot(self, tmp_path: Path) -> None:
+        """Проверяет что процессы пишут в один срез и файл не растет с их числом."""
+        test_slots = 3
+        test_total = 2
+        buffer = FileHistogramBuffer(
+            test_slots, 4, 5, directory=str(tmp_path), tile_rows=2
+        )
+        other = FileHistogramBuffer(test_slots, 4, 5, name=buffer.name)
+        try:
+            for writer, index in ((buffer, 0), (other, 2)):
+                hist = writer.slot(index, 2.2, 1)
+                hist.add_points(np.array([1.0]), np.array([1.5]), np.array([0.5]))
+                hist.flush()
+
+            assert buffer.counts.shape == (1, 5, 4)
+            assert Path(buffer.name).stat().st_size == 4 * 5 * 16
+            result = buffer.reduce(2.2, 1)
+        finally:
+            other.close()
+            buffer.close()
+            buffer.unlink()
+
+        assert result.counts[4, 3] == test_total
+        assert result.colors[4, 3] == 1.0
+        assert not list(tmp_path.iterdir())
+
+    def test_points_reach_file_on_flush(self, tmp_path: Path) -> None:
+        """Проверяет что попадания копятся в процессе до записи полосами."""
+        test_count = 3
+        test_color = 1.25
+        buffer = FileHistogramBuffer(2, 8, 8, directory=str(tmp_path), tile_rows=3)
+        try:
+            hist = buffer.slot(1, 2.2, 1)
+            hist.add_points(
+                np.array([-1.9, -1.9, 1.9, 1.9]),
+                np.array([-1.9, -1.9, 1.9, -1.9]),
+                np.full(4, 0.25),
+            )
+            hist.add_point(Point(-1.9, -1.9), 0.25)
+            assert buffer.counts.sum() == 0
+
+            hist.flush()
+            assert buffer.counts[0, 0, 0] == test_count
+            assert buffer.counts[0, 7, 7] == 1
+            assert buffer.counts[0, 0, 7] == 1
+            assert buffer.colors[0].sum() == test_color
+            del hist
+        finally:
+            buffer.close()
+            buffer.unlink()
+
+    def test_full_buffer_is_flushed(self, tmp_path: Path) -> None:
+        """Проверяет запись при заполнении массивов попаданий, в том числе пачкой."""
+        test_capacity = 4
+        test_total = 11
+        buffer = FileHistogramBuffer(1, 8, 8, directory=str(tmp_path), tile_rows=3)
+        try:
+            with patch("shared_histogram.FLUSH_BYTES", test_capacity * HIT_BYTES):
+                hist = buffer.slot(0, 2.2, 1)
+            hist.add_points(np.zeros(6), np.zeros(6), np.ones(6))
+            assert buffer.counts.sum() == test_capacity
+
+            for _ in range(5):
+                hist.add_point(Point(0.0, 0.0), 1.0)
+            assert buffer.counts.sum() == 2 * test_capacity
+
+            hist.flush()
+            assert buffer.counts[0, 4, 4] == test_total
+            assert buffer.colors[0, 4, 4] == test_total
+            del hist
+        finally:
+            buffer.close()
+            buffer.unlink()
+
+    def test_reduce_sums_slots_without_locks(self, tmp_path: Path) -> None:
+        """Проверяет суммирование отдельных срезов файла там, где нет fcntl."""
+        test_total = 5
+        test_color = 3.0
+        with patch("shared_histogram.fcntl", None):
+            buffer = FileHistogramBuffer(3, 4, 5, directory=str(tmp_path), tile_rows=2)
+            other = FileHistogramBuffer(3, 4, 5, name=buffer.name)
+            try:
+                buffer.slot(0, 2.2, 1).counts[4, 3] = 2
+                other.slot(2, 2.2, 1).counts[4, 3] = 3
+                other.slot(1, 2.2, 1).colors[0, 0] = test_color
+
+                result = buffer.reduce(2.2, 1)
+            finally:
+                other.close()
+                buffer.close()
+                buffer.unlink()
+
+        assert result.counts[4, 3] == test_total
+        assert result.colors[0, 0] == test_color
+        assert not list(tmp_path.iterdir())
+
+    def test_not_enough_disk_space(self, tmp_path: Path) -> None:
+        """Проверяет отказ до создания файла, если на диске мало места."""
+        with (
+            patch("shutil.disk_usage", return_value=Mock(free=100)),
+            pytest.raises(OSError, match="Для гистограммы нужно"),
+        ):
+            FileHistogramBuffer(2, 40, 30, directory=str(tmp_path))
+
+        assert not list(tmp_path.iterdir())
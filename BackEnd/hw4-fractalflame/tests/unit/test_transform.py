@@ -1,9 +1,20 @@
+import math
+import random
 import sys
 from pathlib import Path
 
+import numpy as np
+import pytest
+
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
-from models import Color, Point
-from transform import AffineTransformer, Transformations, TransformationSystem
+from models import Point
+from rng import WalkerStreams
+from transform import (
+    AffineTransformer,
+    BatchTransformations,
+    Transformations,
+    TransformationSystem,
+)
 
 
 class TestTransformations:
@@ -11,57 +22,34 @@ class TestTransformations:
 
     def test_linear_transformation(self) -> None:
         """Проверяет линейную трансформацию."""
-        test_point = Point(1.0, 2.0)
-        test_color = Color(0.1, 0.2, 0.3)
-
-        result_point, result_color = Transformations.linear(test_point, test_color)
+        result = Transformations.linear(1.0, 2.0)
 
-        assert result_point.x == test_point.x
-        assert result_point.y == test_point.y
-        assert result_color.r == (test_color.r + 0.95) / 2
-        assert result_color.g == (test_color.g + 0.85) / 2
-        assert result_color.b == (test_color.b + 0.1) / 2
+        assert result == (1.0, 2.0)
 
     def test_swirl_transformation(self) -> None:
         """Проверяет swirl трансформацию."""
-        test_point = Point(1.0, 0.0)
-        test_color = Color(0.1, 0.2, 0.3)
+        x, y = Transformations.swirl(1.0, 0.0)
 
-        result_point, result_color = Transformations.swirl(test_point, test_color)
-
-        assert isinstance(result_point, Point)
-        assert isinstance(result_color, Color)
+        assert (x, y) == (math.sin(1.0), math.cos(1.0))
 
     def test_horseshoe_transformation_zero_radius(self) -> None:
         """Проверяет horseshoe трансформацию с нулевым радиусом."""
-        test_point = Point(0.0, 0.0)
-        test_color = Color(0.1, 0.2, 0.3)
-
-        result_point, result_color = Transformations.swirl(test_point, test_color)
+        result = Transformations.horseshoe(0.0, 0.0)
 
-        assert isinstance(result_point, Point)
-        assert isinstance(result_color, Color)
+        assert result == (0, 0)
 
     def test_sinusoidal_transformation(self) -> None:
         """Проверяет sinusoidal трансформацию."""
-        test_point = Point(1.0, 2.0)
-        test_color = Color(0.1, 0.2, 0.3)
+        x, y = Transformations.sinusoidal(1.0, 2.0)
 
-        result_point, result_color = Transformations.sinusoidal(test_point, test_color)
-
-        assert isinstance(result_point, Point)
-        assert isinstance(result_color, Color)
+        assert (x, y) == (math.sin(1.0) * 3.0, math.sin(2.0) * 3.0)
 
     def test_spherical_transformation_zero_radius(self) -> None:
         """Проверяет spherical трансформацию с нулевым радиусом."""
-        test_point = Point(0.0, 0.0)
-        test_color = Color(0.1, 0.2, 0.3)
-
-        result_point, result_color = Transformations.spherical(test_point, test_color)
+        x, y = Transformations.spherical(0.0, 0.0)
 
-        assert result_point.x == 0.0
-        assert result_point.y == 0.0
-        assert isinstance(result_color, Color)
+        assert x == 0.0
+        assert y == 0.0
 
     def test_get_variation_existing(self) -> None:
         """Проверяет получение существующей трансформации."""
@@ -74,6 +62,36 @@ class TestTransformations:
         assert result == Transformations.linear
 
 
+class TestBatchTransformations:
+    """Тесты для класса BatchTransformations."""
+
+    @pytest.mark.parametrize("name", list(Transformations.COLOR_INDICES))
+    def test_batch_matches_scalar(self, name: str) -> None:
+        """Проверяет совпадение векторизованной и скалярной вариаций."""
+        rng = np.random.default_rng(0)
+        xs = rng.uniform(-2, 2, 50)
+        ys = rng.uniform(-2, 2, 50)
+
+        batch_xs, batch_ys = BatchTransformations.get_variation(name)(xs, ys)
+
+        scalar = Transformations.get_variation(name)
+        points = [scalar(x, y) for x, y in zip(xs, ys, strict=True)]
+        assert np.allclose(batch_xs, [x for x, _ in points])
+        assert np.allclose(batch_ys, [y for _, y in points])
+
+    def test_spherical_zero_radius(self) -> None:
+        """Проверяет spherical без деления на ноль в начале координат."""
+        xs, ys = BatchTransformations.spherical(np.zeros(1), np.zeros(1))
+
+        assert xs[0] == 0.0
+        assert ys[0] == 0.0
+
+    def test_get_variation_non_existing(self) -> None:
+        """Проверяет получение несуществующей трансформации."""
+        result = BatchTransformations.get_variation("non_existing")
+        assert result == BatchTransformations.linear
+
+
 class TestAffineTransformer:
     """Тесты для класса AffineTransformer."""
 
@@ -95,6 +113,17 @@ class TestAffineTransformer:
         assert result.x == expected_x
         assert result.y == expected_y
 
+    def test_affine_transform_batch(self) -> None:
+        """Проверяет пакетное аффинное преобразование."""
+        transformer = AffineTransformer(0.5, 0.1, 0.2, 0.3, 0.4, 0.6)
+        test_point = Point(2.0, 3.0)
+
+        xs, ys = transformer.transform_batch(np.array([2.0]), np.array([3.0]))
+
+        expected = transformer.transform(test_point)
+        assert xs[0] == expected.x
+        assert ys[0] == expected.y
+
 
 class TestTransformationSystem:
     """Тесты для класса TransformationSystem."""
@@ -107,7 +136,7 @@ class TestTransformationSystem:
         system = TransformationSystem(test_functions, test_affine)
 
         assert system.function_params == test_functions
-        assert system.function_total_weight == 1.0
+        assert system._total_weight == 1.0
 
     def test_choose_random_transform(self) -> None:
         """Проверяет выбор случайной трансформации."""
@@ -115,6 +144,199 @@ class TestTransformationSystem:
         test_affine = {"a": 1.0, "b": 1.0, "c": 1.0, "d": 1.0, "e": 1.0, "f": 1.0}
         system = TransformationSystem(test_functions, test_affine)
 
-        result = system._choose_random_transform()
+        result = system._names[system._choose_random_index()]
 
         assert result == "linear"
+
+    def test_transform_batch_shapes(self) -> None:
+        """Проверяет размеры результата пакетной трансформации."""
+        test_size = 100
+        test_functions = [
+            {"name": "swirl", "weight": 1.0},
+            {"name": "horseshoe", "weight": 0.8},
+        ]
+        test_affine = {"a": 0.6, "b": 0.6, "c": 0.6, "d": 0.6, "e": 0.6, "f": 0.6}
+        system = TransformationSystem(test_functions, test_affine)
+        streams = WalkerStreams(1, range(1), test_size)
+
+        xs, ys, colors = system.transform_batch(*streams.spawn(), streams)
+
+        assert xs.shape == (test_size,)
+        assert ys.shape == (test_size,)
+        assert colors.shape == (test_size,)
+        assert np.isfinite(xs).all()
+
+    def test_choose_random_transforms_respects_weights(self) -> None:
+        """Проверяет что выбор вариаций в пачке учитывает веса."""
+        test_functions = [
+            {"name": "linear", "weight": 3.0},
+            {"name": "swirl", "weight": 1.0},
+        ]
+        test_affine = {"a": 1.0, "b": 1.0, "c": 1.0, "d": 1.0, "e": 1.0, "f": 1.0}
+        test_share = 0.25
+        test_tolerance = 0.02
+        system = TransformationSystem(test_functions, test_affine)
+
+        choice = system._choose_random_transforms(np.random.default_rng(2), 10000)
+
+        # После сортировки по весу swirl идет первым
+        swirl_share = np.mean(choice == 0)
+        assert abs(swirl_share - test_share) < test_tolerance
+
+    def test_compiled_tables_follow_sorted_weights(self) -> None:
+        """Проверяет таблицы выбора, собранные при создании системы."""
+        test_functions = [
+            {"name": "swirl", "weight": 1.0},
+            {"name": "horseshoe", "weight": 0.5},
+        ]
+        test_affine = {"a": 1.0, "b": 1.0, "c": 1.0, "d": 1.0, "e": 1.0, "f": 1.0}
+
+        system = TransformationSystem(test_functions, test_affine)
+
+        assert system._cumulative == [0.5, 1.5]
+        assert system._variations == [
+            Transformations.horseshoe,
+            Transformations.swirl,
+        ]
+        assert system._color_indices[1] == Transformations.COLOR_INDICES["swirl"]
+
+    def test_transform_point_blends_color_index(self) -> None:
+        """Проверяет смешивание индекса цвета точки с индексом функции."""
+        test_functions = [{"name": "linear", "weight": 1.0, "color": 0.5}]
+        test_affine = {"a": 1.0, "b": 0.0, "c": 0.0, "d": 0.0, "e": 1.0, "f": 0.0}
+        system = TransformationSystem(test_functions, test_affine)
+
+        _, color = system.transform_point(Point(0.5, 0.25), 0.25)
+
+        assert color == (0.25 + 0.5) / 2
+
+    def test_transform_xy_matches_transform_point(self) -> None:
+        """Проверяет что шаг на координатах совпадает с шагом на Point."""
+        test_functions = [
+            {"name": "swirl", "weight": 1.0},
+            {
+                "name": "spiral_waves",
+                "weight": 0.5,
+                "post": dict.fromkeys("abcdef", 0.4),
+            },
+        ]
+        test_affine = {"a": 0.6, "b": 0.6, "c": 0.6, "d": 0.6, "e": 0.6, "f": 0.6}
+        system = TransformationSystem(test_functions, test_affine)
+        point_rng, xy_rng = random.Random(6), random.Random(6)
+        point, point_color = Point(0.1, 0.2), 0.0
+        x, y, color = 0.1, 0.2, 0.0
+
+        for _ in range(100):
+            point, point_color = system.transform_point(point, point_color, point_rng)
+            x, y, color = system.transform_xy(x, y, color, xy_rng)
+
+        assert (x, y, color) == (point.x, point.y, point_color)
+
+    def test_function_uses_own_affine_and_post(self) -> None:
+        """Проверяет аффинное и пост-преобразование из описания функции."""
+        test_functions = [
+            {
+                "name": "linear",
+                "weight": 1.0,
+                "affine": {"a": 0.0, "b": 0.0, "c": 0.5, "d": 0.0, "e": 0.0, "f": 0.25},
+                "post": {"a": 2.0, "b": 0.0, "c": 0.0, "d": 0.0, "e": 2.0, "f": 1.0},
+            }
+        ]
+        test_affine = {"a": 1.0, "b": 0.0, "c": 0.0, "d": 0.0, "e": 1.0, "f": 0.0}
+        system = TransformationSystem(test_functions, test_affine)
+
+        point, _ = system.transform_point(Point(3.0, 4.0), 0.0)
+
+        assert (point.x, point.y) == (1.0, 1.5)
+
+    def test_gather_affine_matches_per_function_transform(self) -> None:
+        """Проверяет что выборка коэффициентов применяет преобразование функции."""
+        test_functions = [
+            {"name": "linear", "weight": 1.0},
+            {
+                "name": "linear",
+                "weight": 2.0,
+                "affine": {"a": 0.5, "b": 0.1, "c": 0.2, "d": 0.3, "e": 0.4, "f": 0.6},
+            },
+        ]
+        test_affine = {"a": 0.6, "b": 0.6, "c": 0.6, "d": 0.6, "e": 0.6, "f": 0.6}
+        system = TransformationSystem(test_functions, test_affine)
+        rng = np.random.default_rng(4)
+        xs = rng.uniform(-1, 1, 20)
+        ys = rng.uniform(-1, 1, 20)
+        choice = rng.integers(0, 2, 20)
+
+        new_xs, new_ys = system._gather_affine(
+            system._affine_coefficients, choice, xs, ys
+        )
+
+        for x, y, index, new_x, new_y in zip(
+            xs, ys, choice, new_xs, new_ys, strict=True
+        ):
+            expected = system._affines[index].transform(Point(x, y))
+            assert np.isclose(new_x, expected.x)
+            assert np.isclose(new_y, expected.y)
+
+    def test_apply_variations_matches_per_function_variation(self) -> None:
+        """Проверяет проходы по различным вариациям вместо прохода по функции."""
+        test_functions = [
+            {"name": "swirl", "weight": 1.0},
+            {"name": "linear", "weight": 1.5},
+            {"name": "swirl", "weight": 2.0, "affine": dict.fromkeys("abcdef", 0.3)},
+            {"name": "horseshoe", "weight": 2.5},
+        ]
+        test_affine = {"a": 0.6, "b": 0.6, "c": 0.6, "d": 0.6, "e": 0.6, "f": 0.6}
+        system = TransformationSystem(test_functions, test_affine)
+        rng = np.random.default_rng(5)
+        xs = rng.uniform(-1, 1, 40)
+        ys = rng.uniform(-1, 1, 40)
+        choice = rng.integers(0, 4, 40)
+
+        new_xs, new_ys = system._apply_variations(choice, xs.copy(), ys.copy())
+
+        assert len(system._distinct_variations) == len(("swirl", "horseshoe"))
+        for x, y, index, new_x, new_y in zip(
+            xs, ys, choice, new_xs, new_ys, strict=True
+        ):
+            expected_x, expected_y = system._variations[index](x, y)
+            assert np.isclose(new_x, expected_x)
+            assert np.isclose(new_y, expected_y)
+
+    def test_shared_affine_is_packed_once(self) -> None:
+        """Проверяет что общее для функций преобразование хранится одним столбцом."""
+        test_functions = [
+            {"name": "swirl", "weight": 1.0},
+            {"name": "horseshoe", "weight": 0.8},
+        ]
+        test_affine = {"a": 0.6, "b": 0.6, "c": 0.6, "d": 0.6, "e": 0.6, "f": 0.6}
+
+        system = TransformationSystem(test_functions, test_affine)
+
+        assert system._affine_coefficients.shape == (6, 1)
+        assert system._post_coefficients is None
+
+    def test_choose_random_index_respects_weights(self) -> None:
+        """Проверяет что бинарный поиск выбирает вариации по весам."""
+        test_functions = [
+            {"name": "linear", "weight": 3.0},
+            {"name": "swirl", "weight": 1.0},
+        ]
+        test_affine = {"a": 1.0, "b": 1.0, "c": 1.0, "d": 1.0, "e": 1.0, "f": 1.0}
+        test_share = 0.25
+        test_tolerance = 0.02
+        system = TransformationSystem(test_functions, test_affine)
+
+        random.seed(3)
+        choices = [system._choose_random_index() for _ in range(10000)]
+
+        assert abs(choices.count(0) / len(choices) - test_share) < test_tolerance
+
+    def test_empty_functions_fall_back_to_linear(self) -> None:
+        """Проверяет что без функций применяется linear."""
+        test_affine = {"a": 1.0, "b": 0.0, "c": 0.0, "d": 0.0, "e": 1.0, "f": 0.0}
+        system = TransformationSystem([], test_affine)
+
+        point, _ = system.transform_point(Point(0.5, 0.25), 0.0)
+
+        assert system._names == ["linear"]
+        assert (point.x, point.y) == (0.5, 0.25)